@@ -0,0 +1,216 @@
+"""
+Vistas genéricas de la API JSON.
+
+La serialización usa ``values()``: no se instancian modelos para leer, así
+las respuestas grandes son baratas. Los listados se paginan por cursor
+sobre ``id`` (ver ``crud.pagination``) y aceptan selección de campos con
+``?fields=a,b``.
+"""
+import json
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.views import View
+
+from crud.pagination import decode_cursor, encode_cursor, keyset_filter
+from crud.signals import bulk_write
+
+logger = logging.getLogger('crud.api')
+
+# Mayor clave primaria posible (BigAutoField); un entero más grande no
+# entra en la consulta.
+MAX_PK = 2 ** 63 - 1
+
+
+def error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def is_pk(value):
+    """Si ``value`` (ya decodificado del JSON) sirve como clave primaria."""
+    # bool es subclase de int: true no es el id 1
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value <= MAX_PK
+
+
+class ApiMixin:
+    """
+    Configuración común.
+
+    Atributos:
+        model: modelo expuesto.
+        fields: ``{nombre_publico: lookup}`` de los campos que se pueden leer.
+        default_fields: campos devueltos si no se pide ``fields``.
+    """
+
+    model = None
+    fields = {}
+    default_fields = ()
+
+    def selected_fields(self, request):
+        requested = request.GET.get('fields')
+        names = [f.strip() for f in requested.split(',') if f.strip()] if requested else list(self.default_fields)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+        if 'id' not in names:
+            names.insert(0, 'id')
+        return names
+
+    def serialize(self, queryset, names):
+        lookups = [self.fields[name] for name in names]
+        return [dict(zip(names, row)) for row in queryset.values_list(*lookups)]
+
+
+class ApiListView(ApiMixin, View):
+    """
+    ``GET`` paginado por cursor: ``?limit=&after=&fields=`` más los filtros
+    de ``filters`` (``{parametro: (lookup, conversor)}``).
+    """
+
+    filters = {}
+    default_limit = 100
+    max_limit = 1000
+
+    def get(self, request):
+        try:
+            names = self.selected_fields(request)
+            limit = int(request.GET.get('limit', self.default_limit))
+            if limit < 1:
+                raise ValueError(f"limit debe estar entre 1 y {self.max_limit}")
+            limit = min(limit, self.max_limit)
+            qs = self.model._default_manager.all()
+            for param, (lookup, convert) in self.filters.items():
+                if param in request.GET:
+                    qs = qs.filter(**{lookup: convert(request.GET[param])})
+            after = request.GET.get('after')
+            if after:
+                values = decode_cursor(after, 1)
+                if not is_pk(values[0]):
+                    raise ValueError('Cursor inválido')
+                qs = qs.filter(keyset_filter(['id'], values))
+        except ValueError as e:
+            return error(str(e))
+        rows = self.serialize(qs.order_by('id')[:limit + 1], names)
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        return JsonResponse({
+            'results': rows,
+            'next': encode_cursor([rows[-1]['id']]) if has_next else None,
+        })
+
+
+class ApiBulkView(ApiMixin, View):
+    """
+    ``GET ?ids=1,2,3``: trae varios objetos en una consulta.
+    ``POST`` (JSON, lista de objetos): crea los que no traen ``id`` y
+    actualiza los que sí, todo o nada, en una transacción.
+    """
+
+    max_ids = 1000
+    writable_fields = ()
+
+    def get(self, request):
+        try:
+            names = self.selected_fields(request)
+            ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip()]
+        except ValueError as e:
+            return error(str(e))
+        if not all(is_pk(pk) for pk in ids):
+            return error("Los ids deben ser enteros positivos")
+        if len(ids) > self.max_ids:
+            return error(f"Máximo {self.max_ids} ids por pedido")
+        return JsonResponse({'results': self.serialize(self.model._default_manager.filter(pk__in=ids), names)})
+
+    def clean_foreign_keys(self, objs):
+        """Valida por lote las claves foráneas; devuelve ``{indice: errores}``."""
+        return {}
+
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return error("Autenticación requerida", status=401)
+        try:
+            items = json.loads(request.body)
+        except ValueError:
+            return error("JSON inválido")
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return error("Se espera una lista de objetos")
+        if len(items) > self.max_ids:
+            return error(f"Máximo {self.max_ids} objetos por pedido")
+
+        errors = {}
+        for index, item in enumerate(items):
+            unknown = set(item) - set(self.writable_fields) - {'id'}
+            if unknown:
+                errors[index] = {name: ["Campo no editable"] for name in sorted(unknown)}
+                continue
+            # Tipos de id y FK antes de consultar: un valor que no es una
+            # clave no puede llegar a la base
+            bad_keys = [
+                name for name in ['id', *self.fk_names()]
+                if item.get(name) is not None and not is_pk(item[name])
+            ]
+            if bad_keys:
+                errors[index] = {name: ["Debe ser un entero positivo"] for name in bad_keys}
+        items = [(index, item) for index, item in enumerate(items) if index not in errors]
+
+        update_ids = [item['id'] for _i, item in items if item.get('id') is not None]
+        existing = self.model._default_manager.in_bulk(update_ids)
+        # Valores originales de las FK, para avisar a los contadores
+        originals = {pk: {f: getattr(obj, f) for f in self.fk_attnames()} for pk, obj in existing.items()}
+
+        objs = []
+        for index, item in items:
+            if item.get('id') is not None:
+                obj = existing.get(item['id'])
+                if obj is None:
+                    errors[index] = {'id': ["No existe"]}
+                    continue
+            else:
+                obj = self.model()
+            for name, value in item.items():
+                if name != 'id':
+                    setattr(obj, self.model._meta.get_field(name).attname, value)
+            try:
+                obj.clean_fields(exclude=[f.name for f in self.model._meta.concrete_fields if f.is_relation])
+            except ValidationError as e:
+                errors[index] = e.message_dict
+            objs.append((index, obj))
+        for index, fk_errors in self.clean_foreign_keys(objs).items():
+            errors.setdefault(index, {}).update(fk_errors)
+        if errors:
+            return error("Datos inválidos", errors={str(i): e for i, e in sorted(errors.items())})
+
+        to_create = [obj for _i, obj in objs if obj.pk is None]
+        to_update = [obj for _i, obj in objs if obj.pk is not None]
+        try:
+            with transaction.atomic():
+                created = self.model._default_manager.bulk_create(to_create)
+                if to_update:
+                    self.model._default_manager.bulk_update(to_update, [f.name for f in self.writable_model_fields()])
+                created_ids = [obj.pk for obj in created]
+                if created_ids:
+                    bulk_write.send(sender=self.model, action='create', pks=created_ids)
+                if to_update:
+                    bulk_write.send(sender=self.model, action='update', pks=[obj.pk for obj in to_update],
+                                    **self.update_signal_kwargs(to_update, originals))
+        except IntegrityError:
+            # Restricciones que se validan en la base (p. ej. unicidad); el
+            # texto del error de la base queda en el log, no en la respuesta
+            logger.info("Conflicto en la carga masiva de %s", self.model._meta.label, exc_info=True)
+            return error("Conflicto con datos existentes", status=409)
+        return JsonResponse({'created': created_ids, 'updated': [obj.pk for obj in to_update]})
+
+    def writable_model_fields(self):
+        return [self.model._meta.get_field(name) for name in self.writable_fields]
+
+    def fk_names(self):
+        return [f.name for f in self.writable_model_fields() if f.is_relation]
+
+    def fk_attnames(self):
+        return [f.attname for f in self.writable_model_fields() if f.is_relation]
+
+    def update_signal_kwargs(self, objs, originals):
+        """Argumentos extra para ``bulk_write`` al actualizar (ver ``crud.signals``)."""
+        return {}
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CrudConfig(AppConfig):
+    name = 'crud'
+
+    def ready(self):
+        # PRAGMA de SQLite al abrir cada conexión (settings.SQLITE_PRAGMAS)
+        from . import sqlite  # noqa: F401
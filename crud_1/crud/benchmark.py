@@ -0,0 +1,366 @@
+"""
+Benchmarks de las vistas y los importadores.
+
+- ``seed``: genera oficinas y personas con una distribución sesgada (pocas
+  oficinas concentran la mayoría de las personas, como en producción).
+- ``bench_view``: latencias (p50/p95/p99) y consultas por request.
+- ``bench_loader``: filas por segundo de un importador.
+- ``bench_concurrency``: lecturas concurrentes mientras corre una importación,
+  en procesos separados.
+- ``best_results``: combina varias rondas.
+- ``compare``: compara contra un baseline guardado (medido con los mismos
+  parámetros) y marca regresiones.
+
+Lo usan ``manage.py benchmark`` y ``manage.py benchmark_concurrency``, que
+corren todo sobre una base temporal (``temporary_database``).
+"""
+import csv
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.db import DatabaseError, OperationalError, connection, connections, transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from crud.importing import chunked
+from crud.querybudget import QueryBudget
+
+NOMBRES = [
+    'María', 'Juan', 'Ana', 'Pedro', 'Lucía', 'José', 'Sofía', 'Martín', 'Valentina', 'Diego',
+    'Camila', 'Joaquín', 'Florencia', 'Matías', 'Agustina', 'Nicolás', 'Julieta', 'Tomás',
+]
+APELLIDOS = [
+    'González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez',
+    'García', 'Sánchez', 'Romero', 'Sosa', 'Álvarez', 'Torres', 'Ruiz', 'Ramírez', 'Flores',
+]
+
+
+@contextmanager
+def temporary_database(directory):
+    """
+    Crea una base de prueba (en ``directory`` si es SQLite) y un caché
+    locmem propio: no se toca la base real ni su caché.
+    """
+    if connection.vendor == 'sqlite':
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        locmem = 'django.core.cache.backends.locmem.LocMemCache'
+        with override_settings(CACHES={
+            'default': {'BACKEND': locmem, 'LOCATION': 'benchmark'},
+            'fragmentos': {'BACKEND': locmem, 'LOCATION': 'benchmark-fragmentos',
+                           'OPTIONS': {'MAX_ENTRIES': 20000}},
+        }):
+            yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def fake_oficinas(n, rng):
+    for i in range(n):
+        yield {'nombre': f'Oficina {i:05d}', 'nombre_corto': f'OF{i:05d}'}
+
+
+def fake_personas(m, codigos, rng):
+    """
+    Personas repartidas con sesgo tipo Zipf entre ``codigos``, sin repetir
+    ``(nombre, apellido, oficina)`` (la restricción única de Persona).
+    """
+    pesos = [1 / (rank + 1) for rank in range(len(codigos))]
+    vistas = set()
+    while len(vistas) < m:
+        row = {
+            'nombre': rng.choice(NOMBRES),
+            'apellido': f'{rng.choice(APELLIDOS)}{rng.randint(0, 999)}',
+            'edad': max(18, min(80, int(rng.gauss(40, 12)))),
+            'oficina_nombre_corto': rng.choices(codigos, pesos)[0],
+        }
+        clave = (row['nombre'], row['apellido'], row['oficina_nombre_corto'])
+        if clave not in vistas:
+            vistas.add(clave)
+            yield row
+
+
+def seed(n_oficinas, n_personas, seed_value=42, chunk_size=5000):
+    """Carga datos sintéticos en la base y reconstruye índices y contadores."""
+    from home import counters
+    from oficina.models import Oficina
+    from persona import search
+    from persona.models import Persona
+
+    rng = random.Random(seed_value)
+    oficinas = list(fake_oficinas(n_oficinas, rng))
+    Oficina.objects.bulk_create(Oficina(**row) for row in oficinas)
+    codigos = [row['nombre_corto'] for row in oficinas]
+    ids = dict(Oficina.objects.filter(nombre_corto__in=codigos).values_list('nombre_corto', 'id'))
+    for chunk in chunked(fake_personas(n_personas, codigos, rng), chunk_size):
+        with transaction.atomic():
+            Persona.objects.bulk_create(
+                Persona(nombre=row['nombre'], apellido=row['apellido'], edad=row['edad'],
+                        oficina_id=ids[row['oficina_nombre_corto']])
+                for row in chunk
+            )
+    search.rebuild()
+    counters.reconcile()
+
+
+def write_csv(path, rows, fieldnames):
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def percentiles(samples):
+    """p50/p95/p99 en milisegundos."""
+    if len(samples) < 2:
+        value = round(samples[0] * 1000, 3) if samples else 0.0
+        return {'p50': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': round(cuts[49] * 1000, 3), 'p95': round(cuts[94] * 1000, 3), 'p99': round(cuts[98] * 1000, 3)}
+
+
+def calibrate(repeticiones=5):
+    """
+    Milisegundos de una carga fija de CPU (la mejor de ``repeticiones``).
+    ``compare`` escala el baseline con la razón entre calibraciones, así
+    una máquina más lenta (o más cargada) en este momento no aparece como
+    regresión.
+    """
+    samples = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        datos = sorted(str(i * 7919 % 100003) for i in range(100000))
+        json.loads(json.dumps(datos))
+        samples.append(time.perf_counter() - inicio)
+    return round(min(samples) * 1000, 3)
+
+
+def bench_view(client, url, repeticiones=50, warmup=3):
+    """Latencias y consultas por request de ``GET url``."""
+    for _ in range(warmup):
+        client.get(url)
+    samples = []
+    queries = 0
+    for _ in range(repeticiones):
+        with QueryBudget() as budget:
+            inicio = time.perf_counter()
+            response = client.get(url)
+            samples.append(time.perf_counter() - inicio)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} devolvió {response.status_code}")
+        queries = max(queries, budget.count)
+    return {**percentiles(samples), 'queries': queries}
+
+
+def bench_loader(importer, path, parallel=0):
+    """Filas por segundo de ``importer`` sobre ``path``."""
+    stats = importer.run_parallel(path, parallel) if parallel > 1 else importer.run(path)
+    return {'filas_por_segundo': round(stats.filas_por_segundo, 1), 'filas': stats.filas}
+
+
+def bench_concurrency(make_client, url, importer, path, readers=4, lock_timeout=5.0):
+    """
+    Corre ``importer`` sobre ``path`` en un proceso mientras ``readers``
+    procesos piden ``url`` sin pausa: cada uno con su conexión, como los
+    workers de un servidor, así el lock de SQLite (rollback journal o WAL)
+    es el que realmente se comparte.
+
+    Los lectores no usan el timeout de la conexión: reintentan ellos mismos
+    hasta ``lock_timeout`` segundos para contar cada "database is locked" y
+    medir la espera. Devuelve latencias de lectura, lecturas que encontraron
+    la base bloqueada, espera por el lock, lecturas fallidas (se agotó la
+    espera u otro error) y filas/s de la importación.
+
+    Usa ``fork``: los procesos heredan la configuración y la base temporal.
+    """
+    ctx = multiprocessing.get_context('fork')
+    ready, start, stop = ctx.Semaphore(0), ctx.Event(), ctx.Event()
+    reader_results, writer_results = ctx.Queue(), ctx.Queue()
+    # Los PRAGMA (journal_mode) se aplican antes de repartir la base
+    connection.ensure_connection()
+    connections.close_all()
+    processes = [
+        ctx.Process(target=_child, args=(reader_results, _read_loop, make_client, url, lock_timeout,
+                                         ready, start, stop))
+        for _ in range(readers)
+    ]
+    processes.append(ctx.Process(target=_child, args=(writer_results, _import, importer, path, ready, start)))
+    for process in processes:
+        process.start()
+    try:
+        for _ in processes:
+            ready.acquire()
+        start.set()
+        escritura = _result(writer_results.get())
+    finally:
+        stop.set()
+        start.set()
+    lecturas = [_result(reader_results.get()) for _ in range(readers)]
+    for process in processes:
+        process.join()
+
+    latencias = [x for r in lecturas for x in r['latencias']]
+    esperas = [x for r in lecturas for x in r['esperas']]
+    return {
+        **percentiles(latencias),
+        'max': round(max(latencias, default=0) * 1000, 3),
+        'lecturas': len(latencias),
+        'bloqueadas': len(esperas),
+        'espera_total': round(sum(esperas) * 1000, 3),
+        'espera_max': round(max(esperas, default=0) * 1000, 3),
+        'errores': sum(r['errores'] for r in lecturas),
+        'filas_por_segundo': round(escritura['filas_por_segundo'], 1),
+    }
+
+
+def _child(results, target, *args):
+    try:
+        results.put(target(*args))
+    except BaseException:
+        results.put({'error': traceback.format_exc()})
+    finally:
+        connections.close_all()
+
+
+def _result(result):
+    if 'error' in result:
+        raise RuntimeError(f"Falló un proceso del benchmark:\n{result['error']}")
+    return result
+
+
+def _import(importer, path, ready, start):
+    ready.release()
+    start.wait()
+    return {'filas_por_segundo': importer.run(path).filas_por_segundo}
+
+
+def _read_loop(make_client, url, lock_timeout, ready, start, stop):
+    # Sin busy handler: cada lectura bloqueada llega acá como OperationalError
+    connection.settings_dict['OPTIONS'] = {**connection.settings_dict['OPTIONS'], 'timeout': 0}
+    client = make_client()
+    try:
+        _timed_get(client, url, lock_timeout)
+    finally:
+        ready.release()
+    start.wait()
+    latencias, esperas, errores = [], [], 0
+    while not stop.is_set():
+        latencia, espera, ok = _timed_get(client, url, lock_timeout)
+        latencias.append(latencia)
+        if espera:
+            esperas.append(espera)
+        errores += not ok
+    return {'latencias': latencias, 'esperas': esperas, 'errores': errores}
+
+
+def _timed_get(client, url, lock_timeout):
+    """``(latencia, espera por el lock, ok)`` de un GET, reintentando si la base está bloqueada."""
+    inicio = intento = time.perf_counter()
+    while True:
+        try:
+            ok = client.get(url).status_code == 200
+        except OperationalError as e:
+            if 'locked' in str(e) and time.perf_counter() - inicio < lock_timeout:
+                time.sleep(0.001)
+                intento = time.perf_counter()
+                continue
+            ok = False
+        except DatabaseError:
+            ok = False
+        return time.perf_counter() - inicio, intento - inicio, ok
+
+
+# Parámetros que cambian lo que se mide: con otros valores los números no
+# son comparables
+META_COMPARABLE = ('oficinas', 'personas', 'filas_csv', 'oficinas_csv', 'repeticiones', 'rondas', 'motor')
+
+
+class BaselineMismatch(ValueError):
+    pass
+
+
+def check_meta(baseline_meta, meta):
+    """``BaselineMismatch`` si ``meta`` difiere del baseline en ``META_COMPARABLE``."""
+    distintos = [
+        f"{clave}: {baseline_meta.get(clave)} != {meta.get(clave)}"
+        for clave in META_COMPARABLE
+        if baseline_meta.get(clave) != meta.get(clave)
+    ]
+    if distintos:
+        raise BaselineMismatch(f"El baseline se midió con otros parámetros ({'; '.join(distintos)})")
+
+
+def best_results(rondas):
+    """
+    Combina los resultados de varias rondas quedándose con la mejor de cada
+    métrica (menor latencia, más filas por segundo; el máximo de consultas,
+    que no depende del ruido): una ronda interrumpida por otro proceso no
+    mueve el baseline ni dispara una regresión.
+    """
+    combinado = {}
+    for nombre in rondas[0]:
+        combinado[nombre] = {}
+        for metrica in rondas[0][nombre]:
+            mejor = max if metrica in ('queries', 'filas_por_segundo', 'filas') else min
+            combinado[nombre][metrica] = mejor(r[nombre][metrica] for r in rondas)
+    return combinado
+
+
+def compare(baseline, actual, tolerancia=0.35, minimo_ms=1.0):
+    """
+    Lista de regresiones de ``actual`` respecto de ``baseline`` (ambos
+    ``{'meta': ..., 'resultados': ...}``): latencias más de ``tolerancia``
+    por encima (y al menos ``minimo_ms`` más lentas, para no marcar ruido
+    en vistas de fracciones de milisegundo), más consultas por request, o
+    menos filas por segundo.
+
+    Latencias y filas por segundo del baseline se escalan por la razón
+    entre las calibraciones (``calibrate``) de ambas corridas.
+
+    ``BaselineMismatch`` si las corridas no usaron los mismos parámetros
+    (``META_COMPARABLE``).
+    """
+    check_meta(baseline['meta'], actual['meta'])
+    factor = 1.0
+    if baseline['meta'].get('calibracion_ms') and actual['meta'].get('calibracion_ms'):
+        factor = actual['meta']['calibracion_ms'] / baseline['meta']['calibracion_ms']
+    regresiones = []
+    for nombre, base in baseline['resultados'].items():
+        now = actual['resultados'].get(nombre)
+        if now is None:
+            continue
+        base = {
+            metrica: valor * factor if metrica in ('p50', 'p95', 'p99')
+            else valor / factor if metrica == 'filas_por_segundo' else valor
+            for metrica, valor in base.items()
+        }
+        for metrica in ('p50', 'p95'):
+            if metrica in base and now[metrica] > max(base[metrica] * (1 + tolerancia), base[metrica] + minimo_ms):
+                regresiones.append(f"{nombre}.{metrica}: {base[metrica]:.1f}ms -> {now[metrica]:.1f}ms")
+        if 'queries' in base and now['queries'] > base['queries']:
+            regresiones.append(f"{nombre}.queries: {base['queries']} -> {now['queries']}")
+        if 'filas_por_segundo' in base and now['filas_por_segundo'] < base['filas_por_segundo'] * (1 - tolerancia):
+            regresiones.append(
+                f"{nombre}.filas_por_segundo: {base['filas_por_segundo']:.0f} -> {now['filas_por_segundo']:.0f}"
+            )
+    return regresiones
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def save_baseline(path, results, meta):
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump({'meta': meta, 'resultados': results}, fh, indent=2, ensure_ascii=False, sort_keys=True)
+        fh.write('\n')
@@ -0,0 +1,170 @@
+"""
+Caché de páginas con claves versionadas.
+
+Cada modelo (y cada objeto) tiene una versión guardada en el caché: un
+timestamp en nanosegundos que se renueva al confirmarse un ``post_save`` /
+``post_delete`` / ``bulk_write``. Las claves de las páginas incluyen las
+versiones de los modelos que muestran, así que invalidar es sólo cambiar
+una versión: las entradas viejas dejan de usarse y vencen solas.
+
+Funciona con cualquier backend de Django (locmem, archivo, Redis). Con
+varios procesos conviene un backend compartido (archivo o Redis) para que
+todos vean las mismas versiones.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from crud.routers import use_primary
+
+VERSION_TIMEOUT = None  # las versiones no vencen
+
+
+def _version_key(model, pk=None):
+    key = f'version:{model._meta.label_lower}'
+    return key if pk is None else f'{key}:{pk}'
+
+
+def get_versions(keys):
+    """Devuelve las versiones de ``keys``, inicializando las que falten."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), VERSION_TIMEOUT)
+            versions[key] = cache.get(key) or time.time_ns()
+    return [versions[key] for key in keys]
+
+
+def model_version(model):
+    return get_versions([_version_key(model)])[0]
+
+
+def object_version(model, pk):
+    return get_versions([_version_key(model, pk)])[0]
+
+
+def bump(model, pks=()):
+    """Renueva la versión del modelo (y de los objetos ``pks``) al confirmar la transacción."""
+    keys = [_version_key(model)] + [_version_key(model, pk) for pk in pks]
+
+    def _bump():
+        now = time.time_ns()
+        cache.set_many({key: now for key in keys}, VERSION_TIMEOUT)
+
+    transaction.on_commit(_bump)
+
+
+def store_response(key, response, timeout):
+    """Guarda el cuerpo y los encabezados de ``response`` (no las cookies, que son del request)."""
+    cache.set(key, (response.content, dict(response.headers)), timeout)
+
+
+class CachedResponseMixin:
+    """
+    Cachea la respuesta completa de vistas de sólo lectura para usuarios
+    anónimos y responde a GET condicionales (ETag / Last-Modified) con 304.
+    Sirve igual para vistas con handlers async (``ASYNC_VIEWS``).
+
+    Atributos:
+        cache_models: modelos cuyos cambios invalidan la página.
+        cache_object_model: si se define, la página depende además de la
+            versión del objeto ``kwargs['pk']`` de ese modelo.
+        cache_timeout: segundos que se conserva la página.
+    """
+
+    cache_models = ()
+    cache_object_model = None
+    cache_timeout = 300
+
+    def get_cache_versions(self):
+        keys = [_version_key(model) for model in self.cache_models]
+        if self.cache_object_model is not None:
+            keys.append(_version_key(self.cache_object_model, self.kwargs.get('pk')))
+        return get_versions(keys)
+
+    def lookup_response(self, request):
+        """
+        Devuelve ``(clave, etag, last_modified, respuesta)``; la respuesta es
+        un 304, la página guardada o None si hay que generarla.
+        """
+        versions = self.get_cache_versions()
+        raw = '|'.join([request.get_full_path(), *map(str, versions)])
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        etag = f'"{digest}"'
+        last_modified = max(versions, default=time.time_ns()) // 10**9
+        key = f'pagina:{digest}'
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                response = HttpResponse(content, headers=headers)
+        return key, etag, last_modified, response
+
+    def save_response(self, key, response):
+        if getattr(response, 'is_rendered', True):
+            store_response(key, response, self.cache_timeout)
+        else:
+            # Se cachea al renderizar (el handler renderiza después
+            # de los middleware de plantilla, que así pueden medirlo);
+            # las consultas del render también van al primario.
+            render = response.render
+
+            def render_from_primary():
+                with use_primary():
+                    return render()
+
+            response.render = render_from_primary
+            response.add_post_render_callback(
+                lambda r: store_response(key, r, self.cache_timeout)
+            )
+
+    def finish_response(self, response, etag, last_modified):
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Cookie'])
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        self.kwargs = kwargs
+        key, etag, last_modified, response = self.lookup_response(request)
+        if response is None:
+            # Lo que se guarda vale para estas versiones durante
+            # cache_timeout: se lee del primario, no de una réplica que
+            # quizá todavía no tiene el cambio que las renovó.
+            with use_primary():
+                response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            self.save_response(key, response)
+        return self.finish_response(response, etag, last_modified)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """``dispatch`` para handlers async: mismo caché, ETag y 304."""
+        # Los templates consultan request.user: se resuelve antes de renderizar
+        request.user = await request.auser()
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return await super().dispatch(request, *args, **kwargs)
+
+        self.kwargs = kwargs
+        key, etag, last_modified, response = await sync_to_async(self.lookup_response)(request)
+        if response is None:
+            with use_primary():
+                response = await super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            await sync_to_async(self.save_response)(key, response)
+        return self.finish_response(response, etag, last_modified)
@@ -0,0 +1,484 @@
+"""
+Motor de importación de CSV por lotes.
+
+Lee el archivo en streaming (nunca se carga entero en memoria), agrupa las
+filas en lotes de ``chunk_size`` y por cada lote:
+
+1. resuelve las claves existentes con una consulta ``IN`` por campo clave,
+2. crea con ``bulk_create`` y actualiza con ``bulk_update``,
+3. confirma todo en una transacción por lote.
+
+Las subclases definen ``model``, ``fields`` y ``parse_row``; pueden
+redefinir ``prepare_chunk`` para resolver claves foráneas por lote.
+
+En PostgreSQL los lotes se escriben con ``COPY`` a una tabla temporal y un
+upsert set-based (ver ``crud.pgcopy``); si un lote falla se reintenta
+fila por fila con el ORM.
+
+En modo ``sync`` las filas cuyo hash de contenido coincide con el
+guardado en el registro (ver ``crud.sync``) no se escriben, y con
+``prune`` se borran al final los registros que no aparecen en el archivo.
+
+Con ``run_parallel`` el parseo y la validación (CPU) se reparten entre
+varios procesos por rangos de bytes del archivo, y un único escritor (el
+proceso principal) inserta los lotes en orden.
+"""
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import OutputWrapper
+from django.db import DatabaseError, IntegrityError, connections, router, transaction
+
+from crud import pgcopy, sync as content_sync
+from crud.routers import use_primary
+from crud.signals import bulk_write
+
+
+class RowError(Exception):
+    """Fila inválida: se omite y se informa, sin cortar la importación."""
+
+
+class ParsedRow:
+    """Fila ya validada, lista para escribirse."""
+
+    __slots__ = ('line', 'lookup', 'values')
+
+    def __init__(self, line, lookup, values):
+        self.line = line
+        # (campo, valor) por el que se busca un registro existente, o None
+        # para insertar siempre.
+        self.lookup = lookup
+        self.values = values
+
+
+class ImportStats:
+    """Contadores de una importación y velocidad en filas por segundo."""
+
+    def __init__(self):
+        self.creadas = 0
+        self.actualizadas = 0
+        self.omitidas = 0
+        self.sin_cambios = 0
+        self.eliminadas = 0
+        self.filas = 0
+        self.inicio = time.monotonic()
+
+    @property
+    def segundos(self):
+        return time.monotonic() - self.inicio
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas / self.segundos if self.segundos else 0.0
+
+    def resumen(self):
+        sync = ''
+        if self.sin_cambios or self.eliminadas:
+            sync = f", sin_cambios={self.sin_cambios}, eliminadas={self.eliminadas}"
+        return (
+            f"Resumen: creadas={self.creadas}, actualizadas={self.actualizadas}, "
+            f"omitidas={self.omitidas}{sync} — {self.filas} filas en {self.segundos:.1f}s "
+            f"({self.filas_por_segundo:.0f} filas/s)"
+        )
+
+
+def chunked(iterable, size):
+    """Agrupa ``iterable`` en listas de a lo sumo ``size`` elementos."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_csv(path, delimiter=',', encoding='utf-8', start=None, end=None, first_line=2, state=None):
+    """
+    Lee ``path`` como CSV con encabezado y produce ``(linea, offset, fila)``.
+
+    ``offset`` es la posición en bytes justo después de la fila, útil para
+    retomar la lectura con ``start``. Si se indica ``end`` se deja de leer
+    en la primera fila que empieza en o después de ese offset.
+    ``first_line`` es el número de línea del archivo correspondiente a
+    ``start`` (por defecto la línea siguiente al encabezado). Si se pasa
+    ``state`` (un dict), al terminar ``state['line']`` tiene la última línea
+    leída.
+    """
+    with open(path, 'rb') as fh:
+        header_line = fh.readline().decode('utf-8-sig' if encoding == 'utf-8' else encoding)
+        header = next(csv.reader([header_line], delimiter=delimiter), [])
+        header = [name.strip() for name in header]
+        if start is not None and start > fh.tell():
+            fh.seek(start)
+        state = {} if state is None else state
+        state.update(offset=fh.tell(), line=first_line - 1)
+
+        def lines():
+            while end is None or fh.tell() < end:
+                raw = fh.readline()
+                if not raw:
+                    return
+                state['line'] += 1
+                state['offset'] = fh.tell()
+                yield raw.decode(encoding)
+
+        row_start = first_line
+        for values in csv.reader(lines(), delimiter=delimiter):
+            if values:
+                yield row_start, state['offset'], dict(zip(header, values))
+            row_start = state['line'] + 1
+
+
+def split_ranges(path, size):
+    """
+    Divide ``path`` (sin el encabezado) en rangos ``(inicio, fin)`` de
+    aproximadamente ``size`` bytes que empiezan y terminan en un salto de
+    línea. Requiere que ningún campo del CSV contenga saltos de línea.
+    """
+    total = os.path.getsize(path)
+    with open(path, 'rb') as fh:
+        fh.readline()
+        start = fh.tell()
+        ranges = []
+        while start < total:
+            fh.seek(min(start + size, total))
+            if fh.tell() < total:
+                fh.readline()
+            end = fh.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _parse_range(importer_cls, path, start, end, delimiter):
+    """
+    Tarea de los procesos de trabajo: parsea y valida un rango del archivo.
+
+    Devuelve las filas válidas en columnas (más compactas de transferir
+    entre procesos), los errores y la cantidad de líneas del rango, con
+    números de línea relativos al inicio del rango.
+    """
+    importer = importer_cls()
+    state = {}
+    lines, lookups, columns, errors = [], [], {}, []
+    for line, _offset, row in read_csv(path, delimiter=delimiter, start=start, end=end,
+                                       first_line=1, state=state):
+        try:
+            parsed = importer.parse_row(row, line)
+        except RowError as e:
+            errors.append((line, row, str(e)))
+            continue
+        lines.append(line)
+        lookups.append(parsed.lookup)
+        for key, value in parsed.values.items():
+            columns.setdefault(key, []).append(value)
+    return lines, lookups, columns, errors, state.get('line', 0)
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+class CSVImporter:
+    """
+    Importador genérico por lotes.
+
+    Atributos:
+        model: modelo destino.
+        fields: campos que se escriben (y se actualizan con ``bulk_update``).
+        chunk_size: filas por lote / transacción.
+        use_copy: en PostgreSQL, escribir los lotes con ``COPY`` + upsert.
+        hash_fields: campos (attname) cuyo hash guarda ``contenido_hash``, en
+            el mismo orden que ``crud.sync.hash_field``; habilitan ``sync``.
+        required_columns: columnas que debe tener el encabezado del CSV.
+
+    ``checkpoint`` (opcional) se llama con el importador al final de cada
+    lote, dentro de su transacción: lo que registre queda confirmado junto
+    con las filas del lote (ver ``tareas``).
+    """
+
+    model = None
+    fields = ()
+    chunk_size = 1000
+    use_copy = True
+    hash_fields = ()
+    required_columns = ()
+
+    def __init__(self, chunk_size=None, delimiter=',', stdout=None, stderr=None, verbosity=1,
+                 checkpoint=None, sync=False, prune=False):
+        if chunk_size:
+            self.chunk_size = chunk_size
+        self.delimiter = delimiter
+        self.stdout = stdout or OutputWrapper(sys.stdout)
+        self.stderr = stderr or OutputWrapper(sys.stderr)
+        self.verbosity = verbosity
+        self.checkpoint = checkpoint
+        if (sync or prune) and not self.hash_fields:
+            raise ValueError(f"{type(self).__name__} no admite el modo sync")
+        self.sync = sync or prune
+        self.prune = prune
+        # Hash guardado de los registros existentes del lote (modo sync)
+        self.hashes = {}
+        self.stats = ImportStats()
+        # Con run_parallel los errores se acumulan por rango y se informan
+        # ordenados por línea.
+        self.pending_errors = None
+
+    # --- Puntos de extensión --------------------------------------------
+
+    def parse_row(self, row, line):
+        """Convierte una fila del CSV en ``ParsedRow``; lanza ``RowError`` si es inválida."""
+        raise NotImplementedError
+
+    def prepare_chunk(self, rows):
+        """Última validación por lote (p. ej. resolver claves foráneas). Devuelve las filas válidas."""
+        return rows
+
+    def build(self, values):
+        return self.model(**values)
+
+    def delete_pks(self, pks):
+        """Borra ``pks`` (poda del modo sync). Por defecto con el ORM: cascadas y señales."""
+        self.model._default_manager.filter(pk__in=pks).delete()
+
+    # --- Motor -----------------------------------------------------------
+
+    def skip(self, line, row, motivo):
+        self.stats.omitidas += 1
+        message = f"Omitida línea {line}: {row} — {motivo}"
+        if self.pending_errors is not None:
+            self.pending_errors.append((line, message))
+        else:
+            self.stderr.write(message)
+
+    def rows(self, path, **kwargs):
+        """
+        Filas parseadas de ``path``; las inválidas se informan y se omiten.
+
+        ``self.offset`` y ``self.line`` quedan en la posición (bytes y última
+        línea leída) posterior a la última fila producida: pasados como
+        ``start`` y ``first_line=line + 1`` retoman la lectura desde ahí.
+        """
+        state = kwargs.setdefault('state', {})
+        for line, offset, row in read_csv(path, delimiter=self.delimiter, **kwargs):
+            self.stats.filas += 1
+            self.offset = offset
+            self.line = state['line']
+            try:
+                yield self.parse_row(row, line)
+            except RowError as e:
+                self.skip(line, row, e)
+
+    def run(self, path, **kwargs):
+        if not self.prune:
+            for chunk in chunked(self.rows(path, **kwargs), self.chunk_size):
+                self.process_chunk(chunk)
+            return self.stats
+
+        connection = connections[router.db_for_write(self.model)]
+        content_sync.create_seen(connection, self.model)
+        try:
+            for chunk in chunked(self.rows(path, **kwargs), self.chunk_size):
+                self.process_chunk(chunk)
+            self.prune_unseen(connection)
+        finally:
+            content_sync.drop_seen(connection, self.model)
+        return self.stats
+
+    def prune_unseen(self, connection):
+        """Borra los registros que no aparecieron en el archivo."""
+        if self.stats.omitidas:
+            # Una fila inválida puede ser la de un registro existente
+            self.stderr.write(
+                f"Poda cancelada: {self.stats.omitidas} filas omitidas; corregirlas y volver a importar."
+            )
+            return
+        for pks in content_sync.unseen_batches(connection, self.model, self.chunk_size):
+            with use_primary(), transaction.atomic():
+                self.delete_pks(pks)
+            self.stats.eliminadas += len(pks)
+
+    def run_parallel(self, path, workers, range_size=4 * 1024 * 1024):
+        """
+        Importa ``path`` parseando en ``workers`` procesos.
+
+        El archivo se divide en rangos de ``range_size`` bytes; como mucho
+        ``2 * workers`` rangos están en vuelo a la vez, así la memoria queda
+        acotada. Los resultados se consumen en el orden del archivo, por lo
+        que los errores se informan con su número de línea original y en
+        orden determinístico.
+
+        No admite ``prune``: la poda necesita ver todas las filas en un
+        solo proceso (usar ``run``).
+        """
+        if self.prune:
+            raise ValueError("La importación en paralelo no admite prune; usar run()")
+        ranges = split_ranges(path, range_size)
+        # Los procesos hijos no deben heredar conexiones abiertas
+        connections.close_all()
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        base_line = 1  # línea del encabezado
+        pending = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker) as pool:
+            tasks = iter(ranges)
+            for start, end in islice(tasks, 2 * workers):
+                pending.append(pool.submit(_parse_range, type(self), path, start, end, self.delimiter))
+            while pending:
+                lines, lookups, columns, errors, n_lines = pending.pop(0).result()
+                for start, end in islice(tasks, 1):
+                    pending.append(pool.submit(_parse_range, type(self), path, start, end, self.delimiter))
+
+                self.stats.filas += len(lines) + len(errors)
+                self.pending_errors = []
+                for line, row, motivo in errors:
+                    self.skip(base_line + line, row, motivo)
+                keys = list(columns)
+                rows = [
+                    ParsedRow(base_line + line, lookup, dict(zip(keys, values)))
+                    for line, lookup, *values in zip(lines, lookups, *columns.values())
+                ]
+                for chunk in chunked(rows, self.chunk_size):
+                    self.process_chunk(chunk)
+                for _line, message in sorted(self.pending_errors, key=lambda item: item[0]):
+                    self.stderr.write(message)
+                self.pending_errors = None
+                base_line += n_lines
+        return self.stats
+
+    def process_chunk(self, chunk):
+        # Las claves existentes se resuelven en el primario, no en una réplica
+        with use_primary():
+            if self.checkpoint is None:
+                self._process_chunk(chunk)
+                return
+            with transaction.atomic():
+                self._process_chunk(chunk)
+                self.checkpoint(self)
+
+    def _process_chunk(self, chunk):
+        chunk = self.prepare_chunk(chunk)
+        try:
+            with transaction.atomic():
+                self.write_chunk(chunk)
+        except (IntegrityError, DatabaseError):
+            # Algún registro rompe una restricción: se reintenta fila por
+            # fila para aislar las inválidas sin perder el resto del lote.
+            for parsed in chunk:
+                try:
+                    with transaction.atomic():
+                        self.write_chunk([parsed], copy=False)
+                except (IntegrityError, DatabaseError) as e:
+                    self.skip(parsed.line, parsed.values, f"{type(e).__name__}: {e}")
+        if self.verbosity >= 2:
+            self.stdout.write(
+                f"  {self.stats.filas} filas procesadas ({self.stats.filas_por_segundo:.0f} filas/s)"
+            )
+
+    def resolve_existing(self, chunk):
+        """
+        Devuelve ``{(campo, valor): pk}`` con una consulta ``IN`` por campo
+        clave. ``campo`` puede ser una tupla de campos (clave compuesta,
+        ``valor`` es entonces una tupla con los valores en ese orden). En modo sync también carga el hash
+        guardado de cada registro en ``self.hashes``. Si varios registros
+        comparten la clave (``nombre`` no es único) se toma el de menor id,
+        igual que ``pgcopy.upsert``.
+        """
+        by_field = {}
+        for parsed in chunk:
+            if parsed.lookup is not None:
+                field, value = parsed.lookup
+                by_field.setdefault(field, set()).add(value)
+        existing = {}
+        self.hashes = {}
+        extra = (content_sync.HASH_FIELD,) if self.sync else ()
+        for field, values in by_field.items():
+            if isinstance(field, tuple):
+                names = field
+                connection = connections[router.db_for_read(self.model)]
+                rows = content_sync.lookup_keys(connection, self.model, field, values, extra)
+            else:
+                names = (field,)
+                qs = self.model._default_manager.filter(**{f'{field}__in': values}).order_by('pk')
+                rows = qs.values_list(field, 'pk', *extra)
+            for row in rows:
+                value = row[:len(names)] if isinstance(field, tuple) else row[0]
+                pk = row[len(names)]
+                if (field, value) not in existing:
+                    existing[(field, value)] = pk
+                    if extra:
+                        self.hashes[pk] = row[-1]
+        return existing
+
+    def write_chunk(self, chunk, copy=True):
+        connection = connections[router.db_for_write(self.model)]
+        # En modo sync se compara antes de escribir: no pasa por COPY
+        if copy and self.use_copy and not self.sync and connection.vendor == 'postgresql':
+            return self.copy_chunk(connection, chunk)
+
+        existing = self.resolve_existing(chunk)
+        to_create = {}
+        to_update = {}
+        seen = []
+        created = updated = 0
+        for parsed in chunk:
+            pk = existing.get(parsed.lookup) if parsed.lookup is not None else None
+            if pk is not None and self.sync:
+                seen.append(pk)
+                if self.hashes.get(pk) == content_sync.content_hash(
+                    parsed.values.get(name) for name in self.hash_fields
+                ):
+                    self.stats.sin_cambios += 1
+                    continue
+            if pk is not None:
+                obj = self.build(parsed.values)
+                obj.pk = pk
+                to_update[pk] = obj
+                updated += 1
+                continue
+            values = parsed.values
+            if parsed.lookup is not None and parsed.lookup[0] in ('id', 'pk'):
+                values = dict(values, pk=parsed.lookup[1])
+            # Una clave repetida dentro del lote cuenta como actualización
+            key = parsed.lookup if parsed.lookup is not None else ('#', parsed.line)
+            if key in to_create:
+                updated += 1
+            else:
+                created += 1
+            to_create[key] = self.build(values)
+
+        created_objs = self.model._default_manager.bulk_create(list(to_create.values()))
+        if to_update:
+            self.model._default_manager.bulk_update(list(to_update.values()), list(self.fields))
+
+        created_pks = [obj.pk for obj in created_objs if obj.pk is not None]
+        if self.prune:
+            content_sync.add_seen(connection, self.model, seen + created_pks)
+        if created_pks:
+            bulk_write.send(sender=self.model, action='create', pks=created_pks)
+        if to_update:
+            bulk_write.send(sender=self.model, action='update', pks=list(to_update))
+
+        self.stats.creadas += created
+        self.stats.actualizadas += updated
+
+    def copy_chunk(self, connection, chunk):
+        """Camino rápido de PostgreSQL: ``COPY`` + upsert set-based."""
+        if not chunk:
+            return
+        created_pks, updated_pks, repetidas = pgcopy.upsert(connection, self.model, self.fields, chunk)
+        if created_pks:
+            bulk_write.send(sender=self.model, action='create', pks=created_pks)
+        if updated_pks:
+            bulk_write.send(sender=self.model, action='update', pks=updated_pks)
+        self.stats.creadas += len(created_pks)
+        self.stats.actualizadas += len(updated_pks) + repetidas
@@ -0,0 +1,184 @@
+"""
+Instrumentación de requests: tiempos, SQL y perfiles de los requests lentos.
+
+``RequestStats`` acumula, mientras está activo, el tiempo y la cantidad de
+consultas de todas las conexiones (vía ``connection.execute_wrapper``),
+agrupadas por forma de SQL (ver ``crud.querybudget.normalize_sql``). El
+middleware ``crud.middleware.InstrumentationMiddleware`` agrega el tiempo
+total y el de render de plantillas, escribe una línea JSON por request y
+arma el encabezado ``Server-Timing``.
+
+``manage.py instrumentation_report`` agrega esas líneas en un ranking de
+vistas y consultas más lentas.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.db import connections
+
+from crud.querybudget import normalize_sql
+
+_write_lock = threading.Lock()
+
+
+class RequestStats:
+    """Consultas y tiempo de base de datos de un request (context manager)."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        # forma -> [cantidad, segundos]
+        self.shapes = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - inicio
+            self.queries += 1
+            self.db_seconds += elapsed
+            shape = self.shapes[normalize_sql(sql)]
+            shape[0] += 1
+            shape[1] += elapsed
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def slowest_queries(self, n):
+        """Las ``n`` formas de SQL con más tiempo acumulado."""
+        ranked = sorted(self.shapes.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {'sql': sql[:500], 'count': count, 'ms': round(seconds * 1000, 3)}
+            for sql, (count, seconds) in ranked[:n]
+        ]
+
+
+def server_timing(total, db, queries, template):
+    """Valor del encabezado ``Server-Timing`` (duraciones en segundos)."""
+    app = max(total - db - template, 0.0)
+    return ', '.join([
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={db * 1000:.1f};desc="{queries} consultas"',
+        f'tpl;dur={template * 1000:.1f}',
+        f'app;dur={app * 1000:.1f}',
+    ])
+
+
+def append_jsonl(path, record):
+    """Agrega ``record`` como una línea JSON al final de ``path``."""
+    line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as fh:
+            fh.write(line)
+
+
+class Profiler:
+    """
+    Perfil de un request con ``cProfile`` o, si está instalado y se pide,
+    ``pyinstrument``.
+    """
+
+    def __init__(self, kind='cprofile'):
+        self.kind = kind
+        if kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler as PyinstrumentProfiler
+            except ImportError:
+                self.kind = 'cprofile'
+            else:
+                self._profiler = PyinstrumentProfiler()
+        if self.kind == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self.kind == 'cprofile':
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+
+    def stop(self):
+        if self.kind == 'cprofile':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+    def dump(self, directory, name):
+        """Guarda el perfil en ``directory``; devuelve la ruta del archivo."""
+        os.makedirs(directory, exist_ok=True)
+        if self.kind == 'cprofile':
+            path = os.path.join(directory, f'{name}.prof')
+            self._profiler.dump_stats(path)
+        else:
+            path = os.path.join(directory, f'{name}.html')
+            with open(path, 'w', encoding='utf-8') as fh:
+                fh.write(self._profiler.output_html())
+        return path
+
+
+def read_stats(path):
+    """Registros de ``path`` (JSONL); las líneas corruptas se ignoran."""
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def aggregate(records):
+    """
+    Agrega los registros por vista y por forma de SQL.
+
+    Devuelve ``(vistas, consultas)``: listas de dicts ordenadas por tiempo
+    total acumulado, de mayor a menor.
+    """
+    by_view = defaultdict(list)
+    by_query = defaultdict(lambda: {'count': 0, 'ms': 0.0, 'views': set()})
+    for record in records:
+        by_view[record['view']].append(record)
+        for query in record.get('top_queries', ()):
+            entry = by_query[query['sql']]
+            entry['count'] += query['count']
+            entry['ms'] += query['ms']
+            entry['views'].add(record['view'])
+
+    views = []
+    for view, rows in by_view.items():
+        totals = [row['total_ms'] for row in rows]
+        views.append({
+            'view': view,
+            'requests': len(rows),
+            'total_ms': sum(totals),
+            'p50_ms': _percentile(totals, 0.5),
+            'p95_ms': _percentile(totals, 0.95),
+            'db_ms': sum(row['db_ms'] for row in rows) / len(rows),
+            'template_ms': sum(row['template_ms'] for row in rows) / len(rows),
+            'queries': sum(row['queries'] for row in rows) / len(rows),
+        })
+    views.sort(key=lambda item: item['total_ms'], reverse=True)
+
+    queries = [
+        {'sql': sql, 'count': entry['count'], 'ms': entry['ms'], 'views': sorted(entry['views'])}
+        for sql, entry in by_query.items()
+    ]
+    queries.sort(key=lambda item: item['ms'], reverse=True)
+    return views, queries
@@ -0,0 +1,197 @@
+import logging
+import os
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from crud import routers
+from crud.instrumentation import Profiler, RequestStats, append_jsonl, server_timing
+from crud.querybudget import QueryBudget, QueryBudgetExceeded
+
+logger = logging.getLogger('crud.querybudget')
+instrumentation_logger = logging.getLogger('crud.instrumentation')
+
+
+class QueryBudgetMiddleware:
+    """
+    Registra (o rechaza) los requests que superan el presupuesto de consultas.
+
+    Se configura con ``settings.QUERY_BUDGET``::
+
+        QUERY_BUDGET = {
+            'MAX_QUERIES': 20,   # consultas por request
+            'MAX_REPEATS': 3,    # veces que se tolera la misma forma de SQL
+            'RAISE': False,      # True: lanza QueryBudgetExceeded (útil en desarrollo/tests)
+        }
+
+    Las vistas que trabajan por lotes (una consulta por lote, a propósito)
+    se excluyen con el atributo de clase ``query_budget_exempt = True``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, 'QUERY_BUDGET', {})
+        self.max_queries = config.get('MAX_QUERIES', 20)
+        self.max_repeats = config.get('MAX_REPEATS', 3)
+        self.raise_errors = config.get('RAISE', False)
+
+    def __call__(self, request):
+        with QueryBudget() as budget:
+            response = self.get_response(request)
+        if getattr(request, '_query_budget_exempt', False):
+            return response
+        problems = budget.violations(self.max_queries, self.max_repeats)
+        if problems:
+            message = f"{request.method} {request.path}: " + '; '.join(problems)
+            if self.raise_errors:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request._query_budget_exempt = getattr(view_class, 'query_budget_exempt', False)
+
+
+class InstrumentationMiddleware:
+    """
+    Mide cada request: tiempo total, tiempo y cantidad de consultas SQL y
+    tiempo de render de plantillas. Agrega el encabezado ``Server-Timing``
+    y escribe una línea JSON por request en ``STATS_FILE``.
+
+    Una fracción ``PROFILE_SAMPLE`` de los requests se ejecuta con
+    profiler; el perfil se guarda en ``PROFILE_DIR`` sólo si el request
+    resultó más lento que ``SLOW_MS``.
+
+    Se configura con ``settings.INSTRUMENTATION``::
+
+        INSTRUMENTATION = {
+            'ENABLED': True,
+            'STATS_FILE': BASE_DIR / 'instrumentation' / 'requests.jsonl',
+            'SERVER_TIMING': True,
+            'SLOW_MS': 500,
+            'PROFILE_SAMPLE': 0.05,
+            'PROFILER': 'cprofile',   # o 'pyinstrument' si está instalado
+            'PROFILE_DIR': BASE_DIR / 'instrumentation' / 'perfiles',
+            'TOP_QUERIES': 5,         # consultas más lentas guardadas por request
+        }
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, 'INSTRUMENTATION', {})
+        self.stats_file = config.get('STATS_FILE')
+        self.server_timing = config.get('SERVER_TIMING', True)
+        self.slow_ms = config.get('SLOW_MS', 500)
+        self.profile_sample = config.get('PROFILE_SAMPLE', 0)
+        self.profiler = config.get('PROFILER', 'cprofile')
+        self.profile_dir = config.get('PROFILE_DIR')
+        self.top_queries = config.get('TOP_QUERIES', 5)
+
+    def __call__(self, request):
+        stats = RequestStats()
+        request._instrumentation = stats
+        profiler = None
+        if self.profile_dir and self.profile_sample and random.random() < self.profile_sample:
+            profiler = Profiler(self.profiler)
+            profiler.start()
+        inicio = time.perf_counter()
+        try:
+            with stats:
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        total = time.perf_counter() - inicio
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = server_timing(
+                total, stats.db_seconds, stats.queries, stats.template_seconds
+            )
+        match = request.resolver_match
+        record = {
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else '-',
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'db_ms': round(stats.db_seconds * 1000, 3),
+            'template_ms': round(stats.template_seconds * 1000, 3),
+            'queries': stats.queries,
+            'top_queries': stats.slowest_queries(self.top_queries),
+        }
+        if profiler is not None and total * 1000 >= self.slow_ms:
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{record['view'].replace(':', '_')}-{os.getpid()}"
+            record['profile'] = profiler.dump(self.profile_dir, name)
+            instrumentation_logger.info("Request lento (%.0f ms), perfil en %s", total * 1000, record['profile'])
+        if self.stats_file:
+            try:
+                append_jsonl(self.stats_file, record)
+            except OSError as e:
+                instrumentation_logger.warning("No se pudo escribir %s: %s", self.stats_file, e)
+        return response
+
+    def process_template_response(self, request, response):
+        # El handler renderiza después de este método: se envuelve el
+        # render para medirlo.
+        stats = getattr(request, '_instrumentation', None)
+        if stats is not None:
+            render = response.render
+
+            def timed_render():
+                inicio = time.perf_counter()
+                try:
+                    return render()
+                finally:
+                    stats.template_seconds += time.perf_counter() - inicio
+
+            response.render = timed_render
+        return response
+
+
+class ReadYourWritesMiddleware:
+    """
+    Fija el primario en los requests que escriben y en los siguientes
+    ``REPLICA_STICKY_SECONDS`` (cookie); elige una réplica por request en
+    los demás.
+    """
+
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _enter(self, request):
+        writes = request.method not in self.safe_methods
+        primary = writes or routers.STICKY_COOKIE in request.COOKIES
+        aliases = routers.replicas()
+        tokens = (
+            routers.force_primary.set(primary),
+            routers.request_replica.set(random.choice(aliases) if aliases and not primary else None),
+        )
+        return writes, tokens
+
+    def _exit(self, response, writes, tokens):
+        routers.force_primary.reset(tokens[0])
+        routers.request_replica.reset(tokens[1])
+        if writes:
+            response.set_cookie(routers.STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        writes, tokens = self._enter(request)
+        return self._exit(self.get_response(request), writes, tokens)
+
+    async def __acall__(self, request):
+        writes, tokens = self._enter(request)
+        return self._exit(await self.get_response(request), writes, tokens)
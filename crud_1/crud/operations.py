@@ -0,0 +1,149 @@
+"""
+Operaciones de migración que no bloquean la tabla.
+
+En PostgreSQL los índices se crean con ``CREATE INDEX CONCURRENTLY``: la
+tabla sigue aceptando escrituras mientras se construye el índice. Las
+migraciones que las usan deben declarar ``atomic = False`` (``CONCURRENTLY``
+no puede ejecutarse dentro de una transacción). En los demás motores se
+comportan como ``AddIndex`` / ``AddConstraint``.
+"""
+import sys
+
+from django.db.migrations.operations import AddConstraint, AddIndex
+from django.db.models import Count, UniqueConstraint
+
+
+def _concurrent(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise ValueError(
+            "Las operaciones CONCURRENTLY no pueden correr en una transacción: "
+            "declarar atomic = False en la migración."
+        )
+    return True
+
+
+class AddIndexConcurrently(AddIndex):
+    """``AddIndex`` con ``CREATE INDEX CONCURRENTLY`` en PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrent(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrent(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+    def describe(self):
+        return f"Create index {self.index.name} concurrently on {self.model_name}"
+
+
+def has_duplicates(connection, model, fields):
+    """Si hay filas de ``model`` repetidas en ``fields`` (la restricción única no podría crearse)."""
+    return model._default_manager.using(connection.alias).values(*fields).annotate(
+        n=Count('pk')).filter(n__gt=1).exists()
+
+
+def add_unique_constraint(schema_editor, model, constraint):
+    """
+    Crea ``constraint``; en PostgreSQL construye primero el índice único con
+    ``CONCURRENTLY`` y después lo adopta como restricción (``ADD CONSTRAINT
+    ... USING INDEX``), que es instantáneo.
+    """
+    if not _concurrent(schema_editor):
+        schema_editor.add_constraint(model, constraint)
+        return
+    quote = schema_editor.quote_name
+    name = quote(constraint.name)
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(model._meta.get_field(f).column) for f in constraint.fields)
+    if constraint.condition is not None:
+        # Las restricciones parciales sólo existen como índice
+        sql = str(constraint.create_sql(model, schema_editor))
+        schema_editor.execute(sql.replace('CREATE UNIQUE INDEX', 'CREATE UNIQUE INDEX CONCURRENTLY', 1))
+        return
+    schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})')
+    schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+
+
+class AddUniqueConstraintConcurrently(AddConstraint):
+    """
+    ``AddConstraint`` para un ``UniqueConstraint`` sobre columnas, creado con
+    ``add_unique_constraint``.
+
+    Con ``skip_if_duplicates`` la migración no falla si ya hay filas
+    repetidas: avisa y no crea la restricción en la base (el estado de la
+    migración sí la incluye), para crearla después de limpiar los datos.
+    ``replaces_index`` es un índice sobre las mismas columnas que se borra
+    al crear la restricción; si se omitió, queda en la base.
+    """
+
+    def __init__(self, model_name, constraint, skip_if_duplicates=False, replaces_index=None):
+        if not isinstance(constraint, UniqueConstraint) or constraint.contains_expressions:
+            raise ValueError("Sólo se admiten UniqueConstraint sobre campos")
+        super().__init__(model_name, constraint)
+        self.skip_if_duplicates = skip_if_duplicates
+        self.replaces_index = replaces_index
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        if self.skip_if_duplicates:
+            kwargs['skip_if_duplicates'] = True
+        if self.replaces_index:
+            kwargs['replaces_index'] = self.replaces_index
+        return name, args, kwargs
+
+    def state_forwards(self, app_label, state):
+        super().state_forwards(app_label, state)
+        if self.replaces_index:
+            state.remove_index(app_label, self.model_name_lower, self.replaces_index.name)
+
+    def state_backwards(self, app_label, state):
+        super().state_backwards(app_label, state)
+        if self.replaces_index:
+            state.add_index(app_label, self.model_name_lower, self.replaces_index)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if self.skip_if_duplicates and has_duplicates(schema_editor.connection, model, self.constraint.fields):
+            sys.stderr.write(
+                f"\n  Aviso: hay filas repetidas en {model._meta.db_table} ({', '.join(self.constraint.fields)}); "
+                f"no se creó la restricción {self.constraint.name}. Limpiar los datos y crearla "
+                f"después (ver la migración).\n"
+            )
+            return
+        add_unique_constraint(schema_editor, model, self.constraint)
+        # SQLite rehace la tabla sólo con los índices del modelo: ya no está
+        if self.replaces_index and index_exists(schema_editor.connection, model, self.replaces_index.name):
+            schema_editor.remove_index(model, self.replaces_index, **_concurrently(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if self.replaces_index and not index_exists(schema_editor.connection, model, self.replaces_index.name):
+            schema_editor.add_index(model, self.replaces_index, **_concurrently(schema_editor))
+        if index_exists(schema_editor.connection, model, self.constraint.name):
+            schema_editor.remove_constraint(model, self.constraint)
+
+    def describe(self):
+        return f"Create unique constraint {self.constraint.name} concurrently on {self.model_name}"
+
+
+def _concurrently(schema_editor):
+    return {'concurrently': True} if _concurrent(schema_editor) else {}
+
+
+def index_exists(connection, model, name):
+    """Si la tabla de ``model`` tiene un índice o una restricción ``name``."""
+    with connection.cursor() as cursor:
+        return name in connection.introspection.get_constraints(cursor, model._meta.db_table)
@@ -0,0 +1,274 @@
+"""
+Paginación por cursor (keyset / seek) para los ListView del proyecto.
+
+En lugar de ``OFFSET`` + ``COUNT(*)`` se pagina sobre un orden estable
+(por ejemplo ``(apellido, nombre, id)``) y cada página se pide con un
+token opaco ``?after=`` (o ``?before=``) que codifica la clave de la
+última (o primera) fila mostrada. El costo de una página es el mismo sin
+importar cuán profunda sea, siempre que exista un índice compuesto que
+cubra el orden.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections, router
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.functional import cached_property
+
+
+def encode_cursor(values):
+    """Codifica una tupla de valores de orden en un token opaco."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Decodifica un token generado por ``encode_cursor``; ValueError si es inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Cursor inválido')
+    return values
+
+
+def clean_cursor(model, ordering, values):
+    """
+    Valida los valores de un cursor contra los campos de ``ordering`` en
+    ``model`` y los devuelve convertidos; ValueError si alguno no corresponde
+    (un token adulterado no debe llegar al ``filter()`` ni a la base).
+    """
+    cleaned = []
+    for path, value in zip(ordering, values):
+        field = _resolve_field(model, path)
+        if value is None and field.null:
+            cleaned.append(None)
+            continue
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError('Cursor inválido')
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except ValidationError:
+            raise ValueError('Cursor inválido')
+        cleaned.append(value)
+    return cleaned
+
+
+def _resolve_field(model, path):
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def keyset_filter(fields, values, reverse=False):
+    """
+    Construye el ``Q`` equivalente a ``(f1, f2, ...) > (v1, v2, ...)``.
+
+    Se expande como ``f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...`` porque no
+    todos los motores optimizan la comparación de tuplas.
+    """
+    lookup = 'lt' if reverse else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        branch = Q(**{f'{field}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            branch &= Q(**{prev_field: prev_value})
+        condition |= branch
+    return condition
+
+
+def approximate_count(model, using=None):
+    """
+    Total aproximado de filas de ``model`` sin recorrer la tabla.
+
+    En PostgreSQL usa las estadísticas del planificador (``reltuples``); en
+    SQLite usa ``MAX(rowid)``, que se resuelve con el árbol de la clave
+    primaria. Devuelve None si el motor no ofrece una estimación barata.
+    """
+    connection = connections[using or router.db_for_read(model)]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+            return None
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            row = cursor.fetchone()
+            return row[0] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    ``Paginator`` que, para el queryset sin filtrar de una tabla grande,
+    usa ``approximate_count`` en lugar de ``COUNT(*)`` (p. ej. en el admin).
+    Con filtros, o si la estimación es menor que ``exact_below``, cuenta
+    exacto.
+    """
+
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = approximate_count(queryset.model, using=queryset.db)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+        return super().count
+
+
+class KeysetPage:
+    """Página de resultados obtenida por cursor."""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _keyset_query(queryset, ordering, page_size, after, before):
+    backwards = before is not None and after is None
+    token = before if backwards else after
+    qs = queryset
+    if token:
+        try:
+            values = clean_cursor(queryset.model, ordering, decode_cursor(token, len(ordering)))
+        except ValueError:
+            raise Http404('Cursor inválido')
+        qs = qs.filter(keyset_filter(ordering, values, reverse=backwards))
+    order_by = [f'-{field}' for field in ordering] if backwards else ordering
+    return qs.order_by(*order_by)[:page_size + 1], backwards, token
+
+
+def _keyset_page(rows, ordering, page_size, backwards, token):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(obj):
+        return encode_cursor(_ordering_values(obj, ordering))
+
+    if backwards:
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, bool(token)
+
+    return KeysetPage(
+        rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=cursor_for(rows[-1]) if rows else None,
+        previous_cursor=cursor_for(rows[0]) if rows else None,
+    )
+
+
+def keyset_paginate(queryset, ordering, page_size, after=None, before=None):
+    """
+    Devuelve un ``KeysetPage`` de ``queryset`` ordenado por ``ordering``.
+
+    ``ordering`` debe ser único (terminar en la clave primaria) para que el
+    orden sea estable. Se lee una fila de más para saber si hay otra página.
+    """
+    ordering = list(ordering)
+    qs, backwards, token = _keyset_query(queryset, ordering, page_size, after, before)
+    return _keyset_page(list(qs), ordering, page_size, backwards, token)
+
+
+async def akeyset_paginate(queryset, ordering, page_size, after=None, before=None):
+    """Variante async de ``keyset_paginate`` (ORM async)."""
+    ordering = list(ordering)
+    qs, backwards, token = _keyset_query(queryset, ordering, page_size, after, before)
+    rows = [obj async for obj in qs]
+    return _keyset_page(rows, ordering, page_size, backwards, token)
+
+
+async def apaginate(queryset, per_page, number):
+    """
+    Equivalente async de ``Paginator(queryset, per_page).get_page(number)``:
+    el total se obtiene con ``acount()`` y la página con iteración async.
+    """
+    total = await queryset.acount()
+    paginator = Paginator(_Counted(total), per_page)
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+    bottom = (number - 1) * per_page
+    rows = [obj async for obj in queryset[bottom:bottom + per_page]]
+    return Page(rows, number, paginator)
+
+
+class _Counted:
+    """Lista "vacía" con un total conocido, para construir un ``Paginator``."""
+
+    def __init__(self, total):
+        self.total = total
+
+    def count(self):
+        return self.total
+
+
+def _ordering_values(obj, ordering):
+    values = []
+    for field in ordering:
+        value = obj
+        for part in field.split('__'):
+            value = value[part] if isinstance(value, dict) else getattr(value, part)
+        if not isinstance(value, (str, int, float, bool, type(None))):
+            value = str(value)
+        values.append(value)
+    return values
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin para ``ListView`` que reemplaza la paginación por ``?page=`` con
+    cursores ``?after=`` / ``?before=``.
+
+    Atributos:
+        keyset_ordering: campos del orden estable (el último debe ser único).
+        paginate_by: tamaño de página.
+        keyset_approximate_count: si es True agrega ``total_aproximado`` al
+            contexto usando ``approximate_count``.
+    """
+
+    keyset_ordering = ('id',)
+    keyset_approximate_count = False
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(
+            queryset,
+            self.keyset_ordering,
+            page_size,
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return (None, page, page.object_list, page.has_next or page.has_previous)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.keyset_approximate_count:
+            context['total_aproximado'] = approximate_count(self.model)
+        return context
@@ -0,0 +1,81 @@
+"""
+Presupuesto de consultas SQL por request o por bloque de código.
+
+``QueryBudget`` registra las consultas ejecutadas (vía
+``connection.execute_wrapper``) y agrupa las que tienen la misma "forma"
+(el SQL con los literales reemplazados por ``?``). Una misma forma repetida
+muchas veces es la firma típica de un N+1.
+
+Uso en tests::
+
+    with query_budget(max_queries=3, max_repeats=1):
+        client.get('/persona/detalle/1/')
+
+Para requests, ver ``crud.middleware.QueryBudgetMiddleware``.
+"""
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Devuelve la forma de ``sql``: sin literales y con las listas ``IN`` colapsadas."""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _IN_LIST_RE.sub('(...)', shape)
+    return _SPACES_RE.sub(' ', shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Se superó el presupuesto de consultas."""
+
+
+class QueryBudget:
+    """Cuenta las consultas de una conexión mientras está activo (context manager)."""
+
+    def __init__(self, using='default'):
+        self.connection = connections[using]
+        self.count = 0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.shapes[normalize_sql(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def violations(self, max_queries=None, max_repeats=None):
+        """Lista de problemas encontrados respecto de los límites dados."""
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} consultas (máximo {max_queries})")
+        if max_repeats is not None:
+            for shape, n in self.shapes.most_common():
+                if n <= max_repeats:
+                    break
+                problems.append(f"{n}x la misma consulta (máximo {max_repeats}): {shape[:200]}")
+        return problems
+
+
+@contextmanager
+def query_budget(max_queries=None, max_repeats=None, using='default'):
+    """Falla con ``QueryBudgetExceeded`` si el bloque supera los límites."""
+    with QueryBudget(using) as budget:
+        yield budget
+    problems = budget.violations(max_queries, max_repeats)
+    if problems:
+        raise QueryBudgetExceeded('; '.join(problems))
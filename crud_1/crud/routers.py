@@ -0,0 +1,63 @@
+"""
+Réplicas de lectura.
+
+``PrimaryReplicaRouter`` manda las lecturas de Persona y Oficina a una de
+las réplicas (los alias ``replica*`` de ``DATABASES``) y todo lo demás
+—escrituras, sesiones, usuarios, contadores— al primario (``default``).
+
+Para leer lo que uno mismo acaba de escribir,
+``crud.middleware.ReadYourWritesMiddleware``
+fija el primario durante los requests que escriben (POST, PUT, ...) y,
+con una cookie, durante los ``REPLICA_STICKY_SECONDS`` siguientes. El
+código que lee para después escribir (importadores, conciliaciones) usa
+``use_primary()``.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+REPLICATED_APPS = {'persona', 'oficina'}
+STICKY_COOKIE = 'leer_primario'
+
+force_primary = ContextVar('force_primary', default=False)
+# Réplica elegida para el request en curso
+request_replica = ContextVar('request_replica', default=None)
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+@contextmanager
+def use_primary():
+    """Dentro del bloque todas las lecturas van al primario."""
+    token = force_primary.set(True)
+    try:
+        yield
+    finally:
+        force_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICATED_APPS or force_primary.get():
+            return PRIMARY
+        aliases = replicas()
+        if not aliases:
+            return PRIMARY
+        # Una misma réplica durante todo el request (totales y páginas coherentes)
+        return request_replica.get() or random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        return db == PRIMARY
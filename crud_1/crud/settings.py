@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'crud',
     'persona',
     'oficina',
     'accounts',
@@ -49,6 +51,8 @@ INSTALLED_APPS = [
     'allauth',
     'allauth.account',
     'home', 
+    'tareas',
+    'reportes',
 ]
 
 
@@ -63,12 +67,51 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Presupuesto de consultas por request (ver crud/middleware.py). En
+# desarrollo se registra un warning cuando un request lo supera.
+QUERY_BUDGET = {
+    'MAX_QUERIES': 20,
+    'MAX_REPEATS': 3,
+    'RAISE': False,
+}
+
+# Vistas de lectura async (ORM async) para servir con ASGI: ASYNC_VIEWS=1
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '') == '1'
+
+# El middleware de presupuesto es síncrono: con vistas async forzaría a
+# ejecutarlas en un hilo, por eso sólo se activa en modo síncrono.
+if DEBUG and not ASYNC_VIEWS:
+    MIDDLEWARE.append('crud.middleware.QueryBudgetMiddleware')
+
+# Instrumentación opt-in (ver crud/middleware.py): INSTRUMENTATION=1. Los
+# registros se analizan con "manage.py instrumentation_report".
+INSTRUMENTATION = {
+    'ENABLED': os.environ.get('INSTRUMENTATION', '') == '1',
+    'STATS_FILE': BASE_DIR / 'instrumentation' / 'requests.jsonl',
+    'SERVER_TIMING': True,
+    'SLOW_MS': 500,
+    'PROFILE_SAMPLE': float(os.environ.get('INSTRUMENTATION_PROFILE_SAMPLE', '0.05')),
+    'PROFILER': os.environ.get('INSTRUMENTATION_PROFILER', 'cprofile'),
+    'PROFILE_DIR': BASE_DIR / 'instrumentation' / 'perfiles',
+    'TOP_QUERIES': 5,
+}
+
+# Va primero para medir el request completo; es síncrono, igual que el
+# presupuesto de consultas.
+if INSTRUMENTATION['ENABLED'] and not ASYNC_VIEWS:
+    MIDDLEWARE.insert(0, 'crud.middleware.InstrumentationMiddleware')
+
 ROOT_URLCONF = 'crud.urls'
 
+# Plantillas. Con TEMPLATE_PROFILE=production se declara el loader
+# cacheado (cada plantilla se compila una sola vez por proceso, sin
+# revisar el disco) y se apaga la información de depuración.
+TEMPLATE_PROFILE = os.environ.get('TEMPLATE_PROFILE', 'development')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': ['templates'],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -80,18 +123,143 @@ TEMPLATES = [
     },
 ]
 
+if TEMPLATE_PROFILE == 'production':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS'].update({
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    })
+
 WSGI_APPLICATION = 'crud.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (por defecto) o postgresql. PostgreSQL se configura con
+# DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT y usa el pool de
+# conexiones de psycopg (DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE; DB_POOL=0 lo
+# desactiva y usa conexiones persistentes). Requiere
+# requirements-postgresql.txt. Los tests usan la base DB_TEST_NAME en el
+# mismo servidor (los que dependen del motor se saltean en el otro):
+#   DB_ENGINE=postgresql DB_PASSWORD=... python manage.py test
+#
+# DATABASE_PROFILE=production (SQLite) activa WAL y los PRAGMA de
+# crud/sqlite.py, conexiones persistentes y transacciones IMMEDIATE (el
+# escritor toma el lock al empezar, así el timeout de la conexión espera en
+# vez de fallar con "database is locked").
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'development')
+
+SQLITE_PRAGMAS = {}
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'crud'),
+            'USER': os.environ.get('DB_USER', 'crud'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+            'TEST': {'NAME': os.environ.get('DB_TEST_NAME', 'test_crud')},
+        }
     }
+    if os.environ.get('DB_POOL', '1') == '1':
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': 10,
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = 600
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+    if DATABASE_PROFILE == 'production':
+        from crud.sqlite import PRODUCTION_OPTIONS, PRODUCTION_PRAGMAS
+
+        SQLITE_PRAGMAS = PRODUCTION_PRAGMAS
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': dict(PRODUCTION_OPTIONS),
+        })
+
+# Réplicas de lectura (ver crud/routers.py): DB_REPLICAS es una lista
+# separada por comas de hosts (PostgreSQL) o de archivos (SQLite; se
+# sincronizan con "manage.py sync_replicas").
+#
+# En los tests con SQLite el primario y cada réplica son dos archivos
+# distintos (test_<archivo>): la réplica sólo ve lo que se le copia con
+# sync_replicas, como una réplica atrasada. Los tests de crud/tests.py que
+# la necesitan corren sólo así (el resto de los tests asume una sola base):
+#   DB_REPLICAS=db_replica.sqlite3 python manage.py test crud
+# Con PostgreSQL la replicación es del servidor y en los tests cada réplica
+# espeja la base de prueba del primario.
+DB_REPLICAS = [value.strip() for value in os.environ.get('DB_REPLICAS', '').split(',') if value.strip()]
+for i, value in enumerate(DB_REPLICAS, 1):
+    replica = dict(DATABASES['default'])
+    if DB_ENGINE == 'postgresql':
+        replica.update(HOST=value, TEST={'MIRROR': 'default'})
+    else:
+        replica.update(NAME=BASE_DIR / value, TEST={'NAME': BASE_DIR / f'test_{value}'})
+    DATABASES[f'replica{i}'] = replica
+if DB_REPLICAS and DB_ENGINE != 'postgresql':
+    # Un archivo también para el primario: sync_replicas lo copia entero
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+
+DATABASE_ROUTERS = ['crud.routers.PrimaryReplicaRouter']
+# Segundos que un cliente sigue leyendo del primario después de escribir
+REPLICA_STICKY_SECONDS = 10
+if DB_REPLICAS:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+        'crud.middleware.ReadYourWritesMiddleware',
+    )
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND=locmem|file|redis. Con varios procesos usar file o redis
+# para que compartan las versiones de las claves (ver crud/cache.py).
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'crud'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')]
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_LOCATION),
+    },
+    # Filas renderizadas de las listas ({% cache ... using="fragmentos" %}):
+    # aparte, para que miles de fragmentos no desalojen páginas y versiones
+    'fragmentos': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_LOCATION),
+        'KEY_PREFIX': 'fragmentos',
+        'TIMEOUT': 600,
+    },
 }
+if CACHE_BACKEND != CACHE_BACKENDS['redis'][0]:
+    # locmem y archivo: almacén propio con lugar para páginas de 1000 filas
+    CACHES['fragmentos']['LOCATION'] = f"{CACHES['default']['LOCATION']}-fragmentos"
+    CACHES['fragmentos']['OPTIONS'] = {'MAX_ENTRIES': 20000}
 
 
 # Password validation
@@ -130,6 +298,20 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Archivos subidos (CSV de las tareas) y resultados de exportaciones
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Cola de tareas en segundo plano (ver tareas/worker.py)
+TAREAS = {
+    'POLL_SECONDS': 2,       # espera del worker con la cola vacía
+    'STALE_SECONDS': 300,    # sin latido por más tiempo: el worker se cayó, otro la retoma
+    'HEARTBEAT_SECONDS': 30,  # latido de la tarea en curso (hilo aparte, aun en medio de un lote)
+    'MAX_ARCHIVO_MB': 200,   # tamaño máximo del CSV de una importación
+    'MAX_INTENTOS': 3,
+    'MAX_ERRORES': 50,       # errores de fila que se guardan en la tarea
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,20 @@
+"""
+Señales propias del proyecto.
+
+``bulk_write`` se envía desde las operaciones masivas (importadores,
+deduplicación, ediciones por lote) que no disparan ``post_save`` /
+``post_delete`` por fila, para que los índices y contadores derivados se
+puedan actualizar por lote.
+
+Argumentos:
+    sender: la clase del modelo afectado.
+    action: 'create', 'update' o 'delete'.
+    pks: lista de claves primarias afectadas. Para 'delete' la señal se
+        envía *antes* de borrar, dentro de la misma transacción, así los
+        receptores todavía pueden leer las filas.
+    oficina_ids: (opcional, sólo Persona) oficinas afectadas por un
+        'update' que cambia la oficina, para recontar sus contadores.
+"""
+from django.dispatch import Signal
+
+bulk_write = Signal()
@@ -0,0 +1,41 @@
+"""
+Ajustes de SQLite para producción.
+
+Al abrirse cada conexión SQLite se aplican los ``PRAGMA`` de
+``settings.SQLITE_PRAGMAS`` (receptor de ``connection_created``,
+registrado desde ``crud.apps``). Con ``journal_mode=WAL`` los lectores no
+se bloquean mientras una importación escribe. La espera por el lock es la
+opción ``timeout`` de la conexión (``PRODUCTION_OPTIONS``): el driver ya la
+aplica como busy timeout, así los escritores concurrentes esperan en lugar
+de fallar con "database is locked".
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Perfil de producción (ver DATABASE_PROFILE en settings)
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',       # seguro con WAL; fsync sólo en checkpoints
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,      # negativo: KiB (64 MiB)
+    'temp_store': 'MEMORY',
+}
+# OPTIONS de la conexión: IMMEDIATE toma el lock de escritura al empezar la
+# transacción; timeout (segundos) es el busy timeout de sqlite3.
+PRODUCTION_OPTIONS = {'transaction_mode': 'IMMEDIATE', 'timeout': 5}
+
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if pragmas:
+        apply_pragmas(connection, pragmas)
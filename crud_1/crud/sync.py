@@ -0,0 +1,127 @@
+"""
+Sincronización incremental de CSV (modo ``sync`` de ``CSVImporter``).
+
+Cada modelo sincronizable guarda en ``contenido_hash`` el MD5 de los
+campos que escribe el importador. Es una columna generada por la base
+(``GeneratedField``), así se mantiene al día sin importar por dónde se
+escriba la fila (formularios, API, ``update()``). El importador calcula el
+mismo hash en Python para cada fila del CSV y, si coincide con el guardado,
+no la escribe.
+
+Para podar (borrar lo que ya no está en el archivo) los ids vistos durante
+la importación se guardan en una tabla temporal y al final se borran, por
+lotes, los registros que no aparecen en ella.
+"""
+import hashlib
+
+from django.db import models
+from django.db.models.functions import MD5, Cast, Concat
+
+HASH_FIELD = 'contenido_hash'
+# Separa los campos (no aparece en texto normal): ('a b', 'c') != ('a', 'b c')
+SEPARATOR = '\x1f'
+
+
+def content_hash(values):
+    """MD5 de ``values`` tal como lo calcula ``hash_expression`` en la base."""
+    text = SEPARATOR.join('' if value is None else str(value) for value in values)
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def hash_expression(*fields):
+    """Expresión SQL equivalente a ``content_hash`` (NULL cuenta como '')."""
+    parts = []
+    for name in fields:
+        if parts:
+            parts.append(models.Value(SEPARATOR))
+        parts.append(Cast(name, models.TextField()))
+    return MD5(Concat(*parts, output_field=models.TextField()))
+
+
+def hash_field(*fields):
+    return models.GeneratedField(
+        expression=hash_expression(*fields),
+        output_field=models.CharField(max_length=32),
+        db_persist=True,
+    )
+
+
+def lookup_keys(connection, model, fields, keys, extra=()):
+    """
+    Filas ``(*fields, pk, *extra)`` de ``model`` cuyos ``fields`` coinciden
+    con alguna tupla de ``keys`` (clave compuesta). Es un ``JOIN`` contra una
+    lista ``VALUES``, que el motor resuelve con una búsqueda en el índice de
+    la clave por cada tupla; con un ``IN`` por columna haría el producto
+    cartesiano de las listas.
+    """
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name) for name in fields]
+    selected = ', '.join(
+        f'm.{quote(f.column)}'
+        for f in (*columns, model._meta.pk, *(model._meta.get_field(name) for name in extra))
+    )
+    on = ' AND '.join(f'm.{quote(f.column)} = v.column{i}' for i, f in enumerate(columns, 1))
+    row = '(' + ', '.join(f'CAST(%s AS {f.db_type(connection)})' for f in columns) + ')'
+    size = (connection.features.max_query_params or 30000) // len(fields)
+    keys = list(keys)
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), size):
+            batch = keys[start:start + size]
+            cursor.execute(
+                f'SELECT {selected} FROM (VALUES {", ".join([row] * len(batch))}) v '
+                f'JOIN {quote(model._meta.db_table)} m ON {on} ORDER BY m.{quote(model._meta.pk.column)}',
+                [value for key in batch for value in key],
+            )
+            yield from cursor.fetchall()
+
+
+# --- Poda ----------------------------------------------------------------
+
+def seen_table(model):
+    return f'{model._meta.db_table}_sync_vistos'
+
+
+def create_seen(connection, model):
+    table = connection.ops.quote_name(seen_table(model))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute(f'CREATE TEMPORARY TABLE {table} (pk bigint PRIMARY KEY)')
+
+
+def add_seen(connection, model, pks):
+    if not pks:
+        return
+    table = connection.ops.quote_name(seen_table(model))
+    with connection.cursor() as cursor:
+        # Un id puede repetirse (misma clave en dos lotes)
+        cursor.executemany(
+            f'INSERT INTO {table} (pk) SELECT %s WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE pk = %s)',
+            [(pk, pk) for pk in pks],
+        )
+
+
+def unseen_batches(connection, model, batch_size=1000):
+    """Produce listas de ids del modelo que no se vieron, en orden."""
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    pk = quote(model._meta.pk.column)
+    seen = quote(seen_table(model))
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {pk} FROM {table} t WHERE {pk} > %s '
+                f'AND NOT EXISTS (SELECT 1 FROM {seen} s WHERE s.pk = t.{pk}) '
+                f'ORDER BY {pk} LIMIT %s',
+                [last_id, batch_size],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def drop_seen(connection, model):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(seen_table(model))}')
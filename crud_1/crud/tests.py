@@ -0,0 +1,325 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections, router
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.views import View
+
+from crud import benchmark, instrumentation, routers, sqlite
+from crud.cache import CachedResponseMixin, bump
+from crud.middleware import ReadYourWritesMiddleware
+from oficina.models import Oficina
+from persona.models import Persona
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(routers, 'replicas', return_value=['replica1'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lecturas_replicadas_y_escrituras(self):
+        self.assertEqual(router.db_for_read(Persona), 'replica1')
+        self.assertEqual(router.db_for_read(Oficina), 'replica1')
+        self.assertEqual(router.db_for_read(User), routers.PRIMARY)
+        self.assertEqual(router.db_for_write(Persona), routers.PRIMARY)
+
+    def test_use_primary(self):
+        with routers.use_primary():
+            self.assertEqual(router.db_for_read(Persona), routers.PRIMARY)
+        self.assertEqual(router.db_for_read(Persona), 'replica1')
+
+    def test_middleware_fija_el_primario_al_escribir(self):
+        vistas = []
+
+        def get_response(request):
+            vistas.append(router.db_for_read(Persona))
+            return HttpResponse()
+
+        middleware = ReadYourWritesMiddleware(get_response)
+        factory = RequestFactory()
+        response = middleware(factory.post('/'))
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[routers.STICKY_COOKIE] = '1'
+        middleware(request)
+        middleware(factory.get('/'))
+        self.assertEqual(vistas, [routers.PRIMARY, routers.PRIMARY, 'replica1'])
+
+    def test_cache_se_llena_desde_el_primario(self):
+        lecturas = []
+
+        class Vista(CachedResponseMixin, View):
+            cache_models = (Persona,)
+
+            def get(self, request):
+                lecturas.append(('vista', router.db_for_read(Persona)))
+                template = engines['django'].from_string('{{ sonda }}')
+                return TemplateResponse(request, template, {
+                    'sonda': lambda: lecturas.append(('render', router.db_for_read(Persona))),
+                })
+
+        cache.clear()
+        request = RequestFactory().get('/')
+        request.user = mock.Mock(is_authenticated=False)
+        Vista.as_view()(request).render()
+        self.assertEqual(lecturas, [('vista', routers.PRIMARY), ('render', routers.PRIMARY)])
+
+
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.stats_file = os.path.join(tmp.name, 'requests.jsonl')
+        self.profile_dir = os.path.join(tmp.name, 'perfiles')
+        Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+
+    def instrumented(self, **config):
+        config = {'ENABLED': True, 'STATS_FILE': self.stats_file, 'PROFILE_SAMPLE': 0, **config}
+        return override_settings(
+            MIDDLEWARE=['crud.middleware.InstrumentationMiddleware', *settings.MIDDLEWARE],
+            INSTRUMENTATION=config,
+        )
+
+    def get(self, path):
+        # Cliente nuevo: el handler arma la cadena de middlewares una sola vez
+        return self.client_class().get(path)
+
+    def records(self):
+        return list(instrumentation.read_stats(self.stats_file))
+
+    def test_server_timing_y_registro(self):
+        with self.instrumented():
+            response = self.get('/')
+        self.assertEqual(response.status_code, 200)
+        metricas = [part.split(';')[0] for part in response['Server-Timing'].split(', ')]
+        self.assertEqual(metricas, ['total', 'db', 'tpl', 'app'])
+
+        [record] = self.records()
+        self.assertEqual(set(record), {'ts', 'method', 'path', 'view', 'status', 'total_ms', 'db_ms',
+                                       'template_ms', 'queries', 'top_queries'})
+        self.assertEqual((record['method'], record['path'], record['view'], record['status']),
+                         ('GET', '/', 'home', 200))
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['db_ms'] + record['template_ms'])
+        self.assertIn(f"{record['queries']} consultas", response['Server-Timing'])
+        for query in record['top_queries']:
+            self.assertEqual(set(query), {'sql', 'count', 'ms'})
+        self.assertEqual(sum(q['count'] for q in record['top_queries']), record['queries'])
+
+    def test_sin_instrumentacion(self):
+        response = self.client.get('/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertFalse(os.path.exists(self.stats_file))
+        with self.instrumented(SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.get('/'))
+        self.assertEqual(len(self.records()), 1)
+
+    def test_perfil_de_requests_lentos(self):
+        with self.instrumented(PROFILE_SAMPLE=1, SLOW_MS=0, PROFILE_DIR=self.profile_dir):
+            self.get('/')
+        [record] = self.records()
+        self.assertTrue(record['profile'].endswith('-home-%d.prof' % os.getpid()))
+        self.assertTrue(os.path.exists(record['profile']))
+
+
+class InstrumentationReportTests(SimpleTestCase):
+
+    def record(self, view, total_ms, queries=()):
+        return {'view': view, 'total_ms': total_ms, 'db_ms': total_ms / 2, 'template_ms': 1.0,
+                'queries': len(queries), 'top_queries': [{'sql': sql, 'count': 1, 'ms': ms} for sql, ms in queries]}
+
+    def records(self):
+        lista = [self.record('persona:lista', ms, [('SELECT persona', ms / 2)]) for ms in range(10, 101, 10)]
+        lista.append(self.record('home', 5.0, [('SELECT persona', 1.0), ('SELECT contador', 2.0)]))
+        return lista
+
+    def test_percentiles_y_ranking(self):
+        vistas, consultas = instrumentation.aggregate(self.records())
+        self.assertEqual([v['view'] for v in vistas], ['persona:lista', 'home'])
+        lista = vistas[0]
+        self.assertEqual((lista['requests'], lista['total_ms']), (10, 550))
+        self.assertEqual((lista['p50_ms'], lista['p95_ms']), (60, 100))
+        self.assertEqual((lista['db_ms'], lista['template_ms'], lista['queries']), (27.5, 1.0, 1))
+        self.assertEqual(vistas[1]['p50_ms'], 5.0)
+        self.assertEqual(consultas[0], {'sql': 'SELECT persona', 'count': 11, 'ms': 276.0,
+                                        'views': ['home', 'persona:lista']})
+        self.assertEqual(consultas[1]['sql'], 'SELECT contador')
+
+    def test_comando(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'requests.jsonl')
+            with open(path, 'w', encoding='utf-8') as fh:
+                for record in self.records():
+                    fh.write(json.dumps(record) + '\n')
+                fh.write('{"línea cortada\n')
+            out = io.StringIO()
+            call_command('instrumentation_report', '--file', path, '--top', '1', stdout=out)
+        lineas = out.getvalue().splitlines()
+        self.assertEqual(len(lineas), 5)
+        self.assertIn('Vistas más lentas (tiempo acumulado, top 1)', lineas[0])
+        self.assertRegex(lineas[1], r'^persona:lista\s+10 req  total\s+0.55s  p50\s+60.0ms  p95\s+100.0ms')
+        self.assertIn('Consultas más lentas', lineas[2])
+        self.assertRegex(lineas[3], r'^\s+276.0ms\s+11x  home, persona:lista$')
+        self.assertEqual(lineas[4].strip(), 'SELECT persona')
+
+        with self.assertRaisesMessage(CommandError, 'No se pudo leer el archivo'):
+            call_command('instrumentation_report', '--file', os.path.join(tmp, 'no-existe.jsonl'))
+
+
+class CachedResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.llamadas = 0
+
+        class Vista(CachedResponseMixin, View):
+            cache_models = (Persona,)
+
+            def get(vista, request):
+                self.llamadas += 1
+                return JsonResponse({'n': self.llamadas}, headers={'Content-Language': 'es'})
+
+        self.view = Vista.as_view()
+
+    def get(self, **headers):
+        request = RequestFactory().get('/', headers=headers)
+        request.user = mock.Mock(is_authenticated=False)
+        return self.view(request)
+
+    def test_el_acierto_conserva_los_encabezados(self):
+        primera, segunda = self.get(), self.get()
+        self.assertEqual(self.llamadas, 1)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['Content-Type'], 'application/json')
+        self.assertEqual(segunda['Content-Language'], 'es')
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+
+    def test_get_condicional(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump(Persona)
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.llamadas, 2)
+
+
+@skipUnless(connections['default'].vendor == 'sqlite', "específico de SQLite")
+class SQLitePragmaTests(TestCase):
+
+    def test_receptor_registrado_por_crud(self):
+        self.assertEqual(apps.get_app_config('crud').name, 'crud')
+        receptores = [receiver[1]() for receiver in connection_created.receivers]
+        self.assertIn(sqlite.configure_sqlite, receptores)
+
+    def test_pragmas_al_conectar(self):
+        nueva = connections.create_connection('default')
+        self.addCleanup(nueva.close)
+        with override_settings(SQLITE_PRAGMAS={'cache_size': -1234}):
+            with nueva.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size')
+                self.assertEqual(cursor.fetchone()[0], -1234)
+
+    def test_un_solo_timeout(self):
+        # La espera por el lock es la opción timeout; no se repite como PRAGMA
+        self.assertNotIn('busy_timeout', sqlite.PRODUCTION_PRAGMAS)
+        self.assertEqual(sqlite.PRODUCTION_OPTIONS['timeout'], 5)
+
+
+class ConcurrencyReadTests(SimpleTestCase):
+
+    def cliente(self, *respuestas):
+        return mock.Mock(get=mock.Mock(side_effect=respuestas))
+
+    def test_cuenta_la_espera_por_el_lock(self):
+        bloqueada = OperationalError('database is locked')
+        client = self.cliente(bloqueada, bloqueada, mock.Mock(status_code=200))
+        latencia, espera, ok = benchmark._timed_get(client, '/', lock_timeout=5)
+        self.assertTrue(ok)
+        self.assertEqual(client.get.call_count, 3)
+        self.assertGreater(espera, 0)
+        self.assertGreaterEqual(latencia, espera)
+        self.assertEqual(benchmark._timed_get(self.cliente(mock.Mock(status_code=200)), '/', 5)[1:], (0, True))
+
+    def test_falla_al_agotar_la_espera(self):
+        client = mock.Mock(get=mock.Mock(side_effect=OperationalError('database is locked')))
+        latencia, espera, ok = benchmark._timed_get(client, '/', lock_timeout=0.01)
+        self.assertFalse(ok)
+        self.assertGreaterEqual(latencia, 0.01)
+        self.assertFalse(benchmark._timed_get(self.cliente(OperationalError('disk I/O error')), '/', 5)[2])
+
+
+@skipUnless(routers.replicas() and connections['default'].vendor == 'sqlite',
+            "requiere DB_REPLICAS=<archivo> con SQLite (ver crud/settings.py)")
+class SQLiteReplicaTests(TransactionTestCase):
+    """Primario y réplica en dos archivos SQLite; la réplica se atrasa hasta ``sync_replicas``."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        self.user = User.objects.create_user('admin', password='clave-de-prueba')
+        self.sync()
+
+    def sync(self):
+        call_command('sync_replicas', stdout=io.StringIO())
+
+    def test_lee_de_la_replica_hasta_sincronizar(self):
+        nueva = Oficina.objects.create(nombre='Norte', nombre_corto='NOR')
+        self.assertFalse(Oficina.objects.filter(pk=nueva.pk).exists())
+        with routers.use_primary():
+            self.assertTrue(Oficina.objects.filter(pk=nueva.pk).exists())
+        self.sync()
+        self.assertTrue(Oficina.objects.filter(pk=nueva.pk).exists())
+
+    def test_lee_lo_propio_despues_de_escribir(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/persona/crear/', {
+            'nombre': 'José', 'apellido': 'Pérez', 'edad': 30, 'oficina': self.oficina.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+        with routers.use_primary():
+            persona = Persona.objects.get()
+        # Quien escribió lee del primario (cookie); otro cliente, de la réplica
+        self.assertEqual(self.client.get(f'/persona/detalle/{persona.pk}/').status_code, 200)
+        otro = self.client_class()
+        otro.force_login(self.user)
+        self.assertEqual(otro.get(f'/persona/detalle/{persona.pk}/').status_code, 404)
+
+    def test_indice_de_busqueda_en_el_primario(self):
+        persona = Persona.objects.create(nombre='José', apellido='Pérez', edad=30, oficina=self.oficina)
+        sql = 'SELECT COUNT(*) FROM persona_persona_fts WHERE rowid = %s'
+        for alias, esperado in ((routers.PRIMARY, 1), ('replica1', 0)):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(sql, [persona.pk])
+                self.assertEqual(cursor.fetchone()[0], esperado, alias)
+
+    def test_cache_no_guarda_lo_de_una_replica_atrasada(self):
+        url = f'/oficina/detalle/{self.oficina.pk}/'
+        self.assertContains(self.client.get(url), 'Central')
+        self.oficina.nombre = 'Central renovada'
+        self.oficina.save()  # renueva la versión de la página
+        # La réplica sigue atrasada, pero la página nueva se arma en el primario
+        self.assertContains(self.client.get(url), 'Central renovada')
+        self.assertContains(self.client.get(url), 'Central renovada')
@@ -22,6 +22,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('persona/', include('persona.urls')),
     path('oficina/', include('oficina.urls')),
+    path('tareas/', include('tareas.urls')),
+    path('reportes/', include('reportes.urls')),
     path('captcha/', include('captcha.urls')),   # <- necesaria para django-simple-captcha
     path('accounts/', include('allauth.urls'))
 ]
@@ -0,0 +1,26 @@
+"""Variante async de la home (ver ``persona.async_views``)."""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.shortcuts import render
+from django.views import View
+
+from crud.cache import CachedResponseMixin
+from . import counters
+from .views import HomePageView
+
+
+class AsyncHomePageView(CachedResponseMixin, View):
+    cache_models = HomePageView.cache_models
+
+    async def get(self, request):
+        claves = [counters.PERSONAS, counters.OFICINAS]
+        # Camino rápido: ambos totales en caché, sin tocar la base
+        cached = await cache.aget_many([counters.cache_key(clave) for clave in claves])
+        if len(cached) == len(claves):
+            totales = {clave: cached[counters.cache_key(clave)] for clave in claves}
+        else:
+            totales = await sync_to_async(counters.get_many)(claves)
+        return render(request, HomePageView.template_name, {
+            'persona_count': totales[counters.PERSONAS],
+            'oficina_count': totales[counters.OFICINAS],
+        })
@@ -0,0 +1,187 @@
+"""
+Contadores desnormalizados para la home y los listados.
+
+Los totales de Persona y Oficina y las personas por oficina viven en la
+tabla ``home_contador``; se mantienen con ``F()`` desde las señales de
+``home.signals`` y se leen a través del caché. Si falta una fila se
+calcula una vez y se guarda; ``manage.py reconcile_counters`` corrige
+cualquier desvío (p. ej. borrados hechos por fuera del ORM).
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+from crud.routers import use_primary
+
+from oficina.models import Oficina
+from persona.models import Persona
+from .models import Contador
+
+PERSONAS = 'persona.Persona'
+OFICINAS = 'oficina.Oficina'
+CACHE_TIMEOUT = 300
+
+
+def oficina_key(oficina_id):
+    return f'persona.oficina:{oficina_id}'
+
+
+def cache_key(clave):
+    return f'contador:{clave}'
+
+
+def _exact_count(clave):
+    # El valor se guarda: se cuenta en el primario, no en una réplica atrasada
+    with use_primary():
+        if clave == PERSONAS:
+            return Persona.objects.count()
+        if clave == OFICINAS:
+            return Oficina.objects.count()
+        oficina_id = int(clave.rsplit(':', 1)[1])
+        return Persona.objects.filter(oficina_id=oficina_id).count()
+
+
+def _exact_counts(claves):
+    """``{clave: valor real}``; las oficinas se cuentan juntas con una consulta agrupada."""
+    result = {clave: _exact_count(clave) for clave in claves if clave in (PERSONAS, OFICINAS)}
+    oficinas = {int(clave.rsplit(':', 1)[1]): clave for clave in claves if clave not in result}
+    if oficinas:
+        with use_primary():
+            rows = dict(
+                Persona.objects.filter(oficina_id__in=oficinas)
+                .values_list('oficina_id')
+                .annotate(n=Count('id'))
+                .order_by()
+            )
+        result.update({clave: rows.get(pk, 0) for pk, clave in oficinas.items()})
+    return result
+
+
+def _invalidate(claves):
+    keys = [cache_key(clave) for clave in claves]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def incr(deltas, pending=False):
+    """
+    Aplica ``{clave: delta}`` a los contadores (un UPDATE por clave).
+
+    ``pending``: el cambio todavía no está en la base (p. ej. ``bulk_write``
+    de un borrado, que se envía antes de borrar); un contador que falta se
+    crea con el valor real más el delta.
+    """
+    deltas = {clave: delta for clave, delta in deltas.items() if delta}
+    for clave, delta in deltas.items():
+        updated = Contador.objects.filter(clave=clave).update(valor=F('valor') + delta)
+        if not updated:
+            # Primera vez que se usa la clave: se calcula el valor real
+            valor = _exact_count(clave) + (delta if pending else 0)
+            Contador.objects.get_or_create(clave=clave, defaults={'valor': valor})
+    if deltas:
+        _invalidate(deltas)
+
+
+def recount(claves):
+    """Recalcula exactamente las ``claves`` dadas."""
+    for clave in claves:
+        Contador.objects.update_or_create(clave=clave, defaults={'valor': _exact_count(clave)})
+    _invalidate(claves)
+
+
+def start(claves):
+    """Crea en 0 los contadores de ``claves`` que todavía no existen (p. ej. de una oficina nueva)."""
+    Contador.objects.bulk_create([Contador(clave=clave, valor=0) for clave in claves], ignore_conflicts=True)
+
+
+def forget(claves):
+    """Elimina contadores que ya no aplican (p. ej. de una oficina borrada)."""
+    Contador.objects.filter(clave__in=claves).delete()
+    _invalidate(claves)
+
+
+def get_many(claves):
+    """Devuelve ``{clave: valor}`` leyendo primero del caché."""
+    claves = list(claves)
+    cached = cache.get_many([cache_key(clave) for clave in claves])
+    result = {clave: cached[cache_key(clave)] for clave in claves if cache_key(clave) in cached}
+    missing = [clave for clave in claves if clave not in result]
+    if missing:
+        result.update(Contador.objects.filter(clave__in=missing).values_list('clave', 'valor'))
+        nuevas = [clave for clave in missing if clave not in result]
+        if nuevas:
+            # Primera vez que se usan: se calculan y se guardan todas juntas
+            # (si otro proceso las creó antes, vale lo que guardó él)
+            reales = _exact_counts(nuevas)
+            Contador.objects.bulk_create(
+                [Contador(clave=clave, valor=valor) for clave, valor in reales.items()], ignore_conflicts=True,
+            )
+            result.update(Contador.objects.filter(clave__in=nuevas).values_list('clave', 'valor'))
+        cache.set_many({cache_key(clave): result[clave] for clave in missing}, CACHE_TIMEOUT)
+    return result
+
+
+def get(clave):
+    return get_many([clave])[clave]
+
+
+def office_headcounts(oficina_ids):
+    """Personas por oficina: ``{oficina_id: cantidad}``."""
+    oficina_ids = list(oficina_ids)
+    if not oficina_ids:
+        return {}
+    counts = get_many([oficina_key(pk) for pk in oficina_ids])
+    return {pk: counts[oficina_key(pk)] for pk in oficina_ids}
+
+
+def headcount_subquery(outer='pk'):
+    """
+    Subconsulta con las personas de la oficina ``OuterRef(outer)`` según
+    ``home_contador`` (NULL si la oficina todavía no tiene contador).
+    """
+    clave = Concat(Value(oficina_key('')), Cast(OuterRef(outer), CharField()), output_field=CharField())
+    return Subquery(Contador.objects.filter(clave=clave).values('valor')[:1])
+
+
+def personas_by_oficina(persona_ids):
+    """``{oficina_id: cantidad}`` de las personas dadas, con una consulta agrupada."""
+    # Se llama al escribir: se lee del primario, no de una réplica atrasada
+    with use_primary():
+        rows = (
+            Persona.objects.filter(pk__in=persona_ids)
+            .values_list('oficina_id')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        return dict(rows)
+
+
+def reconcile():
+    """
+    Recalcula todos los contadores (dos COUNT y una consulta agrupada) y
+    devuelve ``{clave: (anterior, nuevo)}`` con los que estaban desviados.
+    """
+    with use_primary():
+        reales = {
+            PERSONAS: Persona.objects.count(),
+            OFICINAS: Oficina.objects.count(),
+        }
+        reales.update(
+            (oficina_key(oficina_id), n)
+            for oficina_id, n in Persona.objects.values_list('oficina_id').annotate(n=Count('id')).order_by()
+        )
+        for oficina_id in Oficina.objects.values_list('id', flat=True).iterator():
+            reales.setdefault(oficina_key(oficina_id), 0)
+        actuales = dict(Contador.objects.values_list('clave', 'valor'))
+    desvios = {}
+    with transaction.atomic():
+        for clave, valor in reales.items():
+            if actuales.get(clave) != valor:
+                desvios[clave] = (actuales.get(clave), valor)
+                Contador.objects.update_or_create(clave=clave, defaults={'valor': valor})
+        obsoletas = set(actuales) - set(reales)
+        if obsoletas:
+            Contador.objects.filter(clave__in=obsoletas).delete()
+            desvios.update((clave, (actuales[clave], None)) for clave in obsoletas)
+    cache.delete_many([cache_key(clave) for clave in desvios])
+    return desvios
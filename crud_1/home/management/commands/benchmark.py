@@ -0,0 +1,147 @@
+import os
+import platform
+import random
+import statistics
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from crud import benchmark
+from crud.pagination import encode_cursor
+from oficina.importers import OficinaImporter
+from oficina.models import Oficina
+from persona.importers import PersonaImporter
+from persona.models import Persona
+
+BASELINE = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p95/p99) y consultas por request de las vistas principales, "
+        "y filas/s de los importadores, sobre una base temporal con datos sintéticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--oficinas', type=int, default=200, help='Oficinas a generar (por defecto 200)')
+        parser.add_argument('--personas', type=int, default=20000, help='Personas a generar (por defecto 20000)')
+        parser.add_argument('--filas-csv', type=int, default=20000, help='Filas del CSV de personas a importar (por defecto 20000)')
+        parser.add_argument('--oficinas-csv', type=int, default=2000, help='Filas del CSV de oficinas a importar (por defecto 2000)')
+        parser.add_argument('--repeticiones', type=int, default=50, help='Requests medidos por vista (por defecto 50)')
+        parser.add_argument('--rondas', type=int, default=3, help='Rondas completas; se guarda la mejor de cada métrica (por defecto 3)')
+        parser.add_argument('--baseline', type=str, default=str(BASELINE), help='Archivo JSON del baseline')
+        parser.add_argument('--guardar', action='store_true', help='Guarda los resultados como nuevo baseline')
+        parser.add_argument('--comparar', action='store_true', help='Compara contra el baseline y falla si hay regresiones')
+        parser.add_argument('--tolerancia', type=float, default=0.35, help='Margen admitido en latencias y filas/s (por defecto 0.35)')
+
+    def handle(self, *args, **kwargs):
+        meta = {
+            'oficinas': kwargs['oficinas'],
+            'personas': kwargs['personas'],
+            'filas_csv': kwargs['filas_csv'],
+            'oficinas_csv': kwargs['oficinas_csv'],
+            'repeticiones': kwargs['repeticiones'],
+            'rondas': kwargs['rondas'],
+            'motor': connection.vendor,
+            'python': platform.python_version(),
+        }
+        if kwargs['comparar']:
+            if not os.path.exists(kwargs['baseline']):
+                raise CommandError(f"No existe el baseline: {kwargs['baseline']}")
+            # Antes de medir: con otros parámetros no hay nada que comparar
+            try:
+                benchmark.check_meta(benchmark.load_baseline(kwargs['baseline'])['meta'], meta)
+            except benchmark.BaselineMismatch as e:
+                raise CommandError(str(e))
+
+        rondas, calibraciones = [], []
+        for _ in range(kwargs['rondas']):
+            calibraciones.append(benchmark.calibrate())
+            with tempfile.TemporaryDirectory() as tmp:
+                rondas.append(self.run_benchmarks(tmp, kwargs))
+            calibraciones.append(benchmark.calibrate())
+        resultados = benchmark.best_results(rondas)
+        meta['calibracion_ms'] = statistics.median(calibraciones)
+
+        for nombre, r in sorted(resultados.items()):
+            if 'p50' in r:
+                self.stdout.write(
+                    f"{nombre:<24} p50 {r['p50']:7.1f}ms  p95 {r['p95']:7.1f}ms  "
+                    f"p99 {r['p99']:7.1f}ms  {r['queries']:3d} consultas"
+                )
+            else:
+                self.stdout.write(f"{nombre:<24} {r['filas_por_segundo']:9.0f} filas/s ({r['filas']} filas)")
+
+        if kwargs['guardar']:
+            os.makedirs(os.path.dirname(kwargs['baseline']), exist_ok=True)
+            benchmark.save_baseline(kwargs['baseline'], resultados, meta)
+            self.stdout.write(self.style.SUCCESS(f"Baseline guardado en {kwargs['baseline']}"))
+        if kwargs['comparar']:
+            regresiones = benchmark.compare(
+                benchmark.load_baseline(kwargs['baseline']),
+                {'meta': meta, 'resultados': resultados},
+                kwargs['tolerancia'],
+            )
+            for regresion in regresiones:
+                self.stderr.write(f"Regresión: {regresion}")
+            if regresiones:
+                raise CommandError(f"{len(regresiones)} regresiones respecto del baseline")
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto del baseline"))
+
+    def run_benchmarks(self, tmp, kwargs):
+        with benchmark.temporary_database(tmp):
+            return self.measure(tmp, kwargs)
+
+    def measure(self, tmp, kwargs):
+        self.stdout.write(f"Generando {kwargs['oficinas']} oficinas y {kwargs['personas']} personas...")
+        benchmark.seed(kwargs['oficinas'], kwargs['personas'])
+        usuario = get_user_model().objects.create_user('benchmark', password='benchmark')
+
+        anonimo = Client()
+        autenticado = Client()
+        # Los usuarios autenticados no pasan por el caché de páginas: mide
+        # el costo real de la vista.
+        autenticado.force_login(usuario)
+
+        oficina = Oficina.objects.order_by('id').first()
+        persona = Persona.objects.order_by('id').first()
+        profunda = Persona.objects.order_by('apellido', 'nombre', 'id')[kwargs['personas'] // 2]
+        after = encode_cursor([profunda.apellido, profunda.nombre, profunda.id])
+        escenarios = {
+            'home': (autenticado, reverse('home')),
+            'home_cacheada': (anonimo, reverse('home')),
+            'persona_lista': (autenticado, reverse('persona:lista')),
+            'persona_lista_profunda': (autenticado, f"{reverse('persona:lista')}?after={after}"),
+            'persona_detalle': (autenticado, reverse('persona:detalle', args=[persona.pk])),
+            'persona_buscar': (autenticado, f"{reverse('persona:buscar')}?q=gonz"),
+            'oficina_lista': (autenticado, reverse('oficina:lista')),
+            'oficina_detalle': (autenticado, reverse('oficina:detalle', args=[oficina.pk])),
+        }
+        resultados = {}
+        for nombre, (client, url) in escenarios.items():
+            resultados[nombre] = benchmark.bench_view(client, url, kwargs['repeticiones'])
+
+        rng = random.Random(7)
+        oficinas_csv = os.path.join(tmp, 'oficinas.csv')
+        nuevas = [
+            {'nombre': f"Carga {row['nombre']}", 'nombre_corto': f"C{row['nombre_corto']}"}
+            for row in benchmark.fake_oficinas(kwargs['oficinas_csv'], rng)
+        ]
+        benchmark.write_csv(oficinas_csv, nuevas, ['nombre', 'nombre_corto'])
+        personas_csv = os.path.join(tmp, 'personas.csv')
+        codigos = [row['nombre_corto'] for row in nuevas]
+        benchmark.write_csv(
+            personas_csv,
+            benchmark.fake_personas(kwargs['filas_csv'], codigos, rng),
+            ['nombre', 'apellido', 'edad', 'oficina_nombre_corto'],
+        )
+        quiet = {'stdout': self.stdout, 'stderr': self.stderr, 'verbosity': 0}
+        resultados['load_oficinas'] = benchmark.bench_loader(OficinaImporter(**quiet), oficinas_csv)
+        resultados['importar_personas'] = benchmark.bench_loader(PersonaImporter(**quiet), personas_csv)
+        return resultados
+
@@ -0,0 +1,103 @@
+import os
+import random
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from crud import benchmark
+from crud.sqlite import PRODUCTION_OPTIONS, PRODUCTION_PRAGMAS
+from oficina.models import Oficina
+from persona.importers import PersonaImporter
+
+# Configuración de SQLite sin perfil (la de desarrollo) y con el perfil de
+# producción (ver DATABASE_PROFILE en settings).
+PERFILES = {
+    'sin_perfil': ({'journal_mode': 'DELETE'}, {}),
+    'produccion': (PRODUCTION_PRAGMAS, PRODUCTION_OPTIONS),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de lectura de la lista de personas mientras corre una importación, "
+        "con y sin el perfil de producción de SQLite (WAL, ...). Lectores e importación corren "
+        "en procesos separados; se informan las lecturas que encontraron la base bloqueada y "
+        "cuánto esperaron el lock."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--personas', type=int, default=20000, help='Personas iniciales (por defecto 20000)')
+        parser.add_argument('--filas-csv', type=int, default=50000, help='Filas importadas durante la prueba (por defecto 50000)')
+        parser.add_argument('--lectores', type=int, default=4, help='Procesos lectores concurrentes (por defecto 4)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Filas por transacción de la importación (por defecto 1000)')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Este benchmark es específico de SQLite")
+        with tempfile.TemporaryDirectory() as tmp, benchmark.temporary_database(tmp):
+            resultados = self.measure(tmp, kwargs)
+
+        for nombre, r in resultados.items():
+            self.stdout.write(
+                f"{nombre:<12} lecturas {r['lecturas']:6d}  bloqueadas {r['bloqueadas']:5d}  "
+                f"errores {r['errores']:4d}  espera total {r['espera_total']:9.1f}ms  "
+                f"espera max {r['espera_max']:7.1f}ms\n{'':<12} p50 {r['p50']:7.1f}ms  "
+                f"p95 {r['p95']:7.1f}ms  p99 {r['p99']:7.1f}ms  max {r['max']:8.1f}ms  "
+                f"importación {r['filas_por_segundo']:8.0f} filas/s"
+            )
+
+    def measure(self, tmp, kwargs):
+        benchmark.seed(50, kwargs['personas'])
+        # Cada perfil importa personas nuevas en oficinas propias: no chocan
+        # con las existentes ni con las del otro perfil
+        rng = random.Random(7)
+        archivos = {}
+        for nombre in PERFILES:
+            prefijo = nombre[:3].upper()
+            oficinas = [
+                Oficina(nombre=f"{nombre} {row['nombre']}", nombre_corto=f"{prefijo}{row['nombre_corto']}")
+                for row in benchmark.fake_oficinas(50, rng)
+            ]
+            Oficina.objects.bulk_create(oficinas)
+            archivos[nombre] = os.path.join(tmp, f'personas_{nombre}.csv')
+            benchmark.write_csv(
+                archivos[nombre],
+                benchmark.fake_personas(kwargs['filas_csv'], [o.nombre_corto for o in oficinas], rng),
+                ['nombre', 'apellido', 'edad', 'oficina_nombre_corto'],
+            )
+
+        # Los lectores comparten una sesión autenticada: no pasan por el
+        # caché de páginas y no escriben sesiones nuevas.
+        login = Client()
+        login.force_login(get_user_model().objects.create_user('benchmark', password='benchmark'))
+        session = login.cookies[settings.SESSION_COOKIE_NAME].value
+
+        def make_client():
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session
+            return client
+
+        resultados = {}
+        options = connection.settings_dict.setdefault('OPTIONS', {})
+        original = dict(options)
+        for nombre, (pragmas, db_options) in PERFILES.items():
+            connections.close_all()
+            options.clear()
+            options.update(original, **db_options)
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                self.stdout.write(f"Midiendo {nombre}...")
+                importer = PersonaImporter(chunk_size=kwargs['chunk_size'], stdout=self.stdout,
+                                           stderr=self.stderr, verbosity=0)
+                resultados[nombre] = benchmark.bench_concurrency(
+                    make_client, reverse('persona:lista'), importer, archivos[nombre], kwargs['lectores']
+                )
+        connections.close_all()
+        options.clear()
+        options.update(original)
+        return resultados
@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from crud.sync import content_hash
+from oficina.models import Oficina
+from persona.models import Persona
+
+# Sin caché de fragmentos: mide sólo el render de las filas
+SIN_FRAGMENTOS = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el render de las listas de personas y oficinas con muchas filas: sin caché de "
+        "fragmentos, con el caché frío y con el caché caliente. Usa TEMPLATE_PROFILE del entorno."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000, help='Filas por página (por defecto 1000)')
+        parser.add_argument('--repeticiones', type=int, default=30, help='Renders por escenario (por defecto 30)')
+
+    def handle(self, *args, **kwargs):
+        n = kwargs['filas']
+        personas = [
+            Persona(pk=i, nombre=f'Nombre{i}', apellido=f'Apellido{i}', edad=30, oficina_id=1,
+                    contenido_hash=content_hash([f'Nombre{i}', f'Apellido{i}', 30, 1]))
+            for i in range(1, n + 1)
+        ]
+        oficinas = [
+            Oficina(pk=i, nombre=f'Oficina {i}', nombre_corto=f'O{i}',
+                    contenido_hash=content_hash([f'Oficina {i}', f'O{i}']))
+            for i in range(1, n + 1)
+        ]
+        for oficina in oficinas:
+            oficina.personas_count = oficina.pk % 50
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.stdout.write(f"Perfil de plantillas: {settings.TEMPLATE_PROFILE}, {n} filas")
+        for template_name, context in (
+            ('persona/lista.html', {'personas': personas}),
+            ('oficina/lista.html', {'oficinas': oficinas}),
+        ):
+            template = get_template(template_name)
+            with override_settings(CACHES=dict(settings.CACHES, fragmentos=SIN_FRAGMENTOS)):
+                self.report(template_name, 'sin fragmentos', self.measure(template, context, request, kwargs))
+            caches['fragmentos'].clear()
+            self.report(template_name, 'fragmentos frío',
+                        self.measure(template, context, request, kwargs, clear=True))
+            self.report(template_name, 'fragmentos caliente', self.measure(template, context, request, kwargs))
+
+    def measure(self, template, context, request, kwargs, clear=False):
+        template.render(context, request)
+        muestras = []
+        for _ in range(kwargs['repeticiones']):
+            if clear:
+                caches['fragmentos'].clear()
+            inicio = time.perf_counter()
+            template.render(context, request)
+            muestras.append((time.perf_counter() - inicio) * 1000)
+        return muestras
+
+    def report(self, template_name, escenario, muestras):
+        self.stdout.write(
+            f"{template_name:<20} {escenario:<20} p50 {statistics.median(muestras):7.1f}ms  "
+            f"min {min(muestras):7.1f}ms"
+        )
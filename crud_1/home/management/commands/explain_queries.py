@@ -0,0 +1,85 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from crud.pagination import keyset_filter
+from home.models import Contador
+from oficina import search as oficina_search
+from oficina.models import Oficina
+from persona.dedupe import duplicate_groups
+from persona.models import Persona
+from reportes.models import ResumenOficina
+
+# SQLite: "SCAN tabla" sin "USING ... INDEX" recorre la tabla entera.
+SQLITE_SCAN_RE = re.compile(r'\bSCAN (\w+)(?! USING)(?:\s|$)')
+SQLITE_SORT_RE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY)')
+POSTGRES_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+POSTGRES_SORT_RE = re.compile(r'^\s*(?:->\s*)?Sort\b', re.MULTILINE)
+
+
+def hot_queries():
+    """Las consultas de los caminos más usados: ``[(nombre, queryset), ...]``."""
+    oficina_id = Oficina.objects.values_list('id', flat=True).first() or 1
+    codigo = Oficina.objects.values_list('nombre_corto', flat=True).first() or 'X'
+    orden = ['apellido', 'nombre', 'id']
+    return [
+        ('persona_lista', Persona.objects.only('id', 'nombre', 'apellido', 'contenido_hash').order_by(*orden)[:11]),
+        ('persona_lista_cursor', Persona.objects.only('id', 'nombre', 'apellido', 'contenido_hash')
+            .filter(keyset_filter(orden, ['M', 'M', 0])).order_by(*orden)[:11]),
+        ('oficina_detalle_personas', Persona.objects.filter(oficina_id=oficina_id)
+            .only('id', 'nombre', 'apellido').order_by(*orden)[:20]),
+        ('oficina_detalle_total', Persona.objects.filter(oficina_id=oficina_id).values('id')),
+        ('importar_personas_oficinas', Oficina.objects.filter(nombre_corto__in=[codigo, 'Y'])
+            .values_list('nombre_corto', 'id')),
+        ('load_oficinas_por_nombre', Oficina.objects.filter(nombre__in=['A', 'B']).values_list('nombre', 'pk')),
+        ('load_oficinas_por_codigo', Oficina.objects.filter(nombre_corto__in=[codigo, 'Y'])
+            .values_list('nombre_corto', 'pk')),
+        ('oficina_lista', oficina_search.listado()[:50]),
+        ('oficina_buscar', oficina_search.listado('ce')[:50]),
+        ('dedupe_grupos', duplicate_groups(limit=20)),
+        ('api_personas_por_oficina', Persona.objects.filter(oficina__nombre_corto=codigo).order_by('id')[:101]),
+        ('reporte_sucios', ResumenOficina.objects.filter(sucio=True, oficina_id__gt=0)
+            .order_by('oficina_id').values_list('oficina_id', flat=True)[:500]),
+        ('contadores', Contador.objects.filter(clave__in=['a', 'b']).values_list('clave', 'valor')),
+    ]
+
+
+def analyze(plan, vendor):
+    """Devuelve ``(tablas_recorridas_enteras, ordena_en_memoria)`` del plan."""
+    if vendor == 'postgresql':
+        return POSTGRES_SCAN_RE.findall(plan), bool(POSTGRES_SORT_RE.search(plan))
+    return SQLITE_SCAN_RE.findall(plan), bool(SQLITE_SORT_RE.search(plan))
+
+
+class Command(BaseCommand):
+    help = "Ejecuta EXPLAIN sobre las consultas más usadas e informa las que recorren tablas enteras."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail', action='store_true', help='Termina con error si alguna consulta recorre una tabla entera')
+
+    def handle(self, *args, **kwargs):
+        vendor = connection.vendor
+        problemas = 0
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # Con tablas chicas el planificador prefiere Seq Scan aunque
+                # haya índice: se desalienta para ver si el índice sirve.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for nombre, qs in hot_queries():
+                plan = qs.explain()
+                scans, sort = analyze(plan, vendor)
+                if scans:
+                    problemas += 1
+                    estado = self.style.ERROR(f"SCAN COMPLETO ({', '.join(sorted(set(scans)))})")
+                elif sort:
+                    estado = self.style.WARNING("ordena en memoria")
+                else:
+                    estado = self.style.SUCCESS("ok")
+                self.stdout.write(f"{nombre:<30} {estado}")
+                if kwargs['verbosity'] >= 2 or scans:
+                    for line in plan.splitlines():
+                        self.stdout.write(f"    {line}")
+        if problemas and kwargs['fail']:
+            raise CommandError(f"{problemas} consultas recorren tablas enteras")
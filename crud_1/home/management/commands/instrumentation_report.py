@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from crud.instrumentation import aggregate, read_stats
+
+class Command(BaseCommand):
+    help = "Ranking de las vistas y consultas SQL más lentas según los registros de InstrumentationMiddleware."
+
+    def add_arguments(self, parser):
+        default = getattr(settings, 'INSTRUMENTATION', {}).get('STATS_FILE')
+        parser.add_argument('--file', type=str, default=str(default) if default else None,
+                            help='Archivo JSONL con los registros (por defecto INSTRUMENTATION["STATS_FILE"])')
+        parser.add_argument('--top', type=int, default=10, help='Cantidad de vistas y consultas a listar (por defecto 10)')
+
+    def handle(self, *args, **kwargs):
+        if not kwargs['file']:
+            raise CommandError("Falta --file (INSTRUMENTATION['STATS_FILE'] no está configurado)")
+        try:
+            views, queries = aggregate(read_stats(kwargs['file']))
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        top = kwargs['top']
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Vistas más lentas (tiempo acumulado, top {top})"))
+        for v in views[:top]:
+            self.stdout.write(
+                f"{v['view']:<30} {v['requests']:6d} req  total {v['total_ms'] / 1000:8.2f}s  "
+                f"p50 {v['p50_ms']:7.1f}ms  p95 {v['p95_ms']:7.1f}ms  "
+                f"db {v['db_ms']:6.1f}ms  tpl {v['template_ms']:6.1f}ms  {v['queries']:5.1f} consultas"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Consultas más lentas (tiempo acumulado, top {top})"))
+        for q in queries[:top]:
+            self.stdout.write(
+                f"{q['ms']:9.1f}ms  {q['count']:6d}x  {', '.join(q['views'])}\n    {q['sql'][:300]}"
+            )
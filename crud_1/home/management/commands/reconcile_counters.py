@@ -0,0 +1,12 @@
+# home/management/commands/reconcile_counters.py
+from django.core.management.base import BaseCommand
+from home import counters
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores desnormalizados y corrige los desvíos (ejecutar periódicamente, p. ej. con cron)."
+
+    def handle(self, *args, **kwargs):
+        desvios = counters.reconcile()
+        for clave, (anterior, nuevo) in sorted(desvios.items()):
+            self.stdout.write(f"{clave}: {anterior} -> {nuevo}")
+        self.stdout.write(self.style.SUCCESS(f"Contadores corregidos: {len(desvios)}"))
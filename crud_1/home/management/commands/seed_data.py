@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from crud.benchmark import seed
+
+class Command(BaseCommand):
+    help = "Genera oficinas y personas sintéticas (distribución sesgada) para pruebas de carga."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--oficinas', type=int, default=200, help='Cantidad de oficinas (por defecto 200)')
+        parser.add_argument('--personas', type=int, default=50000, help='Cantidad de personas (por defecto 50000)')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla del generador (por defecto 42)')
+
+    def handle(self, *args, **kwargs):
+        seed(kwargs['oficinas'], kwargs['personas'], kwargs['seed'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Generadas {kwargs['oficinas']} oficinas y {kwargs['personas']} personas"
+        ))
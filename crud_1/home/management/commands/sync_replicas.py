@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from crud.routers import PRIMARY, replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base SQLite primaria a los archivos de réplica (DB_REPLICAS) con la API de "
+        "backup de SQLite. En PostgreSQL la replicación es externa a la aplicación."
+    )
+
+    def handle(self, *args, **kwargs):
+        aliases = replicas()
+        if not aliases:
+            raise CommandError("No hay réplicas configuradas (DB_REPLICAS)")
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError("Las réplicas de PostgreSQL se mantienen con replicación del servidor")
+
+        primary.ensure_connection()
+        for alias in aliases:
+            # Se cierra la conexión de Django para no copiar sobre un archivo abierto
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"Réplica {alias} sincronizada"))
@@ -1,3 +1,17 @@
 from django.db import models
 
-# Create your models here.
+class Contador(models.Model):
+    """Contador desnormalizado (total de filas de un modelo, personas por oficina)."""
+
+    clave = models.CharField(verbose_name="Clave", max_length=100, unique=True)
+    valor = models.BigIntegerField(verbose_name="Valor", default=0)
+
+    class Meta:
+        """Meta definition for Contador."""
+
+        verbose_name = 'Contador'
+        verbose_name_plural = 'Contadores'
+
+    def __str__(self):
+        """Unicode representation of Contador."""
+        return f"{self.clave}={self.valor}"
@@ -0,0 +1,75 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from crud.signals import bulk_write
+from oficina.models import Oficina
+from persona.models import Persona
+from . import counters
+
+
+@receiver(post_init, sender=Persona)
+def recordar_oficina(sender, instance, **kwargs):
+    # Oficina original, para ajustar los contadores si cambia al guardar
+    instance._oficina_id_original = instance.__dict__.get('oficina_id')
+
+
+@receiver(pre_save, sender=Persona)
+def completar_oficina_original(sender, instance, using, **kwargs):
+    if not instance._state.adding and instance._oficina_id_original is None and instance.pk:
+        # Se cargó con only()/defer() sin la oficina: se consulta una vez
+        instance._oficina_id_original = (
+            Persona.objects.using(using).filter(pk=instance.pk).values_list('oficina_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Persona)
+def persona_guardada(sender, instance, created, **kwargs):
+    if created:
+        counters.incr({counters.PERSONAS: 1, counters.oficina_key(instance.oficina_id): 1})
+    elif instance._oficina_id_original != instance.oficina_id:
+        deltas = {counters.oficina_key(instance.oficina_id): 1}
+        if instance._oficina_id_original is not None:
+            deltas[counters.oficina_key(instance._oficina_id_original)] = -1
+        counters.incr(deltas)
+    instance._oficina_id_original = instance.oficina_id
+
+
+@receiver(post_delete, sender=Persona)
+def persona_eliminada(sender, instance, **kwargs):
+    counters.incr({counters.PERSONAS: -1, counters.oficina_key(instance.oficina_id): -1})
+
+
+@receiver(post_save, sender=Oficina)
+def oficina_guardada(sender, instance, created, **kwargs):
+    if created:
+        counters.incr({counters.OFICINAS: 1})
+        # Con la fila en 0 el listado puede ordenar por personas desde el principio
+        counters.start([counters.oficina_key(instance.pk)])
+
+
+@receiver(post_delete, sender=Oficina)
+def oficina_eliminada(sender, instance, **kwargs):
+    counters.incr({counters.OFICINAS: -1})
+    counters.forget([counters.oficina_key(instance.pk)])
+
+
+@receiver(bulk_write, sender=Persona)
+def personas_masivas(sender, action, pks, oficina_ids=None, **kwargs):
+    if action in ('create', 'delete'):
+        sign = 1 if action == 'create' else -1
+        por_oficina = counters.personas_by_oficina(pks)
+        deltas = {counters.oficina_key(oficina_id): sign * n for oficina_id, n in por_oficina.items()}
+        deltas[counters.PERSONAS] = sign * sum(por_oficina.values())
+        # El borrado llega antes de borrar las filas (ver crud.signals)
+        counters.incr(deltas, pending=action == 'delete')
+    elif oficina_ids:
+        # Cambio de oficina por lote: se recuentan las oficinas afectadas
+        counters.recount([counters.oficina_key(oficina_id) for oficina_id in oficina_ids])
+
+
+@receiver(bulk_write, sender=Oficina)
+def oficinas_masivas(sender, action, pks, **kwargs):
+    if action in ('create', 'delete'):
+        counters.incr({counters.OFICINAS: len(pks) if action == 'create' else -len(pks)})
+    if action == 'create':
+        counters.start([counters.oficina_key(pk) for pk in pks])
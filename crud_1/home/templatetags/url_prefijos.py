@@ -0,0 +1,37 @@
+"""
+URLs por fila sin ``{% url %}``.
+
+``{% url %}`` resuelve el patrón completo en cada llamada; en una lista de
+1000 filas con tres enlaces son 3000 ``reverse()``. Con
+``{% url_prefijo 'persona:detalle' as url_detalle %}`` la URL se resuelve
+una vez (con un id de muestra) y cada fila sólo concatena su id:
+``{{ url_detalle|con_pk:persona.pk }}``.
+"""
+from functools import lru_cache
+
+from django import template
+from django.urls import get_script_prefix, get_urlconf, reverse
+
+register = template.Library()
+
+# Id de muestra: no puede aparecer en el resto de la URL
+_MUESTRA = '9876543210'
+
+
+@lru_cache(maxsize=256)
+def _partes(name, script_prefix, urlconf):
+    url = reverse(name, urlconf=urlconf, args=[_MUESTRA])
+    antes, despues = url.rsplit(_MUESTRA, 1)
+    return antes, despues
+
+
+@register.simple_tag
+def url_prefijo(name):
+    """Partes de la URL ``name`` (con un único argumento ``pk``) antes y después del id."""
+    return _partes(name, get_script_prefix(), get_urlconf())
+
+
+@register.filter
+def con_pk(partes, pk):
+    antes, despues = partes
+    return f'{antes}{pk}{despues}'
@@ -1,3 +1,208 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db import transaction
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+from django.urls import clear_script_prefix, reverse, set_script_prefix
+
+from crud import benchmark
+from crud.querybudget import query_budget
+from crud.signals import bulk_write
+from oficina.models import Oficina
+from persona import bulk
+from persona.models import Persona
+from persona.tests import async_get
+from . import counters
+from .async_views import AsyncHomePageView
+from .management.commands import explain_queries
+from .models import Contador
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+
+    meta = {'oficinas': 200, 'personas': 20000, 'filas_csv': 20000, 'oficinas_csv': 2000,
+            'repeticiones': 50, 'rondas': 3, 'motor': 'sqlite', 'calibracion_ms': 100.0}
+
+    def corrida(self, calibracion_ms=100.0, **resultados):
+        return {'meta': dict(self.meta, calibracion_ms=calibracion_ms), 'resultados': resultados}
+
+    def test_sin_regresiones(self):
+        base = self.corrida(vista={'p50': 10.0, 'p95': 12.0, 'queries': 3})
+        self.assertEqual(benchmark.compare(base, self.corrida(vista={'p50': 11.0, 'p95': 13.0, 'queries': 3})), [])
+
+    def test_marca_latencia_consultas_y_filas(self):
+        base = self.corrida(vista={'p50': 10.0, 'p95': 12.0, 'queries': 3}, carga={'filas_por_segundo': 1000, 'filas': 10})
+        actual = self.corrida(vista={'p50': 20.0, 'p95': 12.0, 'queries': 4}, carga={'filas_por_segundo': 500, 'filas': 10})
+        self.assertEqual(len(benchmark.compare(base, actual)), 3)
+
+    def test_escala_por_calibracion(self):
+        base = self.corrida(vista={'p50': 10.0, 'p95': 12.0, 'queries': 3}, carga={'filas_por_segundo': 1000, 'filas': 10})
+        # La máquina está el doble de lenta: el doble de latencia no es regresión
+        actual = self.corrida(200.0, vista={'p50': 20.0, 'p95': 24.0, 'queries': 3},
+                              carga={'filas_por_segundo': 500, 'filas': 10})
+        self.assertEqual(benchmark.compare(base, actual), [])
+
+    def test_rechaza_parametros_distintos(self):
+        base = self.corrida(vista={'p50': 10.0, 'p95': 12.0, 'queries': 3})
+        actual = {'meta': dict(self.meta, personas=1000), 'resultados': base['resultados']}
+        with self.assertRaisesMessage(benchmark.BaselineMismatch, 'personas'):
+            benchmark.compare(base, actual)
+
+    def test_mejor_de_las_rondas(self):
+        rondas = [
+            {'vista': {'p50': 12.0, 'queries': 3}, 'carga': {'filas_por_segundo': 900, 'filas': 10}},
+            {'vista': {'p50': 10.0, 'queries': 4}, 'carga': {'filas_por_segundo': 1000, 'filas': 10}},
+        ]
+        self.assertEqual(benchmark.best_results(rondas), {
+            'vista': {'p50': 10.0, 'queries': 4}, 'carga': {'filas_por_segundo': 1000, 'filas': 10},
+        })
+
+
+class CountersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.central = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        cls.norte = Oficina.objects.create(nombre='Norte', nombre_corto='NOR')
+        personas = Persona.objects.bulk_create([
+            Persona(nombre=f'N{i}', apellido='A', edad=30, oficina=cls.central) for i in range(5)
+        ])
+        bulk_write.send(sender=Persona, action='create', pks=[p.pk for p in personas])
+
+    def setUp(self):
+        cache.clear()
+
+    def valor(self, clave):
+        return Contador.objects.get(clave=clave).valor
+
+    def test_altas_cambios_y_bajas(self):
+        persona = Persona.objects.create(nombre='José', apellido='Pérez', edad=30, oficina=self.central)
+        self.assertEqual(self.valor(counters.oficina_key(self.central.pk)), 6)
+        persona.oficina = self.norte
+        persona.save()
+        self.assertEqual(counters.office_headcounts([self.central.pk, self.norte.pk]),
+                         {self.central.pk: 5, self.norte.pk: 1})
+        persona.delete()
+        self.assertEqual(self.valor(counters.oficina_key(self.norte.pk)), 0)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_borrado_masivo_sin_contador(self):
+        clave = counters.oficina_key(self.central.pk)
+        Contador.objects.filter(clave__in=[clave, counters.PERSONAS]).delete()
+        ids = list(Persona.objects.filter(oficina=self.central).values_list('pk', flat=True)[:2])
+        with transaction.atomic():
+            bulk.delete_ids(ids)
+        # La señal llega antes de borrar: el contador nuevo descuenta el lote
+        self.assertEqual(self.valor(clave), 3)
+        self.assertEqual(self.valor(counters.PERSONAS), 3)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_reconcile_corrige_desvios(self):
+        clave = counters.oficina_key(self.central.pk)
+        counters.reconcile()
+        Contador.objects.filter(clave=clave).update(valor=99)
+        self.assertEqual(counters.reconcile(), {clave: (99, 5)})
+        self.assertEqual(counters.get(clave), 5)
+
+
+class HomePageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_totales_sin_count(self):
+        oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        Persona.objects.create(nombre='José', apellido='Pérez', edad=30, oficina=oficina)
+        cache.clear()
+        # Los dos contadores en una consulta; la página queda en el caché
+        with query_budget(max_queries=1):
+            response = self.client.get('/')
+        self.assertEqual((response.context['persona_count'], response.context['oficina_count']), (1, 1))
+        with query_budget(max_queries=0):
+            self.assertContains(self.client.get('/'), 'Total de personas: 1')
+
+    def test_home_async_cacheada(self):
+        primera = async_get(AsyncHomePageView, '/')
+        self.assertEqual(primera['ETag'], self.client.get('/')['ETag'])
+        with query_budget(max_queries=0):
+            self.assertEqual(async_get(AsyncHomePageView, '/').content, primera.content)
+        self.assertEqual(async_get(AsyncHomePageView, '/', headers={'If-None-Match': primera['ETag']}).status_code, 304)
+
+
+class UrlPrefijosTests(SimpleTestCase):
+
+    plantilla = Template("{% load url_prefijos %}{% url_prefijo nombre as u %}{{ u|con_pk:7 }} {{ u|con_pk:123 }}")
+
+    def render(self, nombre):
+        return self.plantilla.render(Context({'nombre': nombre})).split()
+
+    def test_igual_que_reverse(self):
+        for nombre in ('persona:detalle', 'persona:editar', 'persona:eliminar',
+                       'oficina:detalle', 'oficina:editar', 'oficina:eliminar'):
+            with self.subTest(nombre=nombre):
+                self.assertEqual(self.render(nombre), [reverse(nombre, args=[7]), reverse(nombre, args=[123])])
+
+    def test_respeta_script_prefix(self):
+        self.render('persona:detalle')
+        set_script_prefix('/app/')
+        self.addCleanup(clear_script_prefix)
+        urls = self.render('persona:detalle')
+        self.assertEqual(urls, [reverse('persona:detalle', args=[7]), reverse('persona:detalle', args=[123])])
+        self.assertTrue(urls[0].startswith('/app/'))
+
+
+class FragmentosListaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['fragmentos'].clear()
+        oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        self.juan = Persona.objects.create(nombre='Juan', apellido='Pérez', edad=30, oficina=oficina)
+        self.ana = Persona.objects.create(nombre='Ana', apellido='Gómez', edad=40, oficina=oficina)
+
+    def clave(self, persona):
+        persona.refresh_from_db(fields=['contenido_hash'])
+        return make_template_fragment_key('persona_fila', [persona.pk, persona.contenido_hash])
+
+    def test_fila_modificada_se_vuelve_a_renderizar(self):
+        self.assertContains(self.client.get('/persona/lista/'), 'Juan')
+        clave_vieja, clave_ana = self.clave(self.juan), self.clave(self.ana)
+        self.assertIsNotNone(caches['fragmentos'].get(clave_vieja))
+        # La fila que no cambia sale del caché de fragmentos
+        caches['fragmentos'].set(clave_ana, '<tr><td>fragmento cacheado</td></tr>')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.juan.nombre = 'Juanito'
+            self.juan.save()
+        clave_nueva = self.clave(self.juan)
+        self.assertNotEqual(clave_nueva, clave_vieja)
+
+        response = self.client.get('/persona/lista/')
+        self.assertContains(response, 'Juanito')
+        self.assertContains(response, 'fragmento cacheado')
+        self.assertIsNotNone(caches['fragmentos'].get(clave_nueva))
+
+
+class ExplainQueriesTests(TestCase):
+
+    def setUp(self):
+        oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        Persona.objects.create(nombre='Juan', apellido='Pérez', edad=30, oficina=oficina)
+
+    def test_sin_scans_completos(self):
+        out = StringIO()
+        # --fail termina con CommandError si alguna consulta recorre una tabla entera
+        call_command('explain_queries', fail=True, stdout=out, no_color=True)
+        salida = out.getvalue()
+        self.assertNotIn('SCAN COMPLETO', salida)
+        for nombre, _ in explain_queries.hot_queries():
+            self.assertRegex(salida, rf'(?m)^{nombre}\s')
+
+    def test_analyze(self):
+        self.assertEqual(explain_queries.analyze('SCAN persona_persona', 'sqlite'), (['persona_persona'], False))
+        self.assertEqual(explain_queries.analyze('SCAN persona_persona USING INDEX x', 'sqlite'), ([], False))
+        plan = 'Limit\n  ->  Sort\n        ->  Seq Scan on oficina_oficina'
+        self.assertEqual(explain_queries.analyze(plan, 'postgresql'), (['oficina_oficina'], True))
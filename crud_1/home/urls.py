@@ -1,7 +1,12 @@
 # home/urls.py
+from django.conf import settings
 from django.urls import path
 from .views import HomePageView
 
+if settings.ASYNC_VIEWS:
+    # Variante async (ASGI) de la home
+    from .async_views import AsyncHomePageView as HomePageView
+
 urlpatterns = [
     path('', HomePageView.as_view(), name='home'),
 ]
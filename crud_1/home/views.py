@@ -1,21 +1,18 @@
 # home/views.py
 from django.views.generic import TemplateView
-from django.apps import apps
+from crud.cache import CachedResponseMixin
+from oficina.models import Oficina
+from persona.models import Persona
+from . import counters
 
-class HomePageView(TemplateView):
+class HomePageView(CachedResponseMixin, TemplateView):
     template_name = "home/home.html"
+    cache_models = (Persona, Oficina)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        # intentamos obtener modelos (si existen)
-        def safe_count(app_label, model_name):
-            try:
-                Model = apps.get_model(app_label, model_name)
-                return Model.objects.count()
-            except Exception:
-                return None
-
-        ctx['persona_count'] = safe_count('persona', 'Persona')
-        ctx['oficina_count'] = safe_count('oficina', 'Oficina')
+        # Contadores desnormalizados (caché + tabla home_contador), sin COUNT(*)
+        totales = counters.get_many([counters.PERSONAS, counters.OFICINAS])
+        ctx['persona_count'] = totales[counters.PERSONAS]
+        ctx['oficina_count'] = totales[counters.OFICINAS]
         return ctx
-
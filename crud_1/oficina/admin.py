@@ -1,4 +1,97 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+
+from crud.pagination import EstimatedCountPaginator
+from persona import bulk
+from persona.models import Persona
+from . import search
 from .models import Oficina
+from .widgets import OficinaAutocompleteWidget
+
+
+class OficinaActionForm(ActionForm):
+    destino = forms.ModelChoiceField(
+        queryset=Oficina.objects.only('id', 'nombre', 'nombre_corto'),
+        widget=OficinaAutocompleteWidget, required=False, label="Oficina destino",
+    )
+
+
+class CodigoListFilter(admin.SimpleListFilter):
+    """Oficinas con o sin ``nombre_corto`` (índice único de la columna)."""
+
+    title = "código"
+    parameter_name = 'codigo'
+
+    def lookups(self, request, model_admin):
+        return [('si', "Con código"), ('no', "Sin código")]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'si':
+            return queryset.filter(nombre_corto__isnull=False)
+        if self.value() == 'no':
+            return queryset.filter(nombre_corto__isnull=True)
+        return queryset
+
+
+@admin.register(Oficina)
+class OficinaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'nombre_corto', 'personas')
+    list_filter = (CodigoListFilter,)
+    # Orden cubierto por oficina_nombre_idx
+    ordering = ('nombre', 'id')
+    # La búsqueda (y el autocompletado de PersonaAdmin) usa los índices
+    # de prefijo de oficina.search
+    search_fields = ('nombre', 'nombre_corto')
+    search_help_text = "Busca oficinas cuyo nombre o código empieza con el texto."
+    readonly_fields = ('contenido_hash',)
+    list_per_page = 50
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    action_form = OficinaActionForm
+    actions = ('mover_personas',)
+
+    def get_queryset(self, request):
+        # Personas por oficina desde home_contador, en la misma consulta
+        return search.listado()
+
+    @admin.display(description="Personas", ordering='personas_count')
+    def personas(self, oficina):
+        return oficina.personas_count
+
+    def get_search_results(self, request, queryset, search_term):
+        return search.filter_prefix(queryset, search_term), False
+
+    def get_deleted_objects(self, objs, request):
+        # Resumen con cantidades: la confirmación por defecto lista cada
+        # persona que se borraría en cascada.
+        objs = list(objs)
+        personas = Persona.objects.filter(oficina__in=objs).count()
+        perms_needed = set()
+        if personas and not request.user.has_perm('persona.delete_persona'):
+            perms_needed.add(Persona._meta.verbose_name)
+        model_count = {Oficina._meta.verbose_name_plural: len(objs)}
+        if personas:
+            model_count[Persona._meta.verbose_name_plural] = personas
+        return [str(oficina) for oficina in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        bulk.delete(Persona.objects.filter(oficina=obj))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        # Las personas por lotes; después las oficinas (ya sin dependientes)
+        bulk.delete(Persona.objects.filter(oficina__in=queryset.values('pk')))
+        super().delete_queryset(request, queryset)
 
-admin.site.register(Oficina)
+    @admin.action(description="Mover las personas de las oficinas seleccionadas a la oficina destino")
+    def mover_personas(self, request, queryset):
+        destino_id = request.POST.get('destino', '')
+        destino = Oficina.objects.filter(pk=destino_id).first() if destino_id.isdigit() else None
+        if destino is None:
+            self.message_user(request, "Elegir la oficina destino.", messages.WARNING)
+            return
+        total, omitidas = bulk.move(Persona.objects.filter(oficina__in=queryset.values('pk')), destino)
+        self.message_user(request, f"Se movieron {total} personas a {destino}.")
+        if omitidas:
+            self.message_user(request, bulk.MOVE_SKIPPED.format(n=len(omitidas), oficina=destino), messages.WARNING)
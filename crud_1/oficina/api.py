@@ -0,0 +1,25 @@
+from crud.api import ApiBulkView, ApiListView
+from .models import Oficina
+
+OFICINA_FIELDS = {
+    'id': 'id',
+    'nombre': 'nombre',
+    'nombre_corto': 'nombre_corto',
+}
+DEFAULT_FIELDS = ('id', 'nombre', 'nombre_corto')
+
+
+class OficinaApiListView(ApiListView):
+    model = Oficina
+    fields = OFICINA_FIELDS
+    default_fields = DEFAULT_FIELDS
+    filters = {
+        'nombre_corto': ('nombre_corto', str),
+    }
+
+
+class OficinaApiBulkView(ApiBulkView):
+    model = Oficina
+    fields = OFICINA_FIELDS
+    default_fields = DEFAULT_FIELDS
+    writable_fields = ('nombre', 'nombre_corto')
@@ -0,0 +1,58 @@
+"""
+Variantes async de las vistas de lectura de Oficina (ORM async).
+
+Ver ``persona.async_views``.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+from django.views import View
+
+from crud.cache import CachedResponseMixin
+from crud.pagination import apaginate
+from persona.models import Persona
+from . import search
+from .models import Oficina
+from .views import OficinaDetailView, OficinaListView
+
+
+class AsyncOficinaListView(CachedResponseMixin, View):
+    cache_models = OficinaListView.cache_models
+
+    async def get(self, request):
+        view = OficinaListView(request=request, kwargs={})
+        orden = view.get_orden()
+        page_obj = await apaginate(view.get_queryset(), OficinaListView.paginate_by, request.GET.get('page'))
+        oficinas = await sync_to_async(search.fill_headcounts)(list(page_obj.object_list))
+        return render(request, OficinaListView.template_name, {
+            'oficinas': oficinas,
+            'object_list': oficinas,
+            'page_obj': page_obj,
+            'paginator': page_obj.paginator,
+            'is_paginated': page_obj.has_other_pages(),
+            'q': request.GET.get('q', ''),
+            'orden': orden,
+        })
+
+
+class AsyncOficinaDetailView(CachedResponseMixin, View):
+    cache_models = OficinaDetailView.cache_models
+    cache_object_model = OficinaDetailView.cache_object_model
+
+    async def get(self, request, pk):
+        try:
+            oficina = await Oficina.objects.aget(pk=pk)
+        except Oficina.DoesNotExist:
+            raise Http404("No existe la oficina")
+        personas = (
+            Persona.objects.filter(oficina=oficina)
+            .only('id', 'nombre', 'apellido')
+            .order_by('apellido', 'nombre', 'id')
+        )
+        page_obj = await apaginate(personas, OficinaDetailView.personas_por_pagina, request.GET.get('page'))
+        return render(request, OficinaDetailView.template_name, {
+            'oficina': oficina,
+            'object': oficina,
+            'page_obj': page_obj,
+            'personas': page_obj.object_list,
+        })
@@ -0,0 +1,12 @@
+from .models import Oficina
+
+# Mismas columnas que acepta load_oficinas, para poder reimportar el archivo
+OFICINA_COLUMNS = (
+    ('id', 'id'),
+    ('nombre', 'nombre'),
+    ('nombre_corto', 'nombre_corto'),
+)
+
+
+def oficinas_queryset():
+    return Oficina.objects.order_by('id')
@@ -0,0 +1,60 @@
+from django.core.exceptions import ValidationError
+
+from crud.importing import CSVImporter, ParsedRow, RowError
+from .models import Oficina
+
+
+class OficinaImporter(CSVImporter):
+    """
+    Alta / actualización de oficinas (``load_oficinas``).
+
+    La clave de cada fila es el ``id`` si viene uno numérico; si no,
+    ``nombre_corto`` o, en su defecto, ``nombre``.
+    """
+
+    model = Oficina
+    fields = ('nombre', 'nombre_corto')
+    hash_fields = ('nombre', 'nombre_corto')
+    required_columns = ('nombre', 'nombre_corto')
+
+    def parse_row(self, row, line):
+        nombre = (row.get('nombre') or '').strip()
+        nombre_corto = (row.get('nombre_corto') or '').strip()
+        id_val = (row.get('id') or '').strip()
+
+        if not nombre and not nombre_corto:
+            raise RowError("sin nombre/nombre_corto")
+
+        values = {'nombre': nombre, 'nombre_corto': nombre_corto or None}
+        if id_val:
+            try:
+                return ParsedRow(line, ('id', int(id_val)), values)
+            except ValueError:
+                # id no numérico -> fallback por nombre_corto si existe
+                return ParsedRow(line, ('nombre_corto', nombre_corto or nombre), values)
+        if nombre_corto:
+            return ParsedRow(line, ('nombre_corto', nombre_corto), values)
+        return ParsedRow(line, ('nombre', nombre), values)
+
+
+class OficinaAltaImporter(CSVImporter):
+    """Sólo alta de oficinas validadas con el modelo (``importar_oficinas``)."""
+
+    model = Oficina
+    fields = ('nombre', 'nombre_corto')
+
+    def parse_row(self, row, line):
+        nombre = row.get('nombre')
+        nombre_corto = row.get('nombre_corto')
+        if not nombre or not nombre_corto:
+            raise RowError("Falta un campo")
+        values = {'nombre': nombre, 'nombre_corto': nombre_corto}
+        try:
+            # Sin validate_constraints: la unicidad de nombre_corto la
+            # controla la base por lote (evita una consulta por fila).
+            oficina = Oficina(**values)
+            oficina.clean_fields()
+            oficina.clean()
+        except ValidationError as e:
+            raise RowError(f"Error de validación. Detalle: {e}")
+        return ParsedRow(line, None, values)
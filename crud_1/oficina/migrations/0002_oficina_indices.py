@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:28
+
+from django.db import migrations, models
+from django.db.models import Count
+
+import crud.operations
+
+
+def blank_to_null(apps, schema_editor):
+    """Las oficinas sin código pasan a NULL y se verifica que no haya repetidos."""
+    Oficina = apps.get_model('oficina', 'Oficina')
+    oficinas = Oficina.objects.using(schema_editor.connection.alias)
+    oficinas.filter(nombre_corto='').update(nombre_corto=None)
+    repetidos = list(
+        oficinas.exclude(nombre_corto=None)
+        .values('nombre_corto')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('nombre_corto', flat=True)[:20]
+    )
+    if repetidos:
+        raise RuntimeError(
+            "Hay oficinas con nombre_corto repetido; corregirlas antes de migrar: "
+            + ', '.join(repetidos)
+        )
+
+
+def null_to_blank(apps, schema_editor):
+    Oficina = apps.get_model('oficina', 'Oficina')
+    Oficina.objects.using(schema_editor.connection.alias).filter(nombre_corto=None).update(nombre_corto='')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no admite transacciones
+    atomic = False
+
+    dependencies = [
+        ('oficina', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='oficina',
+            name='nombre_corto',
+            field=models.CharField(max_length=20, null=True, verbose_name='Nombre Corto'),
+        ),
+        migrations.RunPython(blank_to_null, null_to_blank),
+        crud.operations.AddIndexConcurrently(
+            model_name='oficina',
+            index=models.Index(fields=['nombre'], name='oficina_nombre_idx'),
+        ),
+        crud.operations.AddUniqueConstraintConcurrently(
+            model_name='oficina',
+            constraint=models.UniqueConstraint(fields=('nombre_corto',), name='oficina_nombre_corto_unico', violation_error_message='Ya existe una oficina con ese nombre corto.'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:41
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0002_oficina_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oficina',
+            name='contenido_hash',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.MD5(django.db.models.functions.text.Concat(django.db.models.functions.comparison.Cast('nombre', models.TextField()), models.Value('\x1f'), django.db.models.functions.comparison.Cast('nombre_corto', models.TextField()), output_field=models.TextField())), output_field=models.CharField(max_length=32)),
+        ),
+    ]
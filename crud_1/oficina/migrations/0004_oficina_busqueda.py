@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def crear_indices(apps, schema_editor):
+    from oficina import search
+    search.create_indexes(schema_editor.connection)
+
+
+def borrar_indices(apps, schema_editor):
+    from oficina import search
+    search.drop_indexes(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no admite transacciones
+    atomic = False
+
+    dependencies = [
+        ('oficina', '0003_contenido_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
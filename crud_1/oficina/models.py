@@ -1,17 +1,33 @@
 from django.db import models
+from crud.sync import hash_field
 
 class Oficina(models.Model):
     """Model definition for Oficina."""
 
     nombre = models.CharField(verbose_name="Nombre", max_length=50)
-    nombre_corto = models.CharField(verbose_name="Nombre Corto", max_length=20)
+    # NULL (y no '') cuando falta: así el índice único admite varias
+    # oficinas sin código.
+    nombre_corto = models.CharField(verbose_name="Nombre Corto", max_length=20, null=True)
+    # Hash de los campos que escribe load_oficinas (ver crud/sync.py)
+    contenido_hash = hash_field('nombre', 'nombre_corto')
 
     class Meta:
         """Meta definition for Oficina."""
 
         verbose_name = 'Oficina'
         verbose_name_plural = 'Oficinas'
+        indexes = [
+            # load_oficinas busca por nombre cuando la fila no trae nombre_corto
+            models.Index(fields=['nombre'], name='oficina_nombre_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['nombre_corto'],
+                name='oficina_nombre_corto_unico',
+                violation_error_message='Ya existe una oficina con ese nombre corto.',
+            ),
+        ]
 
     def __str__(self):
         """Unicode representation of Oficina."""
-        return f"{self.nombre} {self.nombre_corto}"
+        return f"{self.nombre} {self.nombre_corto or ''}".rstrip()
@@ -1,38 +1,20 @@
-import csv
 import sys
-from django.db import transaction
-from django.core.exceptions import ValidationError
-from oficina.models import Oficina
+from oficina.importers import OficinaAltaImporter
 
 def run(*args):
     if not args:
         print("Error: favor de proporcionar la ruta del archivo.")
-        print("Uso: ./manage.py runscrpt import_oficinas --script-args <ruta_del_archivo>")
+        print("Uso: ./manage.py runscript importar_oficinas --script-args <ruta_del_archivo> [chunk=<filas>]")
         sys.exit(1)
 
     csv_file = args[0]
-    try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            oficinas_a_crear = []
-            for row in reader:
-                nombre = row['nombre']
-                nombre_corto = row['nombre_corto']
-                if not nombre or not nombre_corto:
-                    print(f"Error en la fila {row}. Falta un campo")
-                    continue
-                try:
-                    oficina = Oficina(nombre=nombre, nombre_corto=nombre_corto)
-                    oficina.full_clean()  # Validar el modelo
-                    oficinas_a_crear.append(oficina)
-                except ValidationError as e:
-                    print(f"Error de validación en la fila {row}. Detalle: {e}")
-                except Exception as e:
-                    print(f"Error inesperado en la fila {row}. Detalle: {e}")
+    opciones = dict(arg.split('=', 1) for arg in args[1:] if '=' in arg)
 
-            with transaction.atomic():
-                Oficina.objects.bulk_create(oficinas_a_crear)
-                print(f"Importación de {len(oficinas_a_crear)} oficinas completada exitosamente.")
+    try:
+        importer = OficinaAltaImporter(chunk_size=int(opciones.get('chunk', 0)) or None)
+        stats = importer.run(csv_file)
+        print(f"Importación de {stats.creadas} oficinas completada exitosamente.")
+        print(stats.resumen())
     except FileNotFoundError:
         print(f"Error. No se encontro el archivo: {csv_file}")
     except Exception as e:
@@ -0,0 +1,193 @@
+"""
+Búsqueda por prefijo y listado ordenable de Oficina.
+
+``nombre`` y ``nombre_corto`` se buscan por prefijo sin distinguir
+mayúsculas con índices sobre ``lower(...)``:
+
+- SQLite: índices B-tree de expresión; el prefijo se consulta como rango
+  (``lower(nombre) >= 'ce' AND lower(nombre) < 'cf'``), que usa el índice
+  (``LIKE`` no, porque en SQLite es insensible a mayúsculas y no coincide
+  con la collation del índice). ``lower()`` de SQLite sólo pliega ASCII.
+- PostgreSQL: índices GIN de trigramas, que sirven ``LIKE 'ce%'`` con
+  cualquier collation.
+
+Las personas por oficina salen de ``home_contador`` con una subconsulta,
+así el listado ordena y cuenta en una sola consulta.
+"""
+import threading
+from collections import OrderedDict
+
+from django.db import connections, router
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+
+from crud.cache import model_version
+from home.counters import headcount_subquery, office_headcounts
+from .models import Oficina
+
+INDEXES = {
+    'oficina_nombre_lower_idx': 'nombre',
+    'oficina_corto_lower_idx': 'nombre_corto',
+}
+
+ORDENES = {
+    'nombre': ('nombre', 'id'),
+    '-nombre': ('-nombre', '-id'),
+    'nombre_corto': (F('nombre_corto').asc(nulls_last=True), 'id'),
+    '-nombre_corto': (F('nombre_corto').desc(nulls_last=True), '-id'),
+    'personas': (F('personas_count').asc(nulls_first=True), 'id'),
+    '-personas': (F('personas_count').desc(nulls_last=True), '-id'),
+}
+ORDEN_DEFAULT = 'nombre'
+
+AUTOCOMPLETE_LIMIT = 10
+
+
+# --- DDL ---------------------------------------------------------------
+
+def create_indexes(conn):
+    """Crea los índices de búsqueda para el motor de ``conn`` (idempotente)."""
+    table = conn.ops.quote_name(Oficina._meta.db_table)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for name, column in INDEXES.items():
+                # CONCURRENTLY: la migración es atomic = False
+                cursor.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                    f'ON {table} USING gin (lower({column}) gin_trgm_ops)'
+                )
+        elif conn.vendor == 'sqlite':
+            for name, column in INDEXES.items():
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} (lower({column}))')
+
+
+def drop_indexes(conn):
+    if conn.vendor not in ('postgresql', 'sqlite'):
+        return
+    with conn.cursor() as cursor:
+        for name in INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+# --- Consulta ----------------------------------------------------------
+
+def normalize(query, vendor):
+    """El prefijo tal como lo compara ``lower()`` del motor."""
+    query = (query or '').strip()
+    if vendor == 'sqlite':
+        return ''.join(c.lower() if c.isascii() else c for c in query)
+    return query.lower()
+
+
+def _next_prefix(prefix):
+    """Menor cadena mayor que todas las que empiezan con ``prefix`` (o None)."""
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+
+def _starts_with(alias, prefix, vendor):
+    if vendor == 'postgresql':
+        return Q(**{f'{alias}__startswith': prefix})
+    condition = Q(**{f'{alias}__gte': prefix})
+    upper = _next_prefix(prefix)
+    if upper is not None:
+        condition &= Q(**{f'{alias}__lt': upper})
+    return condition
+
+
+def filter_prefix(queryset, query):
+    """Oficinas cuyo ``nombre`` o ``nombre_corto`` empieza con ``query``."""
+    vendor = connections[queryset.db].vendor
+    prefix = normalize(query, vendor)
+    if not prefix:
+        return queryset
+    return queryset.alias(
+        _nombre=Lower('nombre'), _corto=Lower('nombre_corto'),
+    ).filter(_starts_with('_nombre', prefix, vendor) | _starts_with('_corto', prefix, vendor))
+
+
+def listado(query='', orden=ORDEN_DEFAULT):
+    """
+    Oficinas filtradas por prefijo, con ``personas_count`` y ordenadas por
+    ``orden`` (una clave de ``ORDENES``; las desconocidas usan la de
+    omisión).
+    """
+    queryset = Oficina.objects.annotate(personas_count=headcount_subquery())
+    queryset = filter_prefix(queryset, query)
+    return queryset.order_by(*ORDENES.get(orden, ORDENES[ORDEN_DEFAULT]))
+
+
+def fill_headcounts(oficinas):
+    """Completa ``personas_count`` de las oficinas que aún no tienen contador."""
+    faltantes = [oficina.pk for oficina in oficinas if oficina.personas_count is None]
+    if faltantes:
+        conteos = office_headcounts(faltantes)
+        for oficina in oficinas:
+            if oficina.personas_count is None:
+                oficina.personas_count = conteos[oficina.pk]
+    return oficinas
+
+
+# --- Autocompletar -----------------------------------------------------
+
+class LRUCache:
+    """Caché LRU en memoria del proceso, seguro entre hilos."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_autocomplete_cache = LRUCache()
+
+
+def autocomplete(query, limit=AUTOCOMPLETE_LIMIT, page=1):
+    """
+    Página ``page`` (de ``limit`` oficinas ``{id, nombre, nombre_corto}``)
+    de las que empiezan con ``query``, por nombre. Devuelve
+    ``(resultados, hay_mas)``.
+
+    Los prefijos frecuentes se guardan en ``_autocomplete_cache``; la clave
+    incluye la versión de Oficina de ``crud.cache``, así cualquier cambio
+    en las oficinas deja de usar lo guardado.
+    """
+    vendor = connections[router.db_for_read(Oficina)].vendor
+    prefix = normalize(query, vendor)
+    if not prefix:
+        return [], False
+    key = (model_version(Oficina), prefix, limit, page)
+    cached = _autocomplete_cache.get(key)
+    if cached is None:
+        start = (page - 1) * limit
+        # Una fila de más para saber si hay otra página
+        rows = list(
+            filter_prefix(Oficina.objects.all(), prefix)
+            .order_by('nombre', 'id')
+            .values('id', 'nombre', 'nombre_corto')[start:start + limit + 1]
+        )
+        cached = (rows[:limit], len(rows) > limit)
+        _autocomplete_cache.set(key, cached)
+    return cached
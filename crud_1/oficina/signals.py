@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from crud import cache
+from crud.signals import bulk_write
+from .models import Oficina
+
+
+@receiver(post_save, sender=Oficina)
+@receiver(post_delete, sender=Oficina)
+def oficina_modificada(sender, instance, **kwargs):
+    """Invalida las páginas cacheadas que muestran oficinas."""
+    cache.bump(Oficina, [instance.pk])
+
+
+@receiver(bulk_write, sender=Oficina)
+def oficinas_masivas(sender, pks, **kwargs):
+    cache.bump(Oficina, pks)
@@ -0,0 +1,61 @@
+// Autocompletado de oficinas (oficina.widgets.OficinaAutocompleteWidget).
+// Se carga una vez por página y atiende, por delegación, a todos los
+// elementos [data-autocomplete], incluso los que se agregan después.
+(function () {
+  function parts(root) {
+    return {
+      hidden: root.querySelector('input[type=hidden]'),
+      input: root.querySelector('input[type=search]'),
+      list: root.querySelector('ul')
+    };
+  }
+
+  function load(root, reset) {
+    var p = parts(root);
+    if (reset) { root.dataset.page = '1'; p.list.innerHTML = ''; }
+    var q = p.input.value.trim();
+    if (!q) { return; }
+    fetch(root.dataset.url + '?q=' + encodeURIComponent(q) + '&page=' + root.dataset.page)
+      .then(function (r) { return r.json(); })
+      .then(function (data) {
+        var more = p.list.querySelector('.mas');
+        if (more) { more.remove(); }
+        data.results.forEach(function (o) {
+          var li = document.createElement('li');
+          li.className = 'list-group-item list-group-item-action';
+          li.textContent = o.nombre + (o.nombre_corto ? ' ' + o.nombre_corto : '');
+          li.dataset.id = o.id;
+          p.list.appendChild(li);
+        });
+        if (data.more) {
+          var li = document.createElement('li');
+          li.className = 'list-group-item list-group-item-action mas text-muted';
+          li.textContent = 'Más resultados...';
+          p.list.appendChild(li);
+        }
+      });
+  }
+
+  document.addEventListener('input', function (event) {
+    var root = event.target.closest('[data-autocomplete]');
+    if (!root || event.target.type !== 'search') { return; }
+    parts(root).hidden.value = '';
+    clearTimeout(root.autocompleteTimer);
+    root.autocompleteTimer = setTimeout(function () { load(root, true); }, 250);
+  });
+
+  document.addEventListener('click', function (event) {
+    var li = event.target.closest('[data-autocomplete] li');
+    if (!li) { return; }
+    var root = li.closest('[data-autocomplete]');
+    if (li.classList.contains('mas')) {
+      root.dataset.page = String(Number(root.dataset.page) + 1);
+      load(root, false);
+      return;
+    }
+    var p = parts(root);
+    p.hidden.value = li.dataset.id;
+    p.input.value = li.textContent;
+    p.list.innerHTML = '';
+  });
+})();
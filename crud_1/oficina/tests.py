@@ -1,3 +1,354 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from crud import pgcopy
+from crud.querybudget import query_budget
+from persona.tests import async_get
+from persona.importers import PersonaImporter
+from persona.models import Persona
+from . import search
+from .async_views import AsyncOficinaDetailView, AsyncOficinaListView
+from .importers import OficinaAltaImporter, OficinaImporter
+from .models import Oficina
+
+
+class ImporterTestCase(TestCase):
+
+    def importar(self, importer_cls, rows, fieldnames=('id', 'nombre', 'nombre_corto'), **kwargs):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'datos.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as fh:
+                writer = csv.DictWriter(fh, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+            self.errores = io.StringIO()
+            importer = importer_cls(stdout=io.StringIO(), stderr=self.errores, **kwargs)
+            return importer.run(path)
+
+    def oficinas(self):
+        return set(Oficina.objects.values_list('nombre', 'nombre_corto'))
+
+
+class OficinaImporterTests(ImporterTestCase):
+
+    def test_alta_y_actualizacion(self):
+        rows = [
+            {'nombre': 'Central', 'nombre_corto': 'CEN'},
+            {'nombre': 'Norte', 'nombre_corto': 'NOR'},
+            # Repetida dentro del lote: gana la última
+            {'nombre': 'Norte bis', 'nombre_corto': 'NOR'},
+            {'nombre': 'Sin código', 'nombre_corto': ''},
+            {'nombre': '', 'nombre_corto': ''},
+        ]
+        stats = self.importar(OficinaImporter, rows, chunk_size=2)
+        self.assertEqual((stats.creadas, stats.actualizadas, stats.omitidas), (3, 1, 1))
+        self.assertEqual(self.oficinas(), {('Central', 'CEN'), ('Norte bis', 'NOR'), ('Sin código', None)})
+
+        rows[0]['nombre'] = 'Central nueva'
+        stats = self.importar(OficinaImporter, rows, chunk_size=2)
+        self.assertEqual((stats.creadas, stats.actualizadas), (0, 4))
+        self.assertIn(('Central nueva', 'CEN'), self.oficinas())
+        self.assertEqual(Oficina.objects.count(), 3)
+
+    def test_id_explicito(self):
+        stats = self.importar(OficinaImporter, [{'id': '500', 'nombre': 'Con id', 'nombre_corto': 'CID'}])
+        self.assertEqual(stats.creadas, 1)
+        self.assertEqual(Oficina.objects.get(pk=500).nombre_corto, 'CID')
+        # La secuencia de ids no vuelve a entregar el 500
+        self.assertGreater(Oficina.objects.create(nombre='Otra').pk, 500)
+
+        self.importar(OficinaImporter, [{'id': '500', 'nombre': 'Con id editada', 'nombre_corto': 'CID'}])
+        self.assertEqual(Oficina.objects.get(pk=500).nombre, 'Con id editada')
+
+    def test_sync_y_poda(self):
+        rows = [{'nombre': f'Oficina {i}', 'nombre_corto': f'OF{i}'} for i in range(5)]
+        self.importar(OficinaImporter, rows)
+        Oficina.objects.create(nombre='Fuera del archivo', nombre_corto='FUERA')
+        rows[0]['nombre'] = 'Oficina cambiada'
+        stats = self.importar(OficinaImporter, rows, prune=True, chunk_size=2)
+        self.assertEqual((stats.actualizadas, stats.sin_cambios, stats.eliminadas), (1, 4, 1))
+        self.assertFalse(Oficina.objects.filter(nombre_corto='FUERA').exists())
+
+    def test_alta_aisla_filas_que_rompen_restricciones(self):
+        Oficina.objects.create(nombre='Existente', nombre_corto='EXI')
+        rows = [
+            {'nombre': 'Nueva', 'nombre_corto': 'NUE'},
+            {'nombre': 'Repetida', 'nombre_corto': 'EXI'},
+            {'nombre': 'Otra', 'nombre_corto': 'OTR'},
+        ]
+        stats = self.importar(OficinaAltaImporter, rows, fieldnames=('nombre', 'nombre_corto'))
+        self.assertEqual((stats.creadas, stats.omitidas), (2, 1))
+        self.assertIn('línea 3', self.errores.getvalue())
+        self.assertEqual(Oficina.objects.get(nombre_corto='EXI').nombre, 'Existente')
+
+    def test_clave_repetida_toma_el_menor_id(self):
+        # nombre no es único: ORM y COPY actualizan el mismo registro
+        Oficina.objects.create(pk=20, nombre='Repetida', nombre_corto='B')
+        Oficina.objects.create(pk=10, nombre='Repetida', nombre_corto='A')
+        stats = self.importar(OficinaImporter, [{'nombre': 'Repetida', 'nombre_corto': ''}], fieldnames=('nombre', 'nombre_corto'))
+        self.assertEqual((stats.creadas, stats.actualizadas), (0, 1))
+        self.assertEqual(dict(Oficina.objects.values_list('pk', 'nombre_corto')), {10: None, 20: 'B'})
+
+    def test_camino_de_escritura_segun_motor(self):
+        with mock.patch.object(pgcopy, 'upsert', wraps=pgcopy.upsert) as upsert:
+            self.importar(OficinaImporter, [{'nombre': 'Central', 'nombre_corto': 'CEN'}])
+        # COPY + upsert sólo en PostgreSQL; el resto usa el ORM
+        self.assertEqual(upsert.called, connection.vendor == 'postgresql')
+        self.assertEqual(self.oficinas(), {('Central', 'CEN')})
+
+    def test_personas_por_codigo_de_oficina(self):
+        self.importar(OficinaImporter, [{'nombre': 'Central', 'nombre_corto': 'CEN'}])
+        rows = [
+            {'nombre': 'José', 'apellido': 'Pérez', 'edad': '30', 'oficina_nombre_corto': 'CEN'},
+            {'nombre': 'Ana', 'apellido': 'Gómez', 'edad': 'x', 'oficina_nombre_corto': 'CEN'},
+            {'nombre': 'Luis', 'apellido': 'Díaz', 'edad': '50', 'oficina_nombre_corto': 'ZZZ'},
+        ]
+        stats = self.importar(PersonaImporter, rows, fieldnames=('nombre', 'apellido', 'edad', 'oficina_nombre_corto'))
+        self.assertEqual((stats.creadas, stats.omitidas), (1, 2))
+        persona = Persona.objects.get()
+        self.assertEqual((persona.nombre, persona.oficina.nombre_corto), ('José', 'CEN'))
+
+
+class ExportTests(ImporterTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admin', password='clave-de-prueba')
+        cls.central = Oficina.objects.create(nombre='Central, "casa matriz"', nombre_corto='CEN')
+        cls.norte = Oficina.objects.create(nombre='Norte', nombre_corto=None)
+        Persona.objects.bulk_create([
+            Persona(nombre='José', apellido='Pérez', edad=30, oficina=cls.central),
+            Persona(nombre='Ana María', apellido="O'Neill, Jr.", edad=41, oficina=cls.central),
+            Persona(nombre='Luis', apellido='Díaz', edad=52, oficina=cls.norte),
+        ])
+
+    def personas(self):
+        return set(Persona.objects.values_list('nombre', 'apellido', 'edad', 'oficina__nombre'))
+
+    def exportar(self, comando, formato='csv'):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, f'export.{formato}')
+        out = io.StringIO()
+        call_command(comando, '--file', path, '--formato', formato, '--chunk-size', '2', stdout=out)
+        self.assertIn(f'Exportadas {self.filas[comando]} filas a {path}', out.getvalue())
+        with open(path, encoding='utf-8') as fh:
+            return path, fh.read()
+
+    filas = {'export_oficinas': 2, 'export_personas': 3}
+
+    def test_comandos_csv_y_ndjson(self):
+        _path, contenido = self.exportar('export_personas')
+        filas = list(csv.reader(io.StringIO(contenido)))
+        self.assertEqual(filas[0], ['nombre', 'apellido', 'edad', 'oficina_nombre_corto'])
+        self.assertEqual(filas[2], ['Ana María', "O'Neill, Jr.", '41', 'CEN'])
+        self.assertEqual(filas[3], ['Luis', 'Díaz', '52', ''])
+
+        _path, contenido = self.exportar('export_oficinas', 'ndjson')
+        self.assertEqual([json.loads(line) for line in contenido.splitlines()], [
+            {'id': self.central.pk, 'nombre': 'Central, "casa matriz"', 'nombre_corto': 'CEN'},
+            {'id': self.norte.pk, 'nombre': 'Norte', 'nombre_corto': None},
+        ])
+
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            call_command('export_oficinas')
+        self.assertEqual(stdout.getvalue().splitlines()[0], 'id,nombre,nombre_corto')
+
+    def test_ida_y_vuelta_por_los_importadores(self):
+        # importar_personas ubica la oficina por código
+        Oficina.objects.filter(pk=self.norte.pk).update(nombre_corto='NOR')
+        oficinas = set(Oficina.objects.values_list('id', 'nombre', 'nombre_corto'))
+        personas = self.personas()
+        path_oficinas, _ = self.exportar('export_oficinas')
+        path_personas, _ = self.exportar('export_personas')
+        Oficina.objects.all().delete()  # y sus personas
+
+        stats = OficinaImporter(stdout=io.StringIO(), stderr=io.StringIO()).run(path_oficinas)
+        self.assertEqual(stats.creadas, 2)
+        self.assertEqual(set(Oficina.objects.values_list('id', 'nombre', 'nombre_corto')), oficinas)
+
+        stats = PersonaImporter(stdout=io.StringIO(), stderr=io.StringIO()).run(path_personas)
+        self.assertEqual((stats.creadas, stats.omitidas), (3, 0))
+        self.assertEqual(self.personas(), personas)
+
+    def test_vistas_en_streaming(self):
+        self.client.force_login(self.user)
+        for url, encabezado, filas in ((reverse('oficina:exportar'), 'id,nombre,nombre_corto', 2),
+                                       (reverse('persona:exportar'), 'nombre,apellido,edad,oficina_nombre_corto', 3)):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+                self.assertRegex(response['Content-Disposition'], r'^attachment; filename="\w+\.csv"$')
+                lineas = b''.join(response.streaming_content).decode().splitlines()
+                self.assertEqual((lineas[0], len(lineas)), (encabezado, filas + 1))
+
+                response = self.client.get(url, {'formato': 'ndjson'})
+                self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+                objetos = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+                self.assertEqual(len(objetos), filas)
+                self.assertEqual(list(objetos[0]), encabezado.split(','))
+
+                self.assertEqual(self.client.get(url, {'formato': 'xml'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('persona:exportar')).status_code, 302)
+
+
+class ParallelImportTests(TransactionTestCase):
+    """``run_parallel`` (procesos de trabajo) contra ``run`` sobre el mismo archivo."""
+
+    # TRUNCATE ... CASCADE en PostgreSQL (ver persona.tests.DuplicadosTestCase)
+    available_apps = settings.INSTALLED_APPS
+
+    def setUp(self):
+        Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        Oficina.objects.create(nombre='Norte', nombre_corto='NOR')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'personas.csv')
+        rows = []
+        for i in range(60):
+            row = {'nombre': f'Nombre{i}', 'apellido': f'Apellido{i}', 'edad': str(20 + i % 50),
+                   'oficina_nombre_corto': ('CEN', 'NOR')[i % 2]}
+            if i % 11 == 3:
+                row['edad'] = 'x'
+            elif i % 13 == 5:
+                row['nombre'] = ''
+            elif i % 17 == 7:
+                row['oficina_nombre_corto'] = 'ZZZ'
+            rows.append(row)
+        # Repetida dentro del archivo: choca con la restricción única al escribir
+        rows.append(dict(rows[0], edad='99'))
+        with open(self.path, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.DictWriter(fh, fieldnames=['nombre', 'apellido', 'edad', 'oficina_nombre_corto'])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def importar(self, parallel):
+        errores = io.StringIO()
+        importer = PersonaImporter(chunk_size=7, stdout=io.StringIO(), stderr=errores)
+        if parallel:
+            stats = importer.run_parallel(self.path, workers=3, range_size=256)
+        else:
+            stats = importer.run(self.path)
+        personas = set(Persona.objects.values_list('nombre', 'apellido', 'edad', 'oficina__nombre_corto'))
+        Persona.objects.all().delete()
+        lineas = sorted(int(n) for n in re.findall(r'Omitida línea (\d+)', errores.getvalue()))
+        return (stats.filas, stats.creadas, stats.omitidas), lineas, personas
+
+    def test_igual_que_la_importacion_serial(self):
+        serial = self.importar(parallel=False)
+        paralela = self.importar(parallel=True)
+        self.assertEqual(paralela, serial)
+        (filas, creadas, omitidas), lineas, _personas = serial
+        self.assertEqual((filas, omitidas), (61, len(lineas)))
+        self.assertGreater(omitidas, 8)
+        # Números de línea del archivo (el encabezado es la 1)
+        self.assertIn(2 + 3, lineas)
+        self.assertEqual(lineas[-1], 62)
+
+    def test_prune_no_admite_paralelo(self):
+        importer = PersonaImporter(prune=True, stdout=io.StringIO(), stderr=io.StringIO())
+        with self.assertRaisesMessage(ValueError, 'no admite prune'):
+            importer.run_parallel(self.path, workers=2)
+
+
+class OficinaSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Oficina.objects.bulk_create([
+            Oficina(nombre='Central', nombre_corto='CEN'),
+            Oficina(nombre='Centro Cívico', nombre_corto='CIV'),
+            Oficina(nombre='Norte', nombre_corto='NOR'),
+            Oficina(nombre='Sur', nombre_corto='CESUR'),
+        ])
+
+    def nombres(self, queryset):
+        return sorted(queryset.values_list('nombre', flat=True))
+
+    def test_prefijo_sin_distinguir_mayusculas(self):
+        self.assertEqual(self.nombres(search.filter_prefix(Oficina.objects.all(), 'cen')), ['Central', 'Centro Cívico'])
+        self.assertEqual(self.nombres(search.filter_prefix(Oficina.objects.all(), 'CE')),
+                         ['Central', 'Centro Cívico', 'Sur'])
+        self.assertEqual(self.nombres(search.filter_prefix(Oficina.objects.all(), 'nor')), ['Norte'])
+        self.assertEqual(self.nombres(search.filter_prefix(Oficina.objects.all(), 'x')), [])
+
+    def test_autocompletar_por_paginas(self):
+        search._autocomplete_cache.clear()
+        primera, mas = search.autocomplete('ce', limit=2)
+        self.assertEqual([row['nombre'] for row in primera], ['Central', 'Centro Cívico'])
+        self.assertTrue(mas)
+        segunda, mas = search.autocomplete('ce', limit=2, page=2)
+        self.assertEqual([row['nombre'] for row in segunda], ['Sur'])
+        self.assertFalse(mas)
+
+    def test_indices_de_busqueda(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Oficina._meta.db_table)
+        self.assertLessEqual(set(search.INDEXES), set(constraints))
+
+
+class OficinaViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficinas = Oficina.objects.bulk_create([
+            Oficina(nombre=f'Oficina {i:02}', nombre_corto=f'OF{i:02}') for i in range(30)
+        ])
+        Persona.objects.bulk_create([
+            Persona(nombre=f'Nombre{i}', apellido=f'Apellido{i:02}', edad=30, oficina=cls.oficinas[i % 3])
+            for i in range(45)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lista_sin_consulta_por_oficina(self):
+        url = reverse('oficina:lista')
+        # Sin contadores (bulk_create no envía señales): se siembran todos juntos
+        with query_budget(max_queries=6, max_repeats=2):
+            response = self.client.get(url)
+        oficinas = response.context['oficinas']
+        self.assertEqual(len(oficinas), 30)
+        self.assertEqual([o.personas_count for o in oficinas[:4]], [15, 15, 15, 0])
+
+        cache.clear()
+        # COUNT(*) y la página, con la cantidad de personas de cada oficina
+        with query_budget(max_queries=2, max_repeats=1):
+            response = self.client.get(url)
+        self.assertEqual([o.personas_count for o in response.context['oficinas'][:4]], [15, 15, 15, 0])
+
+    def test_detalle_pagina_las_personas(self):
+        url = reverse('oficina:detalle', args=[self.oficinas[0].pk])
+        with query_budget(max_queries=3, max_repeats=1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['personas']), 15)
+        self.assertEqual(response.context['page_obj'].paginator.count, 15)
+        self.assertEqual(self.client.get(url, {'page': 99}).context['page_obj'].number, 1)
+
+    def test_vistas_async_cacheadas(self):
+        pk = self.oficinas[0].pk
+        for view_cls, url, kwargs in ((AsyncOficinaListView, reverse('oficina:lista'), {}),
+                                      (AsyncOficinaDetailView, reverse('oficina:detalle', args=[pk]), {'pk': pk})):
+            with self.subTest(url=url):
+                primera = async_get(view_cls, url, **kwargs)
+                self.assertEqual(primera['ETag'], self.client.get(url)['ETag'])
+                with query_budget(max_queries=0):
+                    segunda = async_get(view_cls, url, **kwargs)
+                self.assertEqual(segunda.content, primera.content)
+                self.assertEqual(async_get(view_cls, url, headers={'If-None-Match': primera['ETag']},
+                                           **kwargs).status_code, 304)
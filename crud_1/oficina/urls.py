@@ -1,5 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from .views import *
+from .api import OficinaApiListView, OficinaApiBulkView
+
+if settings.ASYNC_VIEWS:
+    # Variantes async (ASGI) de las vistas de lectura
+    from .async_views import (
+        AsyncOficinaListView as OficinaListView,
+        AsyncOficinaDetailView as OficinaDetailView,
+    )
 
 app_name = 'oficina'
 
@@ -9,6 +18,16 @@ urlpatterns = [
         OficinaListView.as_view(),
         name='lista'
     ),
+    path(
+        'buscar/',
+        OficinaSearchView.as_view(),
+        name='buscar'
+    ),
+    path(
+        'autocompletar/',
+        OficinaAutocompleteView.as_view(),
+        name='autocompletar'
+    ),
     path(
         'detalle/<int:pk>/',
         OficinaDetailView.as_view(),
@@ -29,4 +48,19 @@ urlpatterns = [
         OficinaDeleteView.as_view(),
         name='eliminar'
     ),
+    path(
+        'api/',
+        OficinaApiListView.as_view(),
+        name='api_lista'
+    ),
+    path(
+        'api/bulk/',
+        OficinaApiBulkView.as_view(),
+        name='api_bulk'
+    ),
+    path(
+        'exportar/',
+        OficinaExportView.as_view(),
+        name='exportar'
+    ),
 ]
\ No newline at end of file
@@ -1,25 +1,84 @@
 from django.shortcuts import render
-from django.views.generic import ListView , DetailView, CreateView, UpdateView, DeleteView
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.views.generic import View, ListView , DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from .models import Oficina
 from django.db.models import Q
 # Import login mixins if needed
 from django.contrib.auth.mixins import LoginRequiredMixin
+from persona import bulk
 from persona.models import Persona
+from crud.cache import CachedResponseMixin
+from crud.exporting import ExportMixin
+from .exports import OFICINA_COLUMNS, oficinas_queryset
+from . import search
 
-class OficinaListView(ListView):
+class OficinaListView(CachedResponseMixin, ListView):
     model = Oficina
+    cache_models = (Oficina, Persona)
     template_name = 'oficina/lista.html'
     context_object_name = 'oficinas'
+    paginate_by = 50
 
-class OficinaDetailView(DetailView):
+    def get_orden(self):
+        orden = self.request.GET.get('orden', search.ORDEN_DEFAULT)
+        return orden if orden in search.ORDENES else search.ORDEN_DEFAULT
+
+    def get_queryset(self):
+        return search.listado(self.request.GET.get('q', ''), self.get_orden())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        oficinas = search.fill_headcounts(list(context['oficinas']))
+        context['oficinas'] = context['object_list'] = oficinas
+        context['q'] = self.request.GET.get('q', '')
+        context['orden'] = self.get_orden()
+        return context
+
+class OficinaSearchView(CachedResponseMixin, ListView):
     model = Oficina
+    cache_models = (Oficina,)
+    template_name = 'oficina/buscar.html'
+    context_object_name = 'oficinas'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return search.filter_prefix(Oficina.objects.all(), self.request.GET.get('q', '')).order_by('nombre', 'id')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['q'] = self.request.GET.get('q', '')
+        context['titulo'] = f"Oficinas que empiezan con «{context['q']}»" if context['q'] else "Buscar oficinas"
+        return context
+
+class OficinaAutocompleteView(View):
+    def get(self, request):
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        results, more = search.autocomplete(request.GET.get('q', ''), page=page)
+        return JsonResponse({'results': results, 'more': more})
+
+class OficinaDetailView(CachedResponseMixin, DetailView):
+    model = Oficina
+    cache_models = (Persona,)
+    cache_object_model = Oficina
     template_name = 'oficina/detalle.html'
     context_object_name = 'oficina'
+    personas_por_pagina = 20
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['personas'] = Persona.objects.filter(oficina=self.object)
+        personas = (
+            Persona.objects.filter(oficina=self.object)
+            .only('id', 'nombre', 'apellido')
+            .order_by('apellido', 'nombre', 'id')
+        )
+        page_obj = Paginator(personas, self.personas_por_pagina).get_page(self.request.GET.get('page'))
+        context['page_obj'] = page_obj
+        context['personas'] = page_obj.object_list
         return context
 
 class OficinaCreateView(LoginRequiredMixin, CreateView):
@@ -39,8 +98,24 @@ class OficinaDeleteView(LoginRequiredMixin, DeleteView):
     template_name = 'oficina/eliminar.html'
     context_object_name = 'oficina'
     success_url = reverse_lazy('oficina:lista')
+    # El borrado de las personas va por lotes (ver crud.middleware)
+    query_budget_exempt = True
+
+    def form_valid(self, form):
+        # Las personas se borran antes por lotes: el CASCADE las borraría
+        # todas en una sola transacción. Lo que quede (altas de último
+        # momento) lo borra el CASCADE.
+        bulk.delete(Persona.objects.filter(oficina=self.object))
+        return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['action'] = 'eliminar'
-        return context
\ No newline at end of file
+        return context
+
+class OficinaExportView(LoginRequiredMixin, ExportMixin, View):
+    export_columns = OFICINA_COLUMNS
+    export_filename = "oficinas"
+
+    def get_export_queryset(self):
+        return oficinas_queryset()
@@ -0,0 +1,55 @@
+"""
+Selector de oficina con autocompletado.
+
+Reemplaza al ``<select>`` del ``ForeignKey``, que carga y muestra todas las
+oficinas en cada render. El widget sólo lee la oficina elegida (una
+búsqueda por clave primaria) y pide las opciones a ``oficina:autocompletar``
+a medida que se escribe, de a una página por vez.
+
+El JavaScript es un archivo estático (``oficina/autocomplete.js``) en el
+``Media`` del widget: el formulario lo incluye una sola vez aunque tenga
+varios selectores, y el script atiende a todos los ``[data-autocomplete]``.
+"""
+from django import forms
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .models import Oficina
+
+
+class OficinaAutocompleteWidget(forms.Widget):
+
+    class Media:
+        js = ['oficina/autocomplete.js']
+
+    def __init__(self, attrs=None, url_name='oficina:autocompletar'):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def label_for(self, value):
+        if value in (None, ''):
+            return ''
+        if isinstance(value, Oficina):
+            return str(value)
+        try:
+            oficina = Oficina.objects.only('id', 'nombre', 'nombre_corto').filter(pk=value).first()
+        except (TypeError, ValueError):
+            return ''
+        return str(oficina) if oficina else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        pk = value.pk if isinstance(value, Oficina) else value
+        return format_html(
+            '<div class="position-relative" data-autocomplete data-url="{}">'
+            '<input type="hidden" name="{}" value="{}">'
+            '<input type="search" id="{}" class="form-control" value="{}" '
+            'placeholder="Escribir nombre o código" autocomplete="off">'
+            '<ul class="list-group position-absolute w-100" style="z-index: 10"></ul>'
+            '</div>',
+            reverse(self.url_name),
+            name,
+            '' if pk is None else pk,
+            attrs.get('id', f'id_{name}'),
+            self.label_for(value),
+        )
@@ -1,4 +1,101 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+
+from crud.pagination import EstimatedCountPaginator
+from home.models import Contador
+from home.counters import oficina_key
+from oficina.models import Oficina
+from oficina.widgets import OficinaAutocompleteWidget
+from . import bulk, search
 from .models import Persona
 
-admin.site.register(Persona)
\ No newline at end of file
+
+class PersonaActionForm(ActionForm):
+    """Datos extra de las acciones masivas (nueva edad, oficina destino)."""
+
+    edad = forms.IntegerField(required=False, min_value=0, label="Edad")
+    oficina = forms.ModelChoiceField(
+        queryset=Oficina.objects.only('id', 'nombre', 'nombre_corto'),
+        widget=OficinaAutocompleteWidget, required=False, label="Oficina",
+    )
+
+
+class OficinaListFilter(admin.SimpleListFilter):
+    """
+    Filtro por oficina (cubierto por ``persona_ofi_ape_nom_id_idx``). Sólo
+    ofrece las oficinas con más personas según ``home_contador``; cualquier
+    otra se filtra con ``?oficina=<id>``.
+    """
+
+    title = "oficina"
+    parameter_name = 'oficina'
+    limite = 20
+
+    def lookups(self, request, model_admin):
+        prefijo = oficina_key('')
+        claves = (
+            Contador.objects.filter(clave__startswith=prefijo, valor__gt=0)
+            .order_by('-valor')
+            .values_list('clave', flat=True)[:self.limite]
+        )
+        ids = [int(clave[len(prefijo):]) for clave in claves]
+        oficinas = Oficina.objects.only('id', 'nombre', 'nombre_corto').in_bulk(ids)
+        return [(str(pk), str(oficinas[pk])) for pk in ids if pk in oficinas]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            try:
+                return queryset.filter(oficina_id=int(self.value()))
+            except ValueError:
+                return queryset.none()
+        return queryset
+
+
+@admin.register(Persona)
+class PersonaAdmin(admin.ModelAdmin):
+    list_display = ('apellido', 'nombre', 'edad', 'oficina')
+    list_select_related = ('oficina',)
+    list_filter = (OficinaListFilter,)
+    # Orden cubierto por persona_ape_nom_id_idx
+    ordering = ('apellido', 'nombre', 'id')
+    search_fields = ('nombre', 'apellido')
+    search_help_text = "Busca por palabras o prefijos de nombre y apellido."
+    autocomplete_fields = ('oficina',)
+    readonly_fields = ('contenido_hash',)
+    list_per_page = 50
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    action_form = PersonaActionForm
+    actions = ('cambiar_edad', 'mover_a_oficina')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Índice de texto completo en lugar de LIKE '%...%' sobre cada campo
+        if not search_term:
+            return queryset, False
+        return search.filter_queryset(queryset, search_term), False
+
+    def delete_queryset(self, request, queryset):
+        # DELETE por lotes con una señal por lote, no un post_delete por fila
+        bulk.delete(queryset)
+
+    @admin.action(description="Cambiar la edad de las personas seleccionadas")
+    def cambiar_edad(self, request, queryset):
+        edad = request.POST.get('edad')
+        if not edad or not edad.isdigit():
+            self.message_user(request, "Indicar la edad.", messages.WARNING)
+            return
+        total = bulk.set_edad(queryset, int(edad))
+        self.message_user(request, f"Se cambió la edad de {total} personas.")
+
+    @admin.action(description="Mover las personas seleccionadas a la oficina")
+    def mover_a_oficina(self, request, queryset):
+        oficina_id = request.POST.get('oficina', '')
+        oficina = Oficina.objects.filter(pk=oficina_id).first() if oficina_id.isdigit() else None
+        if oficina is None:
+            self.message_user(request, "Elegir la oficina destino.", messages.WARNING)
+            return
+        total, omitidas = bulk.move(queryset, oficina)
+        self.message_user(request, f"Se movieron {total} personas a {oficina}.")
+        if omitidas:
+            self.message_user(request, bulk.MOVE_SKIPPED.format(n=len(omitidas), oficina=oficina), messages.WARNING)
@@ -0,0 +1,47 @@
+from crud.api import ApiBulkView, ApiListView
+from oficina.models import Oficina
+from .models import Persona
+
+PERSONA_FIELDS = {
+    'id': 'id',
+    'nombre': 'nombre',
+    'apellido': 'apellido',
+    'edad': 'edad',
+    'oficina': 'oficina_id',
+    'oficina_nombre_corto': 'oficina__nombre_corto',
+}
+DEFAULT_FIELDS = ('id', 'nombre', 'apellido', 'edad', 'oficina')
+
+
+class PersonaApiListView(ApiListView):
+    model = Persona
+    fields = PERSONA_FIELDS
+    default_fields = DEFAULT_FIELDS
+    filters = {
+        'oficina': ('oficina_id', int),
+        'oficina_nombre_corto': ('oficina__nombre_corto', str),
+        'edad': ('edad', int),
+        'edad_min': ('edad__gte', int),
+        'edad_max': ('edad__lte', int),
+    }
+
+
+class PersonaApiBulkView(ApiBulkView):
+    model = Persona
+    fields = PERSONA_FIELDS
+    default_fields = DEFAULT_FIELDS
+    writable_fields = ('nombre', 'apellido', 'edad', 'oficina')
+
+    def clean_foreign_keys(self, objs):
+        ids = {obj.oficina_id for _i, obj in objs}
+        existentes = set(Oficina.objects.filter(pk__in=ids - {None}).values_list('pk', flat=True))
+        return {
+            index: {'oficina': ["No existe la oficina"]}
+            for index, obj in objs if obj.oficina_id not in existentes
+        }
+
+    def update_signal_kwargs(self, objs, originals):
+        # Oficinas de origen y destino, para recontar sus contadores
+        cambios = [(originals[obj.pk]['oficina_id'], obj.oficina_id) for obj in objs
+                   if originals[obj.pk]['oficina_id'] != obj.oficina_id]
+        return {'oficina_ids': sorted({pk for par in cambios for pk in par})}
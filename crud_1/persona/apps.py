@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PersonaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'persona'
+
+    def ready(self):
+        # Registra los receptores de señales (índice de búsqueda)
+        from . import signals  # noqa: F401
@@ -0,0 +1,93 @@
+"""
+Variantes async de las vistas de lectura de Persona (ORM async).
+
+Se sirven en lugar de las vistas síncronas cuando ``settings.ASYNC_VIEWS``
+está activo; bajo ASGI un mismo worker atiende muchos clientes lentos sin
+ocupar un hilo por request. Usan el mismo ``CachedResponseMixin`` (caché de
+páginas, ETag y 304) que las síncronas.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import render
+from django.views import View
+
+from crud.cache import CachedResponseMixin
+from crud.pagination import akeyset_paginate, apaginate, approximate_count
+from . import search
+from .models import Persona
+from .views import PersonaDetailView, PersonaListView, PersonaSearchView
+
+
+class AsyncPersonaListView(CachedResponseMixin, View):
+    cache_models = PersonaListView.cache_models
+
+    async def get(self, request):
+        page = await akeyset_paginate(
+            PersonaListView.queryset,
+            PersonaListView.keyset_ordering,
+            PersonaListView.paginate_by,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        total = await sync_to_async(approximate_count)(Persona)
+        return render(request, PersonaListView.template_name, {
+            'personas': page.object_list,
+            'object_list': page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_next or page.has_previous,
+            'total_aproximado': total,
+        })
+
+
+class AsyncPersonaDetailView(CachedResponseMixin, View):
+    cache_models = PersonaDetailView.cache_models
+    cache_object_model = PersonaDetailView.cache_object_model
+
+    async def get(self, request, pk):
+        try:
+            persona = await PersonaDetailView.queryset.aget(pk=pk)
+        except Persona.DoesNotExist:
+            raise Http404("No existe la persona")
+        return render(request, PersonaDetailView.template_name, {'persona': persona, 'object': persona})
+
+
+class AsyncPersonaSearchView(CachedResponseMixin, View):
+    cache_models = PersonaSearchView.cache_models
+
+    async def get(self, request):
+        query = request.GET.get('q', '')
+        context = {'titulo': 'Buscar Personas', 'query': query, 'personas': []}
+        if query:
+            results = await sync_to_async(search.search)(query)
+            if isinstance(results, search.SearchResults):
+                # El índice FTS se consulta con SQL crudo; las personas con el ORM async
+                page_obj = await sync_to_async(_search_page)(results, request.GET.get('page'))
+                personas = await Persona.objects.using(results.using).ain_bulk(page_obj.object_list)
+                page_obj.object_list = [personas[pk] for pk in page_obj.object_list if pk in personas]
+            else:
+                page_obj = await apaginate(results, PersonaSearchView.paginate_by, request.GET.get('page'))
+            context.update(
+                personas=page_obj.object_list,
+                page_obj=page_obj,
+                paginator=page_obj.paginator,
+                is_paginated=page_obj.has_other_pages(),
+            )
+        return render(request, PersonaSearchView.template_name, context)
+
+
+def _search_page(results, number):
+    """Página de ids del índice de búsqueda (sin cargar las personas)."""
+    paginator = Paginator(_IdResults(results), PersonaSearchView.paginate_by)
+    return paginator.get_page(number)
+
+
+class _IdResults:
+    def __init__(self, results):
+        self.results = results
+
+    def count(self):
+        return self.results.count()
+
+    def __getitem__(self, item):
+        return self.results.ids(item.start, item.stop - item.start)
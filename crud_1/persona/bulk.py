@@ -0,0 +1,103 @@
+"""
+Operaciones masivas sobre Persona (mover de oficina, cambiar la edad,
+borrar) a partir de un queryset filtrado.
+
+Los ids se recorren por keyset (``id > último``) de a ``batch_size`` y cada
+lote se aplica con un solo ``UPDATE`` / ``DELETE`` en su propia
+transacción: ninguna transacción retiene la tabla más de lo que tarda un
+lote. Cada lote envía ``bulk_write`` (ver ``crud.signals``) para mantener
+el índice de búsqueda, los contadores y el caché.
+"""
+from django.db import connections, router, transaction
+
+from crud.routers import use_primary
+from crud.signals import bulk_write
+from .models import Persona
+
+BATCH_SIZE = 1000
+# Aviso para las personas que ``move`` no pudo mover
+MOVE_SKIPPED = "No se movieron {n} personas: ya hay alguien con el mismo nombre y apellido en {oficina}."
+
+
+def id_batches(queryset, batch_size=BATCH_SIZE):
+    """Produce listas de ids de ``queryset`` en orden, releyendo el filtro en cada lote."""
+    last_id = 0
+    while True:
+        # Se va a escribir sobre lo leído: primario, no una réplica atrasada
+        with use_primary():
+            ids = list(
+                queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def delete_ids(ids):
+    """
+    Borra las personas ``ids`` con un ``DELETE`` directo (Persona no tiene
+    dependientes) y una sola señal; debe llamarse dentro de una transacción.
+    """
+    bulk_write.send(sender=Persona, action='delete', pks=ids)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connections[router.db_for_write(Persona)].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {Persona._meta.db_table} WHERE id IN ({placeholders})', ids)
+        return cursor.rowcount
+
+
+def move(queryset, oficina, batch_size=BATCH_SIZE):
+    """
+    Pasa las personas de ``queryset`` a ``oficina``. Se omiten las que
+    chocarían con la restricción única (ya hay alguien con el mismo nombre y
+    apellido en ``oficina``, o llega otra igual en el mismo lote).
+
+    Devuelve ``(movidas, omitidas)``: la cantidad movida y los ids omitidos.
+    """
+    total = 0
+    omitidas = []
+    for ids in id_batches(queryset.exclude(oficina=oficina), batch_size):
+        with transaction.atomic(), use_primary():
+            filas = list(Persona.objects.filter(pk__in=ids).values_list('pk', 'nombre', 'apellido', 'oficina_id'))
+            ocupados = set(
+                Persona.objects.filter(
+                    oficina=oficina,
+                    nombre__in={nombre for _, nombre, _, _ in filas},
+                    apellido__in={apellido for _, _, apellido, _ in filas},
+                ).values_list('nombre', 'apellido')
+            )
+            mover, origenes = [], set()
+            for pk, nombre, apellido, oficina_id in filas:
+                if (nombre, apellido) in ocupados:
+                    omitidas.append(pk)
+                    continue
+                ocupados.add((nombre, apellido))
+                mover.append(pk)
+                origenes.add(oficina_id)
+            if not mover:
+                continue
+            total += Persona.objects.filter(pk__in=mover).update(oficina=oficina)
+            bulk_write.send(
+                sender=Persona, action='update', pks=mover,
+                oficina_ids=sorted(origenes | {oficina.pk}),
+            )
+    return total, omitidas
+
+
+def set_edad(queryset, edad, batch_size=BATCH_SIZE):
+    """Cambia la edad de las personas de ``queryset``. Devuelve cuántas se modificaron."""
+    total = 0
+    for ids in id_batches(queryset.exclude(edad=edad), batch_size):
+        with transaction.atomic():
+            total += Persona.objects.filter(pk__in=ids).update(edad=edad)
+            bulk_write.send(sender=Persona, action='update', pks=ids)
+    return total
+
+
+def delete(queryset, batch_size=BATCH_SIZE):
+    """Borra las personas de ``queryset``. Devuelve cuántas se borraron."""
+    total = 0
+    for ids in id_batches(queryset, batch_size):
+        with transaction.atomic():
+            total += delete_ids(ids)
+    return total
@@ -0,0 +1,104 @@
+"""
+Deduplicación set-based de Persona.
+
+Los duplicados son las filas con el mismo ``(nombre, apellido, oficina)``;
+se conserva la de menor ``id``. Los perdedores se calculan con una sola
+consulta ``ROW_NUMBER() OVER (PARTITION BY ...)`` que se materializa en una
+tabla temporal, y se borran por lotes acotados, cada uno en su propia
+transacción.
+
+La restricción ``persona_unica_nom_ape_ofi`` (migración ``0006``) impide
+duplicados nuevos. Si al migrar ya había duplicados la migración no la
+crea; ``add_unique_constraint`` la crea después de limpiarlos
+(``dedupe_personas --unique``).
+"""
+from django.db import connection, models, transaction
+from django.db.models import Count, Min
+
+from crud import operations
+from crud.signals import bulk_write
+from .models import Persona
+
+TEMP_TABLE = 'persona_dedupe_perdedores'
+UNIQUE_CONSTRAINT = 'persona_unica_nom_ape_ofi'
+# Índice que la restricción reemplaza (migración 0004)
+OLD_INDEX = models.Index(fields=['nombre', 'apellido', 'oficina'], name='persona_nom_ape_ofi_idx')
+
+
+def duplicate_groups(limit=None):
+    """Grupos duplicados con el id que se conserva y la cantidad a borrar (una consulta)."""
+    qs = (
+        Persona.objects.values('nombre', 'apellido', 'oficina__nombre_corto')
+        .annotate(conservar=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+        .order_by('conservar')
+    )
+    return qs[:limit] if limit else qs
+
+
+def collect_losers():
+    """Materializa en una tabla temporal los ids a borrar; devuelve cuántos son."""
+    table = Persona._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TEMP_TABLE}')
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {TEMP_TABLE} AS '
+            f'SELECT id FROM ('
+            f'  SELECT id, ROW_NUMBER() OVER ('
+            f'    PARTITION BY nombre, apellido, oficina_id ORDER BY id'
+            f'  ) AS rn FROM {table}'
+            f') t WHERE rn > 1'
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM {TEMP_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def delete_losers(batch_size=1000):
+    """
+    Borra por lotes los ids de la tabla temporal. Produce la cantidad
+    acumulada de eliminados después de cada lote.
+    """
+    table = Persona._meta.db_table
+    last_id = 0
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id FROM {TEMP_TABLE} WHERE id > %s ORDER BY id LIMIT %s',
+                    [last_id, batch_size],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                bulk_write.send(sender=Persona, action='delete', pks=ids)
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+                deleted += cursor.rowcount
+        last_id = ids[-1]
+        yield deleted
+
+
+def drop_losers():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TEMP_TABLE}')
+
+
+
+def add_unique_constraint():
+    """
+    Crea la restricción única si falta (la migración 0006 la omite cuando
+    hay duplicados) y borra el índice que reemplaza. Devuelve ``False`` si
+    ya existía; ``ValueError`` si todavía hay duplicados.
+    """
+    if operations.index_exists(connection, Persona, UNIQUE_CONSTRAINT):
+        return False
+    constraint = next(c for c in Persona._meta.constraints if c.name == UNIQUE_CONSTRAINT)
+    if operations.has_duplicates(connection, Persona, constraint.fields):
+        raise ValueError("Todavía hay personas repetidas: correr dedupe_personas sin --dry-run.")
+    with connection.schema_editor(atomic=False) as editor:
+        operations.add_unique_constraint(editor, Persona, constraint)
+        if operations.index_exists(connection, Persona, OLD_INDEX.name):
+            concurrently = {'concurrently': True} if connection.vendor == 'postgresql' else {}
+            editor.remove_index(Persona, OLD_INDEX, **concurrently)
+    return True
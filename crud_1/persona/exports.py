@@ -0,0 +1,13 @@
+from .models import Persona
+
+# Mismas columnas que lee importar_personas, para poder reimportar el archivo
+PERSONA_COLUMNS = (
+    ('nombre', 'nombre'),
+    ('apellido', 'apellido'),
+    ('edad', 'edad'),
+    ('oficina_nombre_corto', 'oficina__nombre_corto'),
+)
+
+
+def personas_queryset():
+    return Persona.objects.order_by('id')
@@ -0,0 +1,74 @@
+from django import forms
+
+from oficina.models import Oficina
+from oficina.widgets import OficinaAutocompleteWidget
+from .models import Persona
+
+
+class PersonaForm(forms.ModelForm):
+    """Alta y edición de personas; la oficina se elige con autocompletado."""
+
+    # La validación resuelve el id elegido con una búsqueda por clave
+    # primaria; las opciones nunca se listan completas.
+    oficina = forms.ModelChoiceField(
+        queryset=Oficina.objects.only('id', 'nombre', 'nombre_corto'),
+        widget=OficinaAutocompleteWidget,
+        error_messages={'invalid_choice': "La oficina elegida no existe."},
+    )
+
+    class Meta:
+        model = Persona
+        fields = ['nombre', 'apellido', 'edad', 'oficina']
+
+
+class PersonaBulkForm(forms.Form):
+    """Filtro y acción de una operación masiva (ver ``persona.bulk``)."""
+
+    MOVER = 'mover'
+    EDAD = 'edad'
+    ELIMINAR = 'eliminar'
+    ACCIONES = [
+        (MOVER, "Mover a otra oficina"),
+        (EDAD, "Cambiar la edad"),
+        (ELIMINAR, "Eliminar"),
+    ]
+
+    oficina = forms.ModelChoiceField(
+        queryset=Oficina.objects.only('id', 'nombre', 'nombre_corto'),
+        widget=OficinaAutocompleteWidget, required=False, label="De la oficina",
+    )
+    apellido = forms.CharField(max_length=50, required=False, label="Apellido (comienza con)")
+    edad_desde = forms.IntegerField(required=False, min_value=0)
+    edad_hasta = forms.IntegerField(required=False, min_value=0)
+    accion = forms.ChoiceField(choices=ACCIONES)
+    destino = forms.ModelChoiceField(
+        queryset=Oficina.objects.only('id', 'nombre', 'nombre_corto'),
+        widget=OficinaAutocompleteWidget, required=False, label="Oficina destino",
+    )
+    edad = forms.IntegerField(required=False, min_value=0, label="Nueva edad")
+
+    def clean(self):
+        cleaned = super().clean()
+        filtros = ('oficina', 'apellido', 'edad_desde', 'edad_hasta')
+        if not any(cleaned.get(name) not in (None, '') for name in filtros):
+            raise forms.ValidationError("Indicar al menos un filtro.")
+        accion = cleaned.get('accion')
+        if accion == self.MOVER and not cleaned.get('destino'):
+            self.add_error('destino', "Elegir la oficina destino.")
+        if accion == self.EDAD and cleaned.get('edad') is None:
+            self.add_error('edad', "Indicar la nueva edad.")
+        return cleaned
+
+    def queryset(self):
+        """Personas que cumplen el filtro."""
+        cleaned = self.cleaned_data
+        qs = Persona.objects.all()
+        if cleaned['oficina']:
+            qs = qs.filter(oficina=cleaned['oficina'])
+        if cleaned['apellido']:
+            qs = qs.filter(apellido__startswith=cleaned['apellido'])
+        if cleaned['edad_desde'] is not None:
+            qs = qs.filter(edad__gte=cleaned['edad_desde'])
+        if cleaned['edad_hasta'] is not None:
+            qs = qs.filter(edad__lte=cleaned['edad_hasta'])
+        return qs
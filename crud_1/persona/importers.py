@@ -0,0 +1,81 @@
+from django.core.exceptions import ValidationError
+
+from crud.importing import CSVImporter, ParsedRow, RowError
+from oficina.models import Oficina
+from . import bulk
+from .models import Persona
+
+
+class PersonaImporter(CSVImporter):
+    """
+    Alta de personas desde CSV (``importar_personas``).
+
+    La oficina se indica por ``oficina_nombre_corto`` y se resuelve por lote
+    con una sola consulta ``IN``; los códigos ya vistos quedan en un caché
+    acotado para no repetir la consulta en cada lote.
+
+    Normalmente cada fila es un alta. En modo sync la clave es
+    ``(nombre, apellido, oficina)``: las filas que ya existen con la misma
+    edad no se escriben y las que cambiaron se actualizan.
+    """
+
+    model = Persona
+    fields = ('nombre', 'apellido', 'edad', 'oficina')
+    hash_fields = ('nombre', 'apellido', 'edad', 'oficina_id')
+    sync_key = ('nombre', 'apellido', 'oficina_id')
+    required_columns = ('nombre', 'apellido', 'edad', 'oficina_nombre_corto')
+    max_cached_oficinas = 10000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.oficina_ids = {}
+
+    def parse_row(self, row, line):
+        nombre = row.get('nombre')
+        apellido = row.get('apellido')
+        edad = row.get('edad')
+        if not nombre or not apellido or not edad:
+            raise RowError("Falta el nombre o el apellido o la edad")
+        try:
+            edad = int(edad)
+        except (ValueError, TypeError):
+            raise RowError("la edad no es un numero valido")
+        persona = Persona(nombre=nombre, apellido=apellido, edad=edad)
+        try:
+            # La oficina se valida por lote en prepare_chunk
+            persona.clean_fields(exclude=['oficina'])
+        except ValidationError as e:
+            raise RowError(f"Error validación. Detalle: {e}")
+        values = {'nombre': nombre, 'apellido': apellido, 'edad': edad,
+                  'oficina_nombre_corto': row.get('oficina_nombre_corto') or ''}
+        return ParsedRow(line, None, values)
+
+    def resolve_oficinas(self, codigos):
+        faltantes = {c for c in codigos if c and c not in self.oficina_ids}
+        if faltantes:
+            if len(self.oficina_ids) + len(faltantes) > self.max_cached_oficinas:
+                self.oficina_ids.clear()
+            encontradas = dict(
+                Oficina.objects.filter(nombre_corto__in=faltantes).values_list('nombre_corto', 'id')
+            )
+            for codigo in faltantes:
+                self.oficina_ids[codigo] = encontradas.get(codigo)
+        return self.oficina_ids
+
+    def prepare_chunk(self, rows):
+        oficina_ids = self.resolve_oficinas({parsed.values['oficina_nombre_corto'] for parsed in rows})
+        validas = []
+        for parsed in rows:
+            codigo = parsed.values.pop('oficina_nombre_corto')
+            oficina_id = oficina_ids.get(codigo) if codigo else None
+            if oficina_id is None:
+                self.skip(parsed.line, parsed.values, f"No existe la oficina mencionada ({codigo!r})")
+                continue
+            parsed.values['oficina_id'] = oficina_id
+            if self.sync:
+                parsed.lookup = (self.sync_key, tuple(parsed.values[name] for name in self.sync_key))
+            validas.append(parsed)
+        return validas
+
+    def delete_pks(self, pks):
+        bulk.delete_ids(pks)
@@ -0,0 +1,3 @@
+# persona/management/commands/dedupe_personas.py
+# Alias con el nombre original del comando (ver load_personas.py).
+from .load_personas import Command  # noqa: F401
@@ -0,0 +1,30 @@
+# persona/management/commands/export_personas.py
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from crud.exporting import FORMATS, write_export
+from persona.exports import PERSONA_COLUMNS, personas_queryset
+
+class Command(BaseCommand):
+    help = "Exporta personas a CSV o NDJSON en streaming (memoria constante)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', type=str, help='Archivo de salida (por defecto la salida estándar)')
+        parser.add_argument('--formato', choices=sorted(FORMATS), default='csv', help='csv (por defecto) o ndjson')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Filas leídas por vez de la base (por defecto 2000)')
+
+    def handle(self, *args, **kwargs):
+        inicio = time.monotonic()
+        try:
+            stream = open(kwargs['file'], 'w', newline='', encoding='utf-8') if kwargs['file'] else sys.stdout
+        except OSError as e:
+            raise CommandError(f"No se pudo abrir el archivo: {e}")
+        try:
+            n = write_export(stream, personas_queryset(), PERSONA_COLUMNS, kwargs['formato'], kwargs['chunk_size'])
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        if kwargs['file']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Exportadas {n} filas a {kwargs['file']} en {time.monotonic() - inicio:.1f}s"
+            ))
@@ -1,21 +1,46 @@
 # persona/management/commands/dedupe_personas.py
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.db.models import Count
-from persona.models import Persona
+from persona import dedupe
 
 class Command(BaseCommand):
     help = "Elimina duplicados de Persona manteniendo el registro con menor id."
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Sólo informa qué se eliminaría')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas borradas por lote/transacción (por defecto 1000)')
+        parser.add_argument(
+            '--unique', action='store_true',
+            help='Después de limpiar, crea la restricción única si la migración 0006 la omitió por haber duplicados',
+        )
+
     def handle(self, *args, **kwargs):
-        duplicates = Persona.objects.values('nombre','apellido','oficina').annotate(ct=Count('id')).filter(ct__gt=1)
+        dry_run = kwargs['dry_run']
+        verbosity = kwargs['verbosity']
+
+        if dry_run or verbosity >= 2:
+            for g in dedupe.duplicate_groups(limit=50):
+                self.stdout.write(
+                    f"Mantengo id={g['conservar']} para {g['nombre']} {g['apellido']} "
+                    f"en oficina={g['oficina__nombre_corto']} — duplicados: {g['total'] - 1}"
+                )
+
+        total = dedupe.collect_losers()
+        if dry_run:
+            dedupe.drop_losers()
+            self.stdout.write(self.style.WARNING(f"Dry run: se eliminarían {total} registros."))
+            return
+
         total_deleted = 0
-        for d in duplicates:
-            qs = Persona.objects.filter(nombre=d['nombre'], apellido=d['apellido'], oficina=d['oficina']).order_by('id')
-            keep = qs.first()
-            to_delete = qs.exclude(id=keep.id)
-            n = to_delete.count()
-            to_delete.delete()
-            total_deleted += n
-            self.stdout.write(f"Mantengo id={keep.id} para {keep.nombre} {keep.apellido} en oficina={keep.oficina} — eliminados: {n}")
+        try:
+            for total_deleted in dedupe.delete_losers(batch_size=kwargs['batch_size']):
+                self.stdout.write(f"  eliminados {total_deleted}/{total}")
+        finally:
+            dedupe.drop_losers()
         self.stdout.write(self.style.SUCCESS(f"Total eliminados: {total_deleted}"))
+        if not kwargs['unique']:
+            return
+        # La restricción única (persona 0006) evita que vuelvan a aparecer
+        if dedupe.add_unique_constraint():
+            self.stdout.write(self.style.SUCCESS(f"Restricción {dedupe.UNIQUE_CONSTRAINT} creada."))
+        else:
+            self.stdout.write(f"La restricción {dedupe.UNIQUE_CONSTRAINT} ya existía.")
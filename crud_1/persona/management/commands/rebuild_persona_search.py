@@ -0,0 +1,20 @@
+# persona/management/commands/rebuild_persona_search.py
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from persona import search
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de texto completo de Persona."
+
+    def handle(self, *args, **kwargs):
+        conn = search.write_connection()
+        if search.backend(conn) is None:
+            self.stderr.write("El motor de base de datos no tiene índice de texto completo; nada que hacer.")
+            return
+        inicio = time.monotonic()
+        with transaction.atomic(using=conn.alias):
+            n = search.rebuild(conn)
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice reconstruido: {n} personas en {time.monotonic() - inicio:.2f}s"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficina', '0001_initial'),
+        ('persona', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='persona',
+            index=models.Index(fields=['apellido', 'nombre', 'id'], name='persona_ape_nom_id_idx'),
+        ),
+    ]
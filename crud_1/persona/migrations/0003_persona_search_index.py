@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    from persona import search
+    search.rebuild(schema_editor.connection)
+
+
+def borrar_indice(apps, schema_editor):
+    from persona import search
+    search.drop_index_tables(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0002_persona_ape_nom_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
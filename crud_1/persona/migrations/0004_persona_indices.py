@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+import crud.operations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no admite transacciones
+    atomic = False
+
+    dependencies = [
+        ('oficina', '0002_oficina_indices'),
+        ('persona', '0003_persona_search_index'),
+    ]
+
+    operations = [
+        crud.operations.AddIndexConcurrently(
+            model_name='persona',
+            index=models.Index(fields=['oficina', 'apellido', 'nombre', 'id'], name='persona_ofi_ape_nom_id_idx'),
+        ),
+        crud.operations.AddIndexConcurrently(
+            model_name='persona',
+            index=models.Index(fields=['nombre', 'apellido', 'oficina'], name='persona_nom_ape_ofi_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+import crud.operations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) no admite transacciones
+    atomic = False
+
+    dependencies = [
+        ('persona', '0005_contenido_hash'),
+    ]
+
+    operations = [
+        # Si ya hay personas repetidas la migración no falla: avisa y deja la
+        # restricción sin crear (el índice anterior sigue en su lugar). Se
+        # crea después de limpiar con "manage.py dedupe_personas --unique".
+        crud.operations.AddUniqueConstraintConcurrently(
+            model_name='persona',
+            constraint=models.UniqueConstraint(fields=('nombre', 'apellido', 'oficina'), name='persona_unica_nom_ape_ofi', violation_error_message='Ya existe una persona con ese nombre y apellido en la oficina.'),
+            skip_if_duplicates=True,
+            # El índice de la restricción cubre las mismas columnas
+            replaces_index=models.Index(fields=['nombre', 'apellido', 'oficina'], name='persona_nom_ape_ofi_idx'),
+        ),
+    ]
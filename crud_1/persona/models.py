@@ -1,4 +1,5 @@
 from django.db import models
+from crud.sync import hash_field
 
 class Persona(models.Model):
     """Model definition for Persona."""
@@ -7,12 +8,29 @@ class Persona(models.Model):
     apellido = models.CharField(verbose_name="Apellido", max_length=50)
     edad = models.IntegerField(verbose_name="Edad")
     oficina = models.ForeignKey('oficina.Oficina', on_delete=models.CASCADE)
+    # Hash de los campos que escribe importar_personas (ver crud/sync.py)
+    contenido_hash = hash_field('nombre', 'apellido', 'edad', 'oficina')
 
     class Meta:
         """Meta definition for Persona."""
 
         verbose_name = 'Persona'
         verbose_name_plural = 'Personas'
+        indexes = [
+            models.Index(fields=['apellido', 'nombre', 'id'], name='persona_ape_nom_id_idx'),
+            # Personas de una oficina en orden (detalle de oficina): cubre el
+            # filtro y el ORDER BY sin ordenar en memoria.
+            models.Index(fields=['oficina', 'apellido', 'nombre', 'id'], name='persona_ofi_ape_nom_id_idx'),
+        ]
+        constraints = [
+            # Clave de deduplicación (ver persona/dedupe.py); su índice
+            # también sirve las búsquedas por (nombre, apellido, oficina)
+            models.UniqueConstraint(
+                fields=['nombre', 'apellido', 'oficina'],
+                name='persona_unica_nom_ape_ofi',
+                violation_error_message='Ya existe una persona con ese nombre y apellido en la oficina.',
+            ),
+        ]
 
     def __str__(self):
         """Unicode representation of Persona."""
@@ -1,55 +1,33 @@
-import csv
 import sys
-from django.db import transaction
-from django.core.exceptions import ValidationError
-from oficina.models import Oficina
-from persona.models import Persona
+from persona.importers import PersonaImporter
 
 def run(*args):
     if not args:
         print("Error: favor de proporcionar la ruta del archivo.")
-        print("Uso: ./manage.py runscrpt import_persona --script-args <ruta_del_archivo>")
+        print("Uso: ./manage.py runscript importar_personas --script-args <ruta_del_archivo> [chunk=<filas>] [workers=<procesos>] [sync=1] [prune=1]")
         sys.exit(1)
 
     csv_file = args[0]
+    opciones = dict(arg.split('=', 1) for arg in args[1:] if '=' in arg)
 
-    oficina_map = {oficina.nombre_corto: oficina for oficina in Oficina.objects.all()}
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            personas_a_crear = []
-            for row in reader:
-                nombre = row['nombre']
-                apellido = row['apellido']
-                edad = row['edad']
-                oficina_nombre_corto = row['oficina_nombre_corto']
-                if not nombre or not apellido or not edad:
-                    print(f"Error en la fila {row}. Falta el nombre o el apellido o la edad")
-                    continue
-                try:
-                    edad = int(edad)
-                except (ValueError, TypeError) as e:
-                    print(f"Error de validación en la fila {row}. la edad no es un numero valido")
-                    continue
-                oficina_obj = None
-                if oficina_nombre_corto:
-                    oficina_obj = oficina_map.get(oficina_nombre_corto)
-                    if not oficina_obj:
-                        print(f"Warning: No existe la oficina mensionada")
-                        print(f"Se creará el registro sin oficina")
-                        continue
-                try:
-                    persona = Persona(nombre=nombre, apellido=apellido, edad=edad, oficina=oficina_obj)
-                    persona.full_clean()  # Validar el modelo
-                    personas_a_crear.append(persona)
-                except ValidationError as e:
-                    print(f"Error validación en la fila {row}. Detalle: {e}")
-                except Exception as e:
-                    print(f"Error inesperado en la fila {row}. Detalle: {e}")
-
-            with transaction.atomic():
-                Persona.objects.bulk_create(personas_a_crear)
-                print(f"Se importaron {len(personas_a_crear)} registros.")
+        # sync: no escribe las filas sin cambios; prune: además borra las que no están en el archivo
+        prune = opciones.get('prune') == '1'
+        importer = PersonaImporter(
+            chunk_size=int(opciones.get('chunk', 0)) or None,
+            sync=opciones.get('sync') == '1',
+            prune=prune,
+        )
+        workers = int(opciones.get('workers', 1))
+        if workers > 1 and prune:
+            print(f"Aviso: workers={workers} se ignora con prune=1; la poda importa en un solo proceso.")
+        if workers > 1 and not prune:
+            # Parseo y validación en paralelo; un único proceso escribe
+            stats = importer.run_parallel(csv_file, workers)
+        else:
+            stats = importer.run(csv_file)
+        print(f"Se importaron {stats.creadas} registros.")
+        print(stats.resumen())
     except FileNotFoundError:
         print(f"Error. No se encontro el archivo: {csv_file}")
     except Exception as e:
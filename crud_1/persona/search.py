@@ -0,0 +1,269 @@
+"""
+Índice de búsqueda de texto completo para Persona.
+
+En SQLite se mantiene una tabla virtual FTS5 (``persona_persona_fts``) con
+``rowid = persona.id``; en PostgreSQL una tabla auxiliar con un
+``tsvector`` indexado con GIN y el texto sin acentos con índice de
+trigramas. Ambas soportan búsqueda por prefijo, sin distinguir acentos, y
+devuelven los resultados ordenados por relevancia.
+
+El índice se mantiene sincronizado con las señales de ``persona.signals``
+y se puede reconstruir con ``manage.py rebuild_persona_search``. En otros
+motores se usa el filtro ``icontains`` original.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Case, IntegerField, Q, When
+from django.db.models.expressions import RawSQL
+
+from .models import Persona
+
+FTS_TABLE = 'persona_persona_fts'
+PG_TABLE = 'persona_persona_busqueda'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def backend(conn=None):
+    """Devuelve 'sqlite', 'postgresql' o None según el motor de ``conn``."""
+    vendor = (conn or connection).vendor
+    return vendor if vendor in ('sqlite', 'postgresql') else None
+
+
+def write_connection():
+    """Conexión donde se escribe el índice: la de Persona (ver crud.routers)."""
+    return connections[router.db_for_write(Persona)]
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall(query or '')
+
+
+# --- DDL ---------------------------------------------------------------
+
+def create_index_tables(conn):
+    """Crea las tablas del índice para el motor de ``conn`` (idempotente)."""
+    kind = backend(conn)
+    with conn.cursor() as cursor:
+        if kind == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "nombre, apellido, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        elif kind == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {PG_TABLE} ('
+                'persona_id bigint PRIMARY KEY REFERENCES persona_persona (id) ON DELETE CASCADE, '
+                'documento tsvector NOT NULL, '
+                'texto text NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {PG_TABLE}_doc_idx ON {PG_TABLE} USING gin (documento)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {PG_TABLE}_trgm_idx ON {PG_TABLE} USING gin (texto gin_trgm_ops)'
+            )
+
+
+def drop_index_tables(conn):
+    kind = backend(conn)
+    with conn.cursor() as cursor:
+        if kind == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif kind == 'postgresql':
+            cursor.execute(f'DROP TABLE IF EXISTS {PG_TABLE}')
+
+
+# --- Mantenimiento -----------------------------------------------------
+
+_PG_UPSERT = (
+    f'INSERT INTO {PG_TABLE} (persona_id, documento, texto) '
+    "SELECT id, to_tsvector('simple', unaccent(nombre || ' ' || apellido)), "
+    "lower(unaccent(nombre || ' ' || apellido)) "
+    'FROM persona_persona WHERE {where} '
+    'ON CONFLICT (persona_id) DO UPDATE '
+    'SET documento = EXCLUDED.documento, texto = EXCLUDED.texto'
+)
+
+
+def index_personas(ids):
+    """(Re)indexa las personas con los ``ids`` dados."""
+    ids = list(ids)
+    conn = write_connection()
+    kind = backend(conn)
+    if not ids or kind is None:
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    with conn.cursor() as cursor:
+        if kind == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', ids)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, nombre, apellido) '
+                f'SELECT id, nombre, apellido FROM persona_persona WHERE id IN ({placeholders})',
+                ids,
+            )
+        else:
+            cursor.execute(_PG_UPSERT.format(where=f'id IN ({placeholders})'), ids)
+
+
+def remove_personas(ids):
+    """Quita del índice las personas con los ``ids`` dados."""
+    ids = list(ids)
+    conn = write_connection()
+    kind = backend(conn)
+    if not ids or kind is None:
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    table, column = (FTS_TABLE, 'rowid') if kind == 'sqlite' else (PG_TABLE, 'persona_id')
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', ids)
+
+
+def rebuild(conn=None):
+    """Reconstruye el índice completo con una sola sentencia set-based."""
+    conn = conn or write_connection()
+    kind = backend(conn)
+    if kind is None:
+        return 0
+    create_index_tables(conn)
+    with conn.cursor() as cursor:
+        if kind == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, nombre, apellido) '
+                'SELECT id, nombre, apellido FROM persona_persona'
+            )
+        else:
+            cursor.execute(f'TRUNCATE {PG_TABLE}')
+            cursor.execute(_PG_UPSERT.format(where='TRUE'))
+        return cursor.rowcount
+
+
+# --- Consulta ----------------------------------------------------------
+
+class SearchResults:
+    """
+    Resultados rankeados de una búsqueda, compatibles con ``Paginator``.
+
+    Sólo se materializan las personas de la porción pedida; el total se
+    calcula una vez sobre el índice.
+    """
+
+    ordered = True
+
+    def __init__(self, query):
+        self.tokens = tokenize(query)
+        self._count = None
+        # Lectura: puede ir a una réplica (ver crud.routers)
+        self.using = router.db_for_read(Persona)
+        self.kind = backend(connections[self.using])
+
+    def _where(self):
+        if self.kind == 'sqlite':
+            match = ' '.join('"%s"*' % token for token in self.tokens)
+            return f'{FTS_TABLE} MATCH %s', [match]
+        tsquery = ' & '.join(f'{token}:*' for token in self.tokens)
+        return "documento @@ to_tsquery('simple', unaccent(%s))", [tsquery]
+
+    def count(self):
+        if self._count is None:
+            if not self.tokens:
+                self._count = 0
+            else:
+                where, params = self._where()
+                table = FTS_TABLE if self.kind == 'sqlite' else PG_TABLE
+                with connections[self.using].cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def ids(self, offset, limit):
+        if not self.tokens:
+            return []
+        where, params = self._where()
+        if self.kind == 'sqlite':
+            # bm25 con más peso para el apellido
+            sql = (f'SELECT rowid FROM {FTS_TABLE} WHERE {where} '
+                   f'ORDER BY bm25({FTS_TABLE}, 1.0, 2.0), rowid LIMIT %s OFFSET %s')
+        else:
+            sql = (f'SELECT persona_id FROM {PG_TABLE} WHERE {where} '
+                   "ORDER BY ts_rank(documento, to_tsquery('simple', unaccent(%s))) DESC, persona_id "
+                   'LIMIT %s OFFSET %s')
+            params = params + params
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params + [limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start = item.start or 0
+            stop = item.stop if item.stop is not None else self.count()
+            ids = self.ids(start, max(stop - start, 0))
+            personas = Persona.objects.using(self.using).in_bulk(ids)
+            return [personas[pk] for pk in ids if pk in personas]
+        rows = self[item:item + 1]
+        if not rows:
+            raise IndexError(item)
+        return rows[0]
+
+
+def _trigram_fallback(query, using):
+    """
+    Coincidencias aproximadas por trigramas en PostgreSQL (errores de
+    tipeo), de la más parecida a la menos. Se compara contra la palabra más
+    parecida del texto (``<%``), no contra el texto entero, que con nombre y
+    apellido casi nunca llega al umbral.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT persona_id FROM {PG_TABLE} WHERE lower(unaccent(%s)) <%% texto '
+            'ORDER BY word_similarity(lower(unaccent(%s)), texto) DESC, persona_id LIMIT 200',
+            [query, query],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    # El filtro por ids no conserva el orden de similitud: se reordena
+    orden = Case(*[When(pk=pk, then=i) for i, pk in enumerate(ids)], output_field=IntegerField())
+    return Persona.objects.using(using).filter(id__in=ids).order_by(orden) if ids else Persona.objects.none()
+
+
+def search(query):
+    """
+    Busca personas por nombre/apellido.
+
+    Devuelve un ``SearchResults`` si el motor tiene índice de texto completo;
+    si no, el queryset con ``icontains`` de siempre.
+    """
+    results = SearchResults(query)
+    if results.kind is None:
+        return Persona.objects.filter(
+            Q(nombre__icontains=query) | Q(apellido__icontains=query)
+        ).order_by('apellido', 'nombre', 'id')
+    if results.kind == 'postgresql' and results.tokens and results.count() == 0:
+        return _trigram_fallback(query, results.using)
+    return results
+
+
+def filter_queryset(queryset, query):
+    """
+    Restringe ``queryset`` a las personas que coinciden con ``query``, sin
+    ranking (p. ej. para el buscador del admin, que ordena por su cuenta).
+    """
+    kind = backend(connections[queryset.db])
+    if kind is None:
+        return queryset.filter(Q(nombre__icontains=query) | Q(apellido__icontains=query))
+    results = SearchResults(query)
+    if not results.tokens:
+        return queryset.none()
+    where, params = results._where()
+    if kind == 'sqlite':
+        sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {where}'
+    else:
+        sql = f'SELECT persona_id FROM {PG_TABLE} WHERE {where}'
+    return queryset.filter(pk__in=RawSQL(sql, params))
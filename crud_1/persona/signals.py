@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from crud import cache
+from crud.signals import bulk_write
+from . import search
+from .models import Persona
+
+
+@receiver(post_save, sender=Persona)
+def persona_guardada(sender, instance, **kwargs):
+    """Mantiene el índice de búsqueda al crear o editar una persona."""
+    search.index_personas([instance.pk])
+    cache.bump(Persona, [instance.pk])
+
+
+@receiver(post_delete, sender=Persona)
+def persona_eliminada(sender, instance, **kwargs):
+    """Quita a la persona eliminada del índice de búsqueda."""
+    search.remove_personas([instance.pk])
+    cache.bump(Persona, [instance.pk])
+
+
+@receiver(bulk_write, sender=Persona)
+def personas_masivas(sender, action, pks, **kwargs):
+    """Actualiza el índice de búsqueda por lote tras importaciones y ediciones masivas."""
+    if action == 'delete':
+        search.remove_personas(pks)
+    else:
+        search.index_personas(pks)
+    cache.bump(Persona, pks)
@@ -1,3 +1,448 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+from contextlib import contextmanager
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.http import Http404
+from django.db.migrations.loader import MigrationLoader
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from crud import operations
+from crud.pagination import encode_cursor
+from crud.querybudget import QueryBudget, query_budget
+from crud.signals import bulk_write
+from oficina.models import Oficina
+from . import bulk, dedupe, search
+from .async_views import AsyncPersonaDetailView, AsyncPersonaListView
+from .forms import PersonaBulkForm, PersonaForm
+from .models import Persona
+
+
+class PersonaTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        cls.otra = Oficina.objects.create(nombre='Norte', nombre_corto='NOR')
+        cls.personas = Persona.objects.bulk_create([
+            Persona(nombre=f'Nombre{i:02}', apellido=f'Apellido{i:02}', edad=20 + i, oficina=cls.oficina)
+            for i in range(30)
+        ])
+        # Como los importadores: índice de búsqueda y contadores
+        bulk_write.send(sender=Persona, action='create', pks=[p.pk for p in cls.personas])
+        cls.user = User.objects.create_user('admin', password='clave-de-prueba')
+
+    def setUp(self):
+        cache.clear()
+
+
+class PersonaViewTests(PersonaTestCase):
+
+    def test_detalle_en_una_consulta(self):
+        with query_budget(max_queries=1):
+            response = self.client.get(reverse('persona:detalle', args=[self.personas[0].pk]))
+        self.assertContains(response, 'Central')
+
+    def test_lista_por_cursor(self):
+        url = reverse('persona:lista')
+        vistas, params = [], {}
+        while True:
+            # Página y total aproximado, sin COUNT(*) ni OFFSET: igual en cualquier página
+            with query_budget(max_queries=2, max_repeats=1):
+                response = self.client.get(url, params)
+            page = response.context['page_obj']
+            vistas.append([p.pk for p in page])
+            if not page.has_next:
+                break
+            params = {'after': page.next_cursor}
+        ordenadas = sorted(self.personas, key=lambda p: (p.apellido, p.nombre, p.pk))
+        self.assertEqual(sum(vistas, []), [p.pk for p in ordenadas])
+        self.assertEqual(len(vistas), 3)
+
+        response = self.client.get(url, {'before': page.previous_cursor})
+        self.assertEqual([p.pk for p in response.context['page_obj']], vistas[1])
+        self.assertEqual(self.client.get(url, {'after': 'no-es-un-cursor'}).status_code, 404)
+
+    def test_cursor_adulterado(self):
+        url = reverse('persona:lista')
+        for valores in (['A', 'B', {'id': 1}], ['A', 'B', 'abc'], ['A', 'B', 10 ** 30], [['A'], 'B', 1],
+                        ['A', None, 1], ['A', 'B', None]):
+            cursor = encode_cursor(valores)
+            with self.subTest(valores=valores):
+                for param in ('after', 'before'):
+                    self.assertEqual(self.client.get(url, {param: cursor}).status_code, 404)
+                with self.assertRaises(Http404):
+                    async_get(AsyncPersonaListView, f'{url}?after={cursor}')
+        # Valores convertibles al tipo del campo: una página válida
+        self.assertEqual(self.client.get(url, {'after': encode_cursor([1.5, True, '7'])}).status_code, 200)
+
+    def test_buscar(self):
+        with query_budget(max_queries=3, max_repeats=1):
+            response = self.client.get(reverse('persona:buscar'), {'q': 'nombre0'})
+        self.assertEqual(len(response.context['personas']), 10)
+
+
+def async_get(view_cls, path, **kwargs):
+    """Request anónimo a una vista async (``ASYNC_VIEWS``) sin pasar por las URLs."""
+    async def anonimo():
+        return AnonymousUser()
+
+    request = RequestFactory().get(path, headers=kwargs.pop('headers', {}))
+    request.auser = anonimo
+    return async_to_sync(view_cls.as_view())(request, **kwargs)
+
+
+@contextmanager
+def sin_restriccion_unica():
+    """Quita la restricción única de Persona, para cargar duplicados previos a la migración 0006."""
+    constraint = next(c for c in Persona._meta.constraints if c.name == 'persona_unica_nom_ape_ofi')
+    resto = [c for c in Persona._meta.constraints if c is not constraint]
+    # SQLite rehace la tabla a partir de las restricciones del modelo
+    with mock.patch.object(Persona._meta, 'constraints', resto), connection.schema_editor() as editor:
+        editor.remove_constraint(Persona, constraint)
+    try:
+        yield
+    finally:
+        if not operations.index_exists(connection, Persona, constraint.name):
+            with connection.schema_editor() as editor:
+                editor.add_constraint(Persona, constraint)
+
+
+class PersonaAsyncViewTests(PersonaTestCase):
+
+    def test_detalle_con_cache_y_get_condicional(self):
+        pk = self.personas[0].pk
+        url = reverse('persona:detalle', args=[pk])
+        # Misma página y mismo ETag que la vista síncrona
+        sync = self.client.get(url)
+        response = async_get(AsyncPersonaDetailView, url, pk=pk)
+        self.assertEqual(response['ETag'], sync['ETag'])
+        self.assertEqual(response.content, sync.content)
+
+        response = async_get(AsyncPersonaDetailView, url, pk=pk, headers={'If-None-Match': sync['ETag']})
+        self.assertEqual(response.status_code, 304)
+        with query_budget(max_queries=0):
+            response = async_get(AsyncPersonaDetailView, url, pk=pk)
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.personas[0].save()
+        response = async_get(AsyncPersonaDetailView, url, pk=pk, headers={'If-None-Match': sync['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_lista_cacheada(self):
+        url = reverse('persona:lista')
+        primera = async_get(AsyncPersonaListView, url)
+        with query_budget(max_queries=0):
+            segunda = async_get(AsyncPersonaListView, url)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], self.client.get(url)['ETag'])
+
+
+class PersonaBulkTests(PersonaTestCase):
+
+    def updates(self, budget):
+        return sum(n for shape, n in budget.shapes.items() if shape.startswith('UPDATE "persona_persona"'))
+
+    def test_mover_por_lotes(self):
+        with QueryBudget() as budget:
+            total, omitidas = bulk.move(Persona.objects.filter(edad__lt=40), self.otra, batch_size=3)
+        self.assertEqual((total, omitidas), (20, []))
+        # Un UPDATE por lote de 3
+        self.assertEqual(self.updates(budget), 7)
+        self.assertEqual(Persona.objects.filter(oficina=self.otra).count(), 20)
+        self.assertEqual(bulk.move(Persona.objects.filter(edad__lt=40), self.otra), (0, []))
+
+    def test_mover_omite_las_que_ya_estan_en_el_destino(self):
+        tercera = Oficina.objects.create(nombre='Sur', nombre_corto='SUR')
+        ya_esta = Persona.objects.create(nombre='Nombre01', apellido='Apellido01', edad=50, oficina=self.otra)
+        # Misma persona en otra oficina de origen: llega en otro lote
+        repetida = Persona.objects.create(nombre='Nombre02', apellido='Apellido02', edad=50, oficina=tercera)
+        total, omitidas = bulk.move(Persona.objects.exclude(pk=ya_esta.pk), self.otra, batch_size=4)
+        self.assertEqual(total, 29)
+        self.assertEqual(omitidas, [self.personas[1].pk, repetida.pk])
+        self.assertEqual(Persona.objects.get(pk=self.personas[1].pk).oficina, self.oficina)
+        self.assertEqual(Persona.objects.filter(oficina=self.otra).count(), 30)
+
+    def test_vista_mover_con_conflictos(self):
+        Persona.objects.create(nombre='Nombre01', apellido='Apellido01', edad=50, oficina=self.otra)
+        self.client.force_login(self.user)
+        url = reverse('persona:masivo')
+        datos = {'apellido': 'Apellido0', 'accion': 'mover', 'destino': self.otra.pk, 'confirmar': '1'}
+        response = self.client.post(url, datos, follow=True)
+        self.assertRedirects(response, url)
+        self.assertEqual([str(m) for m in response.context['messages']], [
+            "Se movieron 9 personas a Norte NOR.",
+            "No se movieron 1 personas: ya hay alguien con el mismo nombre y apellido en Norte NOR.",
+        ])
+        self.assertEqual(Persona.objects.filter(oficina=self.otra).count(), 10)
+
+    def test_cambiar_edad(self):
+        self.assertEqual(bulk.set_edad(Persona.objects.filter(apellido__startswith='Apellido0'), 20), 9)
+        self.assertEqual(Persona.objects.filter(edad=20).count(), 10)
+
+    def test_vista_cuenta_y_confirma(self):
+        self.client.force_login(self.user)
+        url = reverse('persona:masivo')
+        datos = {'apellido': 'Apellido1', 'accion': 'eliminar'}
+        response = self.client.post(url, datos)
+        self.assertEqual(response.context['cantidad'], 10)
+        self.assertEqual(Persona.objects.count(), 30)
+
+        response = self.client.post(url, dict(datos, confirmar='1'))
+        self.assertRedirects(response, url)
+        self.assertEqual(Persona.objects.count(), 20)
+        self.assertFalse(Persona.objects.filter(apellido__startswith='Apellido1').exists())
+        self.assertEqual(self.client.post(url, {'accion': 'eliminar'}).context['form'].errors['__all__'],
+                         ["Indicar al menos un filtro."])
+
+    def test_script_del_autocompletar_una_vez(self):
+        form = PersonaBulkForm()
+        self.assertEqual(form.media._js, ['oficina/autocomplete.js'])
+        self.assertNotIn('<script', form.as_p())
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('persona:masivo'))
+        self.assertContains(response, 'data-autocomplete', count=2)
+        self.assertContains(response, 'oficina/autocomplete.js', count=1)
+
+        admin = User.objects.create_superuser('root', password='clave-de-prueba')
+        self.client.force_login(admin)
+        for url in (reverse('admin:persona_persona_changelist'), reverse('admin:oficina_oficina_changelist')):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'oficina/autocomplete.js', count=1)
+
+
+class PersonaUnicaTests(PersonaTestCase):
+
+    def test_formulario_rechaza_duplicados(self):
+        persona = self.personas[0]
+        form = PersonaForm(data={'nombre': persona.nombre, 'apellido': persona.apellido, 'edad': 50,
+                                 'oficina': self.oficina.pk})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Ya existe una persona con ese nombre y apellido en la oficina.', str(form.errors))
+        form = PersonaForm(data={'nombre': persona.nombre, 'apellido': persona.apellido, 'edad': 50,
+                                 'oficina': self.otra.pk})
+        self.assertTrue(form.is_valid())
+
+    def test_la_base_rechaza_duplicados(self):
+        persona = self.personas[0]
+        with self.assertRaises(IntegrityError):
+            Persona.objects.create(nombre=persona.nombre, apellido=persona.apellido, edad=1, oficina=self.oficina)
+
+
+class DuplicadosTestCase(TransactionTestCase):
+    """Tests con personas duplicadas: la restricción única se quita mientras duran."""
+
+    # Con available_apps el flush usa TRUNCATE ... CASCADE, que en PostgreSQL
+    # necesita la tabla del índice de búsqueda (referencia a persona_persona)
+    available_apps = settings.INSTALLED_APPS
+
+    def setUp(self):
+        self.enterContext(sin_restriccion_unica())
+
+    def tearDown(self):
+        # Antes de volver a crear la restricción
+        Persona.objects.all().delete()
+
+
+class PersonaDedupeTests(DuplicadosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        self.personas = Persona.objects.bulk_create(
+            [Persona(nombre='José', apellido='Pérez', edad=30 + i, oficina=oficina) for i in range(3)]
+            + [Persona(nombre='Ana', apellido='Gómez', edad=40 + i, oficina=oficina) for i in range(2)]
+            + [Persona(nombre='Luis', apellido='Díaz', edad=50, oficina=oficina)]
+        )
+
+    def migrate_0006(self):
+        """Aplica la operación de la migración 0006 sobre la base actual; devuelve el aviso."""
+        migration = importlib.import_module('persona.migrations.0006_persona_unica_nom_ape_ofi')
+        loader = MigrationLoader(connection)
+        antes = loader.project_state(('persona', '0005_contenido_hash'), at_end=True)
+        despues = loader.project_state(('persona', '0006_persona_unica_nom_ape_ofi'), at_end=True)
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr, \
+                connection.schema_editor(atomic=False) as editor:
+            migration.Migration.operations[0].database_forwards('persona', editor, antes, despues)
+        return stderr.getvalue()
+
+    def indices(self):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, Persona._meta.db_table))
+
+    def test_dry_run(self):
+        out = io.StringIO()
+        call_command('dedupe_personas', '--dry-run', stdout=out)
+        self.assertIn('se eliminarían 3 registros', out.getvalue())
+        self.assertEqual(Persona.objects.count(), 6)
+
+    def test_la_migracion_no_falla_con_duplicados(self):
+        with connection.schema_editor() as editor:
+            editor.add_index(Persona, dedupe.OLD_INDEX)
+        self.assertIn('no se creó la restricción persona_unica_nom_ape_ofi', self.migrate_0006())
+        # Sin restricción, pero el índice anterior sigue sirviendo las búsquedas
+        self.assertNotIn(dedupe.UNIQUE_CONSTRAINT, self.indices())
+        self.assertIn(dedupe.OLD_INDEX.name, self.indices())
+        with self.assertRaisesMessage(ValueError, 'Todavía hay personas repetidas'):
+            dedupe.add_unique_constraint()
+
+        out = io.StringIO()
+        call_command('dedupe_personas', '--batch-size', '1', '--unique', stdout=out)
+        self.assertIn('Restricción persona_unica_nom_ape_ofi creada.', out.getvalue())
+        conservadas = {self.personas[0].pk, self.personas[3].pk, self.personas[5].pk}
+        self.assertEqual(set(Persona.objects.values_list('pk', flat=True)), conservadas)
+        self.assertIn(dedupe.UNIQUE_CONSTRAINT, self.indices())
+        self.assertNotIn(dedupe.OLD_INDEX.name, self.indices())
+        self.assertFalse(dedupe.add_unique_constraint())
+
+    def test_la_migracion_crea_la_restriccion_sin_duplicados(self):
+        call_command('dedupe_personas', stdout=io.StringIO())
+        self.assertEqual(self.migrate_0006(), '')
+        self.assertIn(dedupe.UNIQUE_CONSTRAINT, self.indices())
+        with self.assertRaises(IntegrityError):
+            Persona.objects.create(nombre='Luis', apellido='Díaz', edad=1, oficina=self.personas[5].oficina)
+
+
+class PersonaApiTests(PersonaTestCase):
+
+    def post_bulk(self, items):
+        self.client.force_login(self.user)
+        return self.client.post(reverse('persona:api_bulk'), json.dumps(items), content_type='application/json')
+
+    def test_lista_pagina_por_cursor(self):
+        url = reverse('persona:api_lista')
+        primera = self.client.get(url, {'limit': 20}).json()
+        self.assertEqual(len(primera['results']), 20)
+        segunda = self.client.get(url, {'limit': 20, 'after': primera['next']}).json()
+        self.assertEqual(len(segunda['results']), 10)
+        self.assertIsNone(segunda['next'])
+        ids = [row['id'] for row in primera['results'] + segunda['results']]
+        self.assertEqual(ids, sorted(p.pk for p in self.personas))
+
+    def test_lista_cursor_adulterado(self):
+        url = reverse('persona:api_lista')
+        for valores in ([[1]], [{'id': 1}], ['7'], [True], [0], [2 ** 63], [1.5], [None]):
+            with self.subTest(valores=valores):
+                response = self.client.get(url, {'after': encode_cursor(valores)})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Cursor inválido'})
+
+    def test_lista_limit_fuera_de_rango(self):
+        url = reverse('persona:api_lista')
+        for limit in ('0', '-5', 'abc'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.client.get(url, {'limit': limit}).status_code, 400)
+
+    def test_lista_limit_maximo(self):
+        response = self.client.get(reverse('persona:api_lista'), {'limit': 10 ** 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 30)
+
+    def test_bulk_fk_invalida(self):
+        for valor in ('abc', [1], True, 1.5, 10 ** 20):
+            with self.subTest(oficina=valor):
+                response = self.post_bulk([{'nombre': 'A', 'apellido': 'B', 'edad': 30, 'oficina': valor}])
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('oficina', response.json()['errors']['0'])
+
+    def test_bulk_id_invalido(self):
+        persona = self.personas[0]
+        for valor in (True, 'abc', -1):
+            with self.subTest(id=valor):
+                response = self.post_bulk([{'id': valor, 'edad': 99}])
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('id', response.json()['errors']['0'])
+        persona.refresh_from_db()
+        self.assertNotEqual(persona.edad, 99)
+
+    def test_bulk_reporta_errores_por_indice(self):
+        response = self.post_bulk([
+            {'nombre': 'A', 'apellido': 'B', 'edad': 30, 'oficina': self.oficina.pk},
+            {'nombre': 'C', 'apellido': 'D', 'edad': 30, 'oficina': 'abc'},
+            {'nombre': 'E', 'apellido': 'F', 'edad': 30, 'oficina': 999999},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'1', '2'})
+        self.assertEqual(Persona.objects.count(), 30)
+
+    def test_bulk_duplicado(self):
+        persona = self.personas[0]
+        response = self.post_bulk([{'nombre': persona.nombre, 'apellido': persona.apellido, 'edad': 1,
+                                    'oficina': self.oficina.pk}])
+        self.assertEqual(response.status_code, 409)
+        # Sin el texto del error de la base
+        self.assertEqual(response.json(), {'error': 'Conflicto con datos existentes'})
+
+    def test_bulk_crea_y_actualiza(self):
+        persona = self.personas[0]
+        response = self.post_bulk([
+            {'nombre': 'Nueva', 'apellido': 'Persona', 'edad': 40, 'oficina': self.otra.pk},
+            {'id': persona.pk, 'oficina': self.otra.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], [persona.pk])
+        self.assertEqual(Persona.objects.filter(oficina=self.otra).count(), 2)
+
+    def test_bulk_consultas_no_crecen_con_el_lote(self):
+        consultas = []
+        # El primer envío siembra contadores y sesión; se comparan los siguientes
+        for personas in (self.personas[:2], self.personas[2:4], self.personas[4:24]):
+            with QueryBudget() as budget:
+                response = self.post_bulk([{'id': p.pk, 'edad': 50} for p in personas])
+            self.assertEqual(response.status_code, 200)
+            consultas.append(budget.count)
+        self.assertEqual(consultas[1], consultas[2])
+
+    def test_bulk_get_ids_invalidos(self):
+        url = reverse('persona:api_bulk')
+        self.assertEqual(self.client.get(url, {'ids': 'a,b'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': '0'}).status_code, 400)
+        response = self.client.get(url, {'ids': f'{self.personas[0].pk},{self.personas[1].pk}'})
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class PersonaSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        cls.perez = Persona.objects.create(nombre='José', apellido='Pérez', edad=30, oficina=oficina)
+        cls.peralta = Persona.objects.create(nombre='Ana', apellido='Peralta', edad=40, oficina=oficina)
+        cls.gomez = Persona.objects.create(nombre='Pedro', apellido='Gómez', edad=50, oficina=oficina)
+
+    def buscar(self, query):
+        return list(search.search(query)[:20])
+
+    def test_sin_acentos_y_por_prefijo(self):
+        self.assertEqual(self.buscar('perez'), [self.perez])
+        self.assertEqual(self.buscar('JOSE per'), [self.perez])
+        self.assertEqual(set(self.buscar('pe')), {self.perez, self.peralta, self.gomez})
+
+    def test_indice_sigue_los_cambios(self):
+        self.gomez.apellido = 'Gutiérrez'
+        self.gomez.save()
+        self.assertEqual(self.buscar('gomez'), [])
+        self.assertEqual(self.buscar('gutierrez'), [self.gomez])
+        self.gomez.delete()
+        self.assertEqual(self.buscar('gutierrez'), [])
+
+    def test_filter_queryset(self):
+        queryset = search.filter_queryset(Persona.objects.all(), 'peralta')
+        self.assertEqual(list(queryset), [self.peralta])
+
+    @skipUnless(connection.vendor == 'postgresql', "búsqueda por trigramas de PostgreSQL")
+    def test_errores_de_tipeo_ordenados_por_similitud(self):
+        # La más parecida es la de id mayor: el orden no puede salir del id
+        parecida = Persona.objects.create(nombre='Juan', apellido='Peraltta', edad=20, oficina=self.perez.oficina)
+        resultados = self.buscar('peralttaa')
+        self.assertEqual(resultados[:2], [parecida, self.peralta])
+        self.assertNotIn(self.gomez, resultados)
@@ -1,5 +1,15 @@
+from django.conf import settings
 from django.urls import path
 from .views import *
+from .api import PersonaApiListView, PersonaApiBulkView
+
+if settings.ASYNC_VIEWS:
+    # Variantes async (ASGI) de las vistas de lectura
+    from .async_views import (
+        AsyncPersonaListView as PersonaListView,
+        AsyncPersonaDetailView as PersonaDetailView,
+        AsyncPersonaSearchView as PersonaSearchView,
+    )
 
 app_name = 'persona'
 
@@ -29,9 +39,29 @@ urlpatterns = [
         PersonaDeleteView.as_view(),
         name='eliminar'
     ),
+    path(
+        'masivo/',
+        PersonaBulkView.as_view(),
+        name='masivo'
+    ),
     path(
         'buscar/',
         PersonaSearchView.as_view(),
         name='buscar'
     ),
+    path(
+        'api/',
+        PersonaApiListView.as_view(),
+        name='api_lista'
+    ),
+    path(
+        'api/bulk/',
+        PersonaApiBulkView.as_view(),
+        name='api_bulk'
+    ),
+    path(
+        'exportar/',
+        PersonaExportView.as_view(),
+        name='exportar'
+    ),
 ]
\ No newline at end of file
@@ -1,32 +1,51 @@
-from django.shortcuts import render
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+from django.shortcuts import redirect, render
+from django.contrib import messages
+from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
 from django.urls import reverse_lazy
 from .models import Persona
 from django.db.models import Q
 # Import login mixins if needed
 from django.contrib.auth.mixins import LoginRequiredMixin
+from crud.cache import CachedResponseMixin
+from crud.exporting import ExportMixin
+from .exports import PERSONA_COLUMNS, personas_queryset
+from .forms import PersonaBulkForm, PersonaForm
+from crud.pagination import KeysetPaginationMixin
+from oficina.models import Oficina
+from . import bulk, search
 
-class PersonaListView(ListView):
+class PersonaListView(CachedResponseMixin, KeysetPaginationMixin, ListView):
     model = Persona
+    cache_models = (Persona,)
     template_name = "persona/lista.html"
     context_object_name = "personas"
     paginate_by = 10
+    # Orden estable cubierto por el índice persona_ape_nom_id_idx
+    keyset_ordering = ("apellido", "nombre", "id")
+    keyset_approximate_count = True
+    # La lista sólo muestra nombre y apellido; el hash es la clave de la
+    # fila en el caché de fragmentos
+    queryset = Persona.objects.only("id", "nombre", "apellido", "contenido_hash")
 
-class PersonaDetailView(DetailView):
+class PersonaDetailView(CachedResponseMixin, DetailView):
     model = Persona
+    cache_models = (Oficina,)
+    cache_object_model = Persona
+    # El template muestra la oficina: se trae en la misma consulta
+    queryset = Persona.objects.select_related("oficina")
     template_name = "persona/detalle.html"
     context_object_name = "persona"
 
 class PersonaCreateView(LoginRequiredMixin, CreateView):
     model = Persona
     template_name = "persona/crear.html"
-    fields = ["nombre", "apellido", "edad", "oficina"]
+    form_class = PersonaForm
     success_url = reverse_lazy("persona:lista")
 
 class PersonaUpdateView(LoginRequiredMixin,UpdateView):
     model = Persona
     template_name = "persona/editar.html"
-    fields = ["nombre", "apellido", "edad", "oficina"]
+    form_class = PersonaForm
     success_url = reverse_lazy("persona:lista")
 
 class PersonaDeleteView(LoginRequiredMixin,DeleteView):
@@ -40,19 +59,58 @@ class PersonaDeleteView(LoginRequiredMixin,DeleteView):
         context['action'] = 'eliminar'
         return context
 
-class PersonaSearchView(ListView):
+class PersonaBulkView(LoginRequiredMixin, FormView):
+    """
+    Operaciones masivas: el primer envío muestra cuántas personas cumplen
+    el filtro y el segundo (``confirmar``) las aplica por lotes.
+    """
+    form_class = PersonaBulkForm
+    template_name = "persona/masivo.html"
+    # Una consulta por lote, a propósito (ver crud.middleware)
+    query_budget_exempt = True
+
+    def form_valid(self, form):
+        queryset = form.queryset()
+        if not self.request.POST.get('confirmar'):
+            return self.render_to_response(self.get_context_data(form=form, cantidad=queryset.count()))
+        accion = form.cleaned_data['accion']
+        if accion == PersonaBulkForm.MOVER:
+            destino = form.cleaned_data['destino']
+            total, omitidas = bulk.move(queryset, destino)
+            messages.success(self.request, f"Se movieron {total} personas a {destino}.")
+            if omitidas:
+                messages.warning(self.request, bulk.MOVE_SKIPPED.format(n=len(omitidas), oficina=destino))
+        elif accion == PersonaBulkForm.EDAD:
+            total = bulk.set_edad(queryset, form.cleaned_data['edad'])
+            messages.success(self.request, f"Se cambió la edad de {total} personas.")
+        else:
+            total = bulk.delete(queryset)
+            messages.success(self.request, f"Se eliminaron {total} personas.")
+        return redirect("persona:masivo")
+
+class PersonaSearchView(CachedResponseMixin, ListView):
     model = Persona
+    cache_models = (Persona,)
     template_name = "persona/buscar.html"
     context_object_name = "personas"
+    paginate_by = 20
 
     def get_queryset(self):
         query = self.request.GET.get('q')
         if query:
-            return Persona.objects.filter(Q(nombre__icontains=query) | Q(apellido__icontains=query))
+            # Índice de texto completo (FTS5 / tsvector), rankeado por relevancia
+            return search.search(query)
         return Persona.objects.none()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['titulo'] = 'Buscar Personas'
         context['query'] = self.request.GET.get('q', '')
-        return context
\ No newline at end of file
+        return context
+
+class PersonaExportView(LoginRequiredMixin, ExportMixin, View):
+    export_columns = PERSONA_COLUMNS
+    export_filename = "personas"
+
+    def get_export_queryset(self):
+        return personas_queryset()
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ReportesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'reportes'
+
+    def ready(self):
+        # Registra los receptores que marcan el resumen como desactualizado
+        from . import signals  # noqa: F401
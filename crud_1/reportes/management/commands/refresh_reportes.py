@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reportes import resumen
+
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen de edades por oficina (sólo las oficinas que cambiaron, o todas con --completo)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Recalcula todas las oficinas')
+        parser.add_argument('--batch-size', type=int, default=resumen.BATCH_SIZE)
+
+    def handle(self, *args, **kwargs):
+        total = resumen.refresh(completo=kwargs['completo'], batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Se recalcularon {total} oficinas"))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def marcar_oficinas(apps, schema_editor):
+    """Un resumen marcado por oficina existente: el primer refresh los calcula."""
+    Oficina = apps.get_model('oficina', 'Oficina')
+    ResumenOficina = apps.get_model('reportes', 'ResumenOficina')
+    using = schema_editor.connection.alias
+    ids = Oficina.objects.using(using).order_by('id').values_list('id', flat=True)
+    ResumenOficina.objects.using(using).bulk_create(
+        (ResumenOficina(oficina_id=pk, sucio=True) for pk in ids.iterator()), batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('oficina', '0004_oficina_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenOficina',
+            fields=[
+                ('oficina', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='oficina.oficina')),
+                ('personas', models.IntegerField(default=0, verbose_name='Personas')),
+                ('edad_min', models.IntegerField(null=True, verbose_name='Edad mínima')),
+                ('edad_max', models.IntegerField(null=True, verbose_name='Edad máxima')),
+                ('edad_suma', models.BigIntegerField(default=0, verbose_name='Suma de edades')),
+                ('hasta_17', models.IntegerField(default=0, verbose_name='Hasta 17')),
+                ('de_18_a_29', models.IntegerField(default=0, verbose_name='18 a 29')),
+                ('de_30_a_44', models.IntegerField(default=0, verbose_name='30 a 44')),
+                ('de_45_a_64', models.IntegerField(default=0, verbose_name='45 a 64')),
+                ('desde_65', models.IntegerField(default=0, verbose_name='65 o más')),
+                ('sucio', models.BooleanField(default=True, verbose_name='Desactualizado')),
+                ('actualizado', models.DateTimeField(null=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Resumen de oficina',
+                'verbose_name_plural': 'Resúmenes de oficinas',
+                'indexes': [models.Index(condition=models.Q(('sucio', True)), fields=['oficina'], name='resumen_sucio_idx')],
+            },
+        ),
+        migrations.RunPython(marcar_oficinas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import models
+
+
+class ResumenOficina(models.Model):
+    """
+    Estadísticas de edad de las personas de una oficina, materializadas.
+
+    ``sucio`` se marca cuando cambia alguna persona de la oficina (ver
+    ``reportes.signals``) y ``reportes.resumen.refresh`` recalcula sólo las
+    oficinas marcadas.
+    """
+
+    oficina = models.OneToOneField(
+        'oficina.Oficina', on_delete=models.CASCADE, primary_key=True, related_name='resumen',
+    )
+    personas = models.IntegerField(verbose_name="Personas", default=0)
+    edad_min = models.IntegerField(verbose_name="Edad mínima", null=True)
+    edad_max = models.IntegerField(verbose_name="Edad máxima", null=True)
+    edad_suma = models.BigIntegerField(verbose_name="Suma de edades", default=0)
+    # Histograma (ver resumen.RANGOS)
+    hasta_17 = models.IntegerField(verbose_name="Hasta 17", default=0)
+    de_18_a_29 = models.IntegerField(verbose_name="18 a 29", default=0)
+    de_30_a_44 = models.IntegerField(verbose_name="30 a 44", default=0)
+    de_45_a_64 = models.IntegerField(verbose_name="45 a 64", default=0)
+    desde_65 = models.IntegerField(verbose_name="65 o más", default=0)
+    sucio = models.BooleanField(verbose_name="Desactualizado", default=True)
+    actualizado = models.DateTimeField(verbose_name="Actualizado", null=True)
+
+    class Meta:
+        """Meta definition for ResumenOficina."""
+
+        verbose_name = 'Resumen de oficina'
+        verbose_name_plural = 'Resúmenes de oficinas'
+        indexes = [
+            # Sólo las filas marcadas: refresh las recorre por oficina
+            models.Index(
+                fields=['oficina'], name='resumen_sucio_idx', condition=models.Q(sucio=True),
+            ),
+        ]
+
+    def __str__(self):
+        """Unicode representation of ResumenOficina."""
+        return f"Resumen de {self.oficina_id}"
+
+    @property
+    def edad_promedio(self):
+        return self.edad_suma / self.personas if self.personas else None
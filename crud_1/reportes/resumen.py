@@ -0,0 +1,142 @@
+"""
+Resumen de edades por oficina (tabla ``reportes_resumenoficina``).
+
+Las estadísticas se calculan con una consulta agrupada por oficina con
+agregación condicional (``COUNT(...) FILTER (WHERE ...)``) para el
+histograma, y se guardan con un upsert. Los cambios en Persona sólo marcan
+la oficina como ``sucio``; ``refresh`` recalcula las marcadas por lotes,
+así el costo de un reporte depende de lo que cambió y no de cuántas veces
+se pide.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from crud.routers import use_primary
+from oficina.models import Oficina
+from persona.models import Persona
+from .models import ResumenOficina
+
+# (campo, desde, hasta) con ``hasta`` excluido; None = sin límite
+RANGOS = [
+    ('hasta_17', None, 18),
+    ('de_18_a_29', 18, 30),
+    ('de_30_a_44', 30, 45),
+    ('de_45_a_64', 45, 65),
+    ('desde_65', 65, None),
+]
+CAMPOS = ['personas', 'edad_min', 'edad_max', 'edad_suma'] + [campo for campo, _desde, _hasta in RANGOS]
+BATCH_SIZE = 500
+
+
+def _rango(desde, hasta):
+    condition = Q()
+    if desde is not None:
+        condition &= Q(edad__gte=desde)
+    if hasta is not None:
+        condition &= Q(edad__lt=hasta)
+    return condition
+
+
+def aggregate(oficina_ids):
+    """``{oficina_id: {campo: valor}}`` de las oficinas dadas (una consulta)."""
+    rows = (
+        Persona.objects.filter(oficina_id__in=oficina_ids)
+        .values('oficina_id')
+        .annotate(
+            personas=Count('id'),
+            edad_min=Min('edad'),
+            edad_max=Max('edad'),
+            edad_suma=Sum('edad'),
+            **{campo: Count('id', filter=_rango(desde, hasta)) for campo, desde, hasta in RANGOS},
+        )
+        .order_by()
+    )
+    return {row.pop('oficina_id'): row for row in rows}
+
+
+def mark_dirty(oficina_ids):
+    """
+    Marca el resumen de las oficinas dadas como desactualizado (un
+    ``UPDATE``). No crea filas: una oficina que se está borrando en cascada
+    pudo haber perdido ya la suya.
+    """
+    ids = {pk for pk in oficina_ids if pk is not None}
+    if ids:
+        ResumenOficina.objects.filter(oficina_id__in=ids, sucio=False).update(sucio=True)
+
+
+def add_oficinas(oficina_ids):
+    """Crea (marcado) el resumen de oficinas nuevas (un upsert)."""
+    ids = sorted(oficina_ids)
+    if ids:
+        ResumenOficina.objects.bulk_create(
+            [ResumenOficina(oficina_id=pk, sucio=True) for pk in ids],
+            update_conflicts=True, unique_fields=['oficina'], update_fields=['sucio'],
+        )
+
+
+def _dirty_batches(batch_size):
+    last_id = 0
+    while True:
+        ids = list(
+            ResumenOficina.objects.filter(sucio=True, oficina_id__gt=last_id)
+            .order_by('oficina_id')
+            .values_list('oficina_id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def refresh(completo=False, batch_size=BATCH_SIZE):
+    """
+    Recalcula los resúmenes marcados (o todos, con ``completo``), de a
+    ``batch_size`` oficinas por transacción. Devuelve cuántos recalculó.
+    """
+    total = 0
+    # Se escribe a partir de lo leído: primario, no una réplica atrasada
+    with use_primary():
+        if completo:
+            ResumenOficina.objects.filter(sucio=False).update(sucio=True)
+            faltantes = Oficina.objects.filter(resumen__isnull=True).order_by('id').values_list('id', flat=True)
+            while ids := list(faltantes[:batch_size]):
+                add_oficinas(ids)
+        for ids in _dirty_batches(batch_size):
+            with transaction.atomic():
+                # Se desmarca antes de calcular: un cambio concurrente la
+                # vuelve a marcar y se recalcula en el próximo refresh.
+                ResumenOficina.objects.filter(oficina_id__in=ids).update(sucio=False)
+                stats = aggregate(ids)
+                vacio = {campo: 0 for campo in CAMPOS} | {'edad_min': None, 'edad_max': None}
+                ahora = timezone.now()
+                ResumenOficina.objects.bulk_create(
+                    [
+                        ResumenOficina(oficina_id=pk, sucio=False, actualizado=ahora, **stats.get(pk, vacio))
+                        for pk in ids
+                    ],
+                    update_conflicts=True, unique_fields=['oficina'], update_fields=CAMPOS + ['actualizado'],
+                )
+            total += len(ids)
+    return total
+
+
+def totals():
+    """
+    Totales de todas las oficinas, sumando el resumen (una consulta).
+    ``pendientes`` cuenta las oficinas marcadas que todavía no se recalcularon.
+    """
+    row = ResumenOficina.objects.aggregate(
+        pendientes=Count('pk', filter=Q(sucio=True)),
+        personas=Sum('personas'),
+        edad_min=Min('edad_min'),
+        edad_max=Max('edad_max'),
+        edad_suma=Sum('edad_suma'),
+        **{campo: Sum(campo) for campo, _desde, _hasta in RANGOS},
+    )
+    for campo in CAMPOS:
+        if campo not in ('edad_min', 'edad_max') and row[campo] is None:
+            row[campo] = 0
+    row['edad_promedio'] = row['edad_suma'] / row['personas'] if row['personas'] else None
+    return row
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from crud.routers import use_primary
+from crud.signals import bulk_write
+from oficina.models import Oficina
+from persona.models import Persona
+from .resumen import add_oficinas, mark_dirty
+
+
+def _oficinas_de(pks):
+    # Se llama al escribir (para 'delete', antes de borrar): del primario
+    with use_primary():
+        return set(Persona.objects.filter(pk__in=pks).values_list('oficina_id', flat=True).distinct())
+
+
+@receiver(pre_save, sender=Persona)
+def persona_por_guardar(sender, instance, **kwargs):
+    # home.signals ya completó la oficina original (antes de guardar)
+    if not instance._state.adding:
+        original = getattr(instance, '_oficina_id_original', None)
+        if original is not None and original != instance.oficina_id:
+            mark_dirty([original])
+
+
+@receiver(post_save, sender=Persona)
+@receiver(post_delete, sender=Persona)
+def persona_modificada(sender, instance, **kwargs):
+    mark_dirty([instance.oficina_id])
+
+
+@receiver(bulk_write, sender=Persona)
+def personas_masivas(sender, action, pks, oficina_ids=None, **kwargs):
+    # oficina_ids trae las oficinas de origen y destino de un cambio de oficina
+    mark_dirty(set(oficina_ids or ()) | _oficinas_de(pks))
+
+
+@receiver(post_save, sender=Oficina)
+def oficina_guardada(sender, instance, created, **kwargs):
+    if created:
+        add_oficinas([instance.pk])
+
+
+@receiver(bulk_write, sender=Oficina)
+def oficinas_masivas(sender, action, pks, **kwargs):
+    if action == 'create':
+        add_oficinas(pks)
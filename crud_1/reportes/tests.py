@@ -0,0 +1,97 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from crud.querybudget import QueryBudget
+from oficina.models import Oficina
+from persona import bulk
+from persona.models import Persona
+from . import resumen
+from .models import ResumenOficina
+
+
+class ResumenTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.central = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        cls.norte = Oficina.objects.create(nombre='Norte', nombre_corto='NOR')
+        cls.personas = [
+            Persona.objects.create(nombre=f'N{edad}', apellido='A', edad=edad, oficina=cls.central)
+            for edad in (10, 20, 35, 50, 70)
+        ]
+
+    def resumen(self, oficina):
+        return ResumenOficina.objects.get(oficina=oficina)
+
+    def test_estadisticas(self):
+        self.assertEqual(resumen.refresh(), 2)
+        r = self.resumen(self.central)
+        self.assertEqual((r.personas, r.edad_min, r.edad_max, r.edad_promedio), (5, 10, 70, 37))
+        self.assertEqual([getattr(r, campo) for campo, _desde, _hasta in resumen.RANGOS], [1, 1, 1, 1, 1])
+        r = self.resumen(self.norte)
+        self.assertEqual((r.personas, r.edad_min, r.sucio), (0, None, False))
+
+    def test_refresh_solo_lo_que_cambio(self):
+        resumen.refresh()
+        self.assertEqual(resumen.refresh(), 0)
+        persona = self.personas[0]
+        persona.oficina = self.norte
+        persona.save()
+        # Cambio de oficina: se marcan el origen y el destino
+        self.assertEqual(resumen.refresh(), 2)
+        self.assertEqual((self.resumen(self.central).personas, self.resumen(self.norte).personas), (4, 1))
+
+        bulk.set_edad(Persona.objects.filter(oficina=self.central), 40)
+        self.assertEqual(resumen.refresh(), 1)
+        self.assertEqual(self.resumen(self.central).de_30_a_44, 4)
+
+    def test_refresh_por_lotes(self):
+        Oficina.objects.bulk_create([Oficina(nombre=f'Oficina {i}') for i in range(10)])
+        with QueryBudget() as budget:
+            self.assertEqual(resumen.refresh(completo=True, batch_size=4), 12)
+        # Una consulta agrupada por lote (3), no una por oficina
+        agrupadas = sum(n for shape, n in budget.shapes.items() if 'GROUP BY' in shape)
+        self.assertEqual(agrupadas, 3)
+        self.assertEqual(ResumenOficina.objects.filter(sucio=True).count(), 0)
+
+    def test_totales(self):
+        resumen.refresh()
+        totales = resumen.totals()
+        self.assertEqual((totales['personas'], totales['edad_min'], totales['edad_max']), (5, 10, 70))
+        self.assertEqual(totales['edad_promedio'], 37)
+
+    def test_vista(self):
+        resumen.refresh()
+        self.client.force_login(User.objects.create_user('admin', password='clave-de-prueba'))
+        url = reverse('reportes:oficinas')
+        data = self.client.get(url, {'formato': 'json'}).json()
+        self.assertEqual([o['personas'] for o in data['oficinas']], [5, 0])
+        self.assertEqual(data['totales']['personas'], 5)
+        response = self.client.get(url, {'formato': 'csv'})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+        self.assertEqual(self.client.get(url, {'formato': 'xml'}).status_code, 400)
+
+    def test_vista_solo_lee(self):
+        resumen.refresh()
+        self.personas[0].delete()
+        self.client.force_login(User.objects.create_user('admin', password='clave-de-prueba'))
+        url = reverse('reportes:oficinas')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {'formato': 'json'}).json()
+            response = self.client.get(url)
+        escrituras = [q['sql'] for q in queries if q['sql'].lstrip().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        # Sólo la sesión del login; el resumen no se toca
+        self.assertFalse([sql for sql in escrituras if 'reportes_resumenoficina' in sql])
+        self.assertEqual((data['oficinas'][0]['personas'], data['totales']['pendientes']), (5, 1))
+        self.assertContains(response, '1 oficina con cambios todavía sin recalcular')
+
+        call_command('refresh_reportes', stdout=io.StringIO())
+        data = self.client.get(url, {'formato': 'json'}).json()
+        self.assertEqual((data['oficinas'][0]['personas'], data['totales']['pendientes']), (4, 0))
+        self.assertNotContains(self.client.get(url), 'sin recalcular')
@@ -0,0 +1,12 @@
+from django.urls import path
+from .views import *
+
+app_name = 'reportes'
+
+urlpatterns = [
+    path(
+        'oficinas/',
+        ReporteOficinasView.as_view(),
+        name='oficinas'
+    ),
+]
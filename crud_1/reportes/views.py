@@ -0,0 +1,92 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.views.generic import ListView
+
+from crud.exporting import streaming_response
+from .models import ResumenOficina
+from . import resumen
+
+REPORTE_COLUMNS = [
+    ('oficina_id', 'oficina_id'),
+    ('oficina', 'oficina__nombre'),
+    ('nombre_corto', 'oficina__nombre_corto'),
+    ('personas', 'personas'),
+    ('edad_min', 'edad_min'),
+    ('edad_max', 'edad_max'),
+    ('edad_promedio', 'promedio'),
+] + [(campo, campo) for campo, _desde, _hasta in resumen.RANGOS]
+
+
+class ReporteOficinasView(LoginRequiredMixin, ListView):
+    """
+    Edades por oficina desde el resumen materializado. ``?formato=json``
+    devuelve la página en JSON y ``?formato=csv`` descarga el reporte
+    completo.
+
+    Sólo lee: el resumen lo recalculan ``refresh_reportes`` o el worker de
+    ``run_jobs`` con la cola vacía, así un pedido de reporte no escribe y
+    puede ir a una réplica.
+    """
+    model = ResumenOficina
+    template_name = 'reportes/oficinas.html'
+    context_object_name = 'resumenes'
+    paginate_by = 50
+
+    def get_queryset(self):
+        return (
+            ResumenOficina.objects.select_related('oficina')
+            .annotate(promedio=Cast('edad_suma', FloatField()) / NullIf(F('personas'), 0))
+            .order_by('oficina__nombre', 'oficina_id')
+        )
+
+    def get(self, request, *args, **kwargs):
+        formato = request.GET.get('formato', 'html')
+        if formato not in ('html', 'json', 'csv'):
+            return HttpResponseBadRequest(f"Formato desconocido: {formato}")
+        if formato == 'csv':
+            return streaming_response(self.get_queryset(), REPORTE_COLUMNS, 'csv', 'reporte_oficinas')
+        if formato == 'json':
+            self.object_list = self.get_queryset()
+            context = self.get_context_data()
+            page_obj = context['page_obj']
+            return JsonResponse({
+                'totales': context['totales'],
+                'rangos': context['rangos'],
+                'oficinas': [self.as_dict(r) for r in context['resumenes']],
+                'pagina': page_obj.number,
+                'paginas': page_obj.paginator.num_pages,
+            })
+        return super().get(request, *args, **kwargs)
+
+    def as_dict(self, r):
+        return {
+            'oficina_id': r.oficina_id,
+            'oficina': r.oficina.nombre,
+            'nombre_corto': r.oficina.nombre_corto,
+            'personas': r.personas,
+            'edad_min': r.edad_min,
+            'edad_max': r.edad_max,
+            'edad_promedio': r.promedio,
+            'histograma': {campo: valor for campo, _etiqueta, valor, _pct in r.histograma},
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['totales'] = resumen.totals()
+        context['rangos'] = [
+            {'campo': campo, 'etiqueta': ResumenOficina._meta.get_field(campo).verbose_name}
+            for campo, _desde, _hasta in resumen.RANGOS
+        ]
+        context['totales_rangos'] = [context['totales'][rango['campo']] for rango in context['rangos']]
+        resumenes = list(context['resumenes'])
+        for r in resumenes:
+            # (campo, etiqueta, cantidad, porcentaje) para las barras del histograma
+            r.histograma = [
+                (rango['campo'], rango['etiqueta'], getattr(r, rango['campo']),
+                 round(100 * getattr(r, rango['campo']) / r.personas) if r.personas else 0)
+                for rango in context['rangos']
+            ]
+        context['resumenes'] = context['object_list'] = resumenes
+        return context
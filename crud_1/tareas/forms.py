@@ -0,0 +1,59 @@
+import csv
+import os
+
+from django import forms
+from django.conf import settings
+
+from .models import Tarea
+from .runners import IMPORTERS
+
+
+class TareaForm(forms.ModelForm):
+    """
+    Alta de una tarea: las importaciones requieren el archivo CSV, que se
+    valida (extensión, tamaño y encabezado) antes de encolarla.
+    """
+
+    class Meta:
+        model = Tarea
+        fields = ['tipo', 'archivo', 'formato', 'chunk_size']
+        widgets = {
+            'formato': forms.Select(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')]),
+        }
+
+    def clean(self):
+        cleaned = super().clean()
+        tipo = cleaned.get('tipo')
+        if tipo in Tarea.IMPORTACIONES and not cleaned.get('archivo'):
+            self.add_error('archivo', "Las importaciones requieren un archivo CSV.")
+        elif tipo in Tarea.IMPORTACIONES and 'archivo' in self.changed_data:
+            try:
+                self.check_csv(cleaned['archivo'], IMPORTERS[tipo].required_columns)
+            except forms.ValidationError as e:
+                self.add_error('archivo', e)
+        if tipo not in Tarea.IMPORTACIONES:
+            cleaned['archivo'] = None
+        if not cleaned.get('chunk_size'):
+            self.add_error('chunk_size', "Debe ser mayor que cero.")
+        return cleaned
+
+    def check_csv(self, archivo, columnas):
+        """Lee sólo el encabezado: el resto lo valida el worker fila por fila."""
+        if os.path.splitext(archivo.name)[1].lower() != '.csv':
+            raise forms.ValidationError("El archivo debe ser un CSV (.csv).")
+        max_mb = settings.TAREAS['MAX_ARCHIVO_MB']
+        if archivo.size > max_mb * 1024 * 1024:
+            raise forms.ValidationError(f"El archivo supera el máximo de {max_mb} MB.")
+        archivo.seek(0)
+        primera = archivo.readline(64 * 1024)
+        archivo.seek(0)
+        no_es_texto = forms.ValidationError("El archivo no es un CSV de texto en UTF-8.")
+        if b'\x00' in primera:
+            raise no_es_texto
+        try:
+            encabezado = next(csv.reader([primera.decode('utf-8-sig')]), [])
+        except UnicodeDecodeError:
+            raise no_es_texto
+        faltantes = [c for c in columnas if c not in {name.strip() for name in encabezado}]
+        if faltantes:
+            raise forms.ValidationError(f"Faltan columnas en el encabezado: {', '.join(faltantes)}.")
@@ -0,0 +1,41 @@
+# tareas/management/commands/run_jobs.py
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reportes import resumen
+from tareas import worker
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de tareas: ejecuta importaciones, deduplicaciones y exportaciones "
+        "encoladas desde la web, y con la cola vacía recalcula el resumen de reportes. "
+        "Se pueden correr varios en paralelo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Termina cuando la cola queda vacía')
+        parser.add_argument('--poll', type=float, default=settings.TAREAS['POLL_SECONDS'],
+                            help='Segundos entre consultas a la cola vacía')
+        parser.add_argument('--worker', type=str, default=worker.default_name(),
+                            help='Nombre del worker (por defecto host:pid)')
+
+    def handle(self, *args, **kwargs):
+        nombre = kwargs['worker']
+        self.stdout.write(f"Worker {nombre} esperando tareas...")
+        try:
+            while True:
+                tarea = worker.run_next(nombre)
+                if tarea is not None:
+                    tarea.refresh_from_db()
+                    self.stdout.write(
+                        f"{tarea} — {tarea.filas} filas, {tarea.filas_por_segundo:.0f} filas/s"
+                    )
+                    continue
+                # Con la cola vacía se recalculan los reportes que cambiaron
+                if total := resumen.refresh():
+                    self.stdout.write(f"Se recalcularon {total} oficinas del reporte")
+                if kwargs['once']:
+                    return
+                time.sleep(kwargs['poll'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Worker detenido; la tarea en curso vuelve a la cola."))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('importar_personas', 'Importar personas'), ('importar_oficinas', 'Importar oficinas'), ('deduplicar_personas', 'Deduplicar personas'), ('exportar_personas', 'Exportar personas'), ('exportar_oficinas', 'Exportar oficinas')], max_length=30, verbose_name='Tipo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('terminada', 'Terminada'), ('fallida', 'Fallida')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('archivo', models.FileField(blank=True, upload_to='tareas/entrada/%Y/%m/', verbose_name='Archivo CSV')),
+                ('formato', models.CharField(default='csv', max_length=10, verbose_name='Formato')),
+                ('chunk_size', models.PositiveIntegerField(default=1000, verbose_name='Filas por lote')),
+                ('resultado', models.FileField(blank=True, upload_to='tareas/resultados/', verbose_name='Resultado')),
+                ('offset', models.BigIntegerField(default=0)),
+                ('linea', models.BigIntegerField(default=1)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('avance', models.BigIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('filas', models.BigIntegerField(default=0)),
+                ('creadas', models.BigIntegerField(default=0)),
+                ('actualizadas', models.BigIntegerField(default=0)),
+                ('omitidas', models.BigIntegerField(default=0)),
+                ('eliminadas', models.BigIntegerField(default=0)),
+                ('segundos', models.FloatField(default=0)),
+                ('errores', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('latido', models.DateTimeField(blank=True, null=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+                ('creada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='tarea_estado_id_idx')],
+            },
+        ),
+    ]
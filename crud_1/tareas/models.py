@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.db import models
+
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano (importación, deduplicación o exportación).
+
+    Los campos de avance (``offset``, ``linea``, ``ultimo_id`` y los
+    contadores) son el punto de control: el worker los guarda al confirmar
+    cada lote, y si se cae, la tarea se retoma desde ahí.
+    """
+
+    IMPORTAR_PERSONAS = 'importar_personas'
+    IMPORTAR_OFICINAS = 'importar_oficinas'
+    DEDUPLICAR_PERSONAS = 'deduplicar_personas'
+    EXPORTAR_PERSONAS = 'exportar_personas'
+    EXPORTAR_OFICINAS = 'exportar_oficinas'
+    TIPOS = [
+        (IMPORTAR_PERSONAS, 'Importar personas'),
+        (IMPORTAR_OFICINAS, 'Importar oficinas'),
+        (DEDUPLICAR_PERSONAS, 'Deduplicar personas'),
+        (EXPORTAR_PERSONAS, 'Exportar personas'),
+        (EXPORTAR_OFICINAS, 'Exportar oficinas'),
+    ]
+    IMPORTACIONES = (IMPORTAR_PERSONAS, IMPORTAR_OFICINAS)
+    EXPORTACIONES = (EXPORTAR_PERSONAS, EXPORTAR_OFICINAS)
+
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    TERMINADA = 'terminada'
+    FALLIDA = 'fallida'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (TERMINADA, 'Terminada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    tipo = models.CharField(verbose_name="Tipo", max_length=30, choices=TIPOS)
+    estado = models.CharField(verbose_name="Estado", max_length=20, choices=ESTADOS, default=PENDIENTE)
+    archivo = models.FileField(verbose_name="Archivo CSV", upload_to='tareas/entrada/%Y/%m/', blank=True)
+    formato = models.CharField(verbose_name="Formato", max_length=10, default='csv')
+    chunk_size = models.PositiveIntegerField(verbose_name="Filas por lote", default=1000)
+    resultado = models.FileField(verbose_name="Resultado", upload_to='tareas/resultados/', blank=True)
+    creada_por = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+
+    # Punto de control
+    offset = models.BigIntegerField(default=0)     # bytes leídos (importar) o escritos (exportar)
+    linea = models.BigIntegerField(default=1)      # última línea leída del CSV (1 = encabezado)
+    ultimo_id = models.BigIntegerField(default=0)  # último id exportado
+    avance = models.BigIntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+    filas = models.BigIntegerField(default=0)
+    creadas = models.BigIntegerField(default=0)
+    actualizadas = models.BigIntegerField(default=0)
+    omitidas = models.BigIntegerField(default=0)
+    eliminadas = models.BigIntegerField(default=0)
+    segundos = models.FloatField(default=0)
+    errores = models.TextField(blank=True)
+
+    # Ejecución
+    worker = models.CharField(max_length=100, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    latido = models.DateTimeField(null=True, blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """Meta definition for Tarea."""
+
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        ordering = ['-id']
+        indexes = [
+            # Cola: pendientes (y en curso sin latido) por orden de llegada
+            models.Index(fields=['estado', 'id'], name='tarea_estado_id_idx'),
+        ]
+
+    def __str__(self):
+        """Unicode representation of Tarea."""
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def activa(self):
+        return self.estado in (self.PENDIENTE, self.EN_CURSO)
+
+    @property
+    def porcentaje(self):
+        if self.estado == self.TERMINADA:
+            return 100
+        return min(100, int(self.avance * 100 / self.total)) if self.total else 0
+
+    @property
+    def filas_por_segundo(self):
+        procesadas = self.eliminadas if self.tipo == self.DEDUPLICAR_PERSONAS else self.filas
+        return procesadas / self.segundos if self.segundos else 0.0
@@ -0,0 +1,222 @@
+"""
+Ejecución de tareas con puntos de control.
+
+Cada tipo de tarea avanza por lotes y al terminar cada uno guarda su
+posición en la fila de ``Tarea``:
+
+- importaciones: offset en bytes y última línea del CSV, en la misma
+  transacción que las filas del lote (``CSVImporter.checkpoint``); al
+  retomar se sigue leyendo desde ese offset,
+- deduplicación: los perdedores se recalculan al retomar (los ya borrados
+  no vuelven a aparecer) y se siguen borrando por lotes,
+- exportaciones: último id escrito y tamaño del archivo tras el ``fsync``;
+  al retomar el archivo se trunca a ese tamaño y se sigue por keyset.
+
+Además de cada punto de control, ``Heartbeat`` renueva el latido desde un
+hilo aparte mientras la tarea corre: un lote grande o un
+``collect_losers`` largo no la hacen parecer caída.
+
+Si otro worker tomó la tarea (porque esta dejó de latir), el punto de
+control no se guarda y se lanza ``TareaPerdida``.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import OutputWrapper
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from crud.exporting import csv_header, encode_rows
+from oficina.exports import OFICINA_COLUMNS, oficinas_queryset
+from oficina.importers import OficinaImporter
+from persona import dedupe
+from persona.exports import PERSONA_COLUMNS, personas_queryset
+from persona.importers import PersonaImporter
+from .models import Tarea
+
+logger = logging.getLogger('tareas')
+
+IMPORTERS = {
+    Tarea.IMPORTAR_PERSONAS: PersonaImporter,
+    Tarea.IMPORTAR_OFICINAS: OficinaImporter,
+}
+
+
+class TareaPerdida(Exception):
+    """Otro worker tomó la tarea: éste debe dejarla sin tocar nada más."""
+
+
+class _Tail:
+    """Guarda las últimas líneas escritas (errores de la importación)."""
+
+    def __init__(self, text, size):
+        self.lines = deque(text.splitlines() if text else (), maxlen=size)
+
+    def write(self, value):
+        value = value.rstrip('\n')
+        if value:
+            self.lines.append(value)
+
+    def flush(self):
+        pass
+
+    def text(self):
+        return '\n'.join(self.lines)
+
+
+class Heartbeat:
+    """Renueva el latido de ``tarea`` cada ``interval`` segundos en un hilo aparte (context manager)."""
+
+    def __init__(self, tarea, worker, interval):
+        self.tarea = tarea
+        self.worker = worker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'latido-{tarea.pk}', daemon=True)
+
+    def beat(self):
+        return Tarea.objects.filter(
+            pk=self.tarea.pk, worker=self.worker, estado=Tarea.EN_CURSO
+        ).update(latido=timezone.now())
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    self.beat()
+                except DatabaseError as e:
+                    # Base ocupada: se reintenta en el próximo latido
+                    logger.warning("No se pudo renovar el latido de la tarea %s: %s", self.tarea.pk, e)
+        finally:
+            # El hilo tiene sus propias conexiones
+            connections.close_all()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+class Runner:
+    """Ejecuta ``tarea`` en nombre de ``worker`` y registra su avance."""
+
+    def __init__(self, tarea, worker):
+        self.tarea = tarea
+        self.worker = worker
+        self.inicio = time.monotonic()
+        self.segundos_previos = tarea.segundos
+        self.errores = _Tail(tarea.errores, settings.TAREAS['MAX_ERRORES'])
+
+    def save(self, **campos):
+        campos.update(
+            segundos=self.segundos_previos + time.monotonic() - self.inicio,
+            latido=timezone.now(),
+            errores=self.errores.text(),
+        )
+        actualizadas = Tarea.objects.filter(
+            pk=self.tarea.pk, worker=self.worker, estado=Tarea.EN_CURSO
+        ).update(**campos)
+        if not actualizadas:
+            raise TareaPerdida(f"La tarea {self.tarea.pk} ya no pertenece a {self.worker}")
+        for name, value in campos.items():
+            setattr(self.tarea, name, value)
+
+    def run(self):
+        with Heartbeat(self.tarea, self.worker, settings.TAREAS['HEARTBEAT_SECONDS']):
+            if self.tarea.tipo in Tarea.IMPORTACIONES:
+                self.importar()
+            elif self.tarea.tipo == Tarea.DEDUPLICAR_PERSONAS:
+                self.deduplicar()
+            else:
+                self.exportar()
+        self.save(estado=Tarea.TERMINADA, terminada=timezone.now(), avance=self.tarea.total)
+
+    # --- Importaciones ----------------------------------------------------
+
+    def _import_progress(self, importer):
+        stats = importer.stats
+        return {
+            'offset': importer.offset,
+            'linea': importer.line,
+            'avance': importer.offset,
+            'filas': stats.filas,
+            'creadas': stats.creadas,
+            'actualizadas': stats.actualizadas,
+            'omitidas': stats.omitidas,
+        }
+
+    def importar(self):
+        tarea = self.tarea
+        importer = IMPORTERS[tarea.tipo](
+            chunk_size=tarea.chunk_size,
+            stderr=OutputWrapper(self.errores),
+            verbosity=0,
+            checkpoint=lambda importer: self.save(**self._import_progress(importer)),
+        )
+        # Los contadores siguen desde el último punto de control
+        importer.stats.filas = tarea.filas
+        importer.stats.creadas = tarea.creadas
+        importer.stats.actualizadas = tarea.actualizadas
+        importer.stats.omitidas = tarea.omitidas
+        importer.offset, importer.line = tarea.offset, tarea.linea
+
+        path = tarea.archivo.path
+        self.save(total=os.path.getsize(path))
+        importer.run(path, start=tarea.offset or None, first_line=tarea.linea + 1)
+        self.save(**self._import_progress(importer))
+
+    # --- Deduplicación ----------------------------------------------------
+
+    def deduplicar(self):
+        previas = self.tarea.eliminadas
+        restantes = dedupe.collect_losers()
+        self.save(total=previas + restantes, avance=previas)
+        try:
+            for eliminadas in dedupe.delete_losers(batch_size=self.tarea.chunk_size):
+                self.save(eliminadas=previas + eliminadas, avance=previas + eliminadas)
+        finally:
+            dedupe.drop_losers()
+
+    # --- Exportaciones ----------------------------------------------------
+
+    def exportar(self):
+        tarea = self.tarea
+        if tarea.tipo == Tarea.EXPORTAR_PERSONAS:
+            queryset, columns = personas_queryset(), PERSONA_COLUMNS
+        else:
+            queryset, columns = oficinas_queryset(), OFICINA_COLUMNS
+        names = [name for name, _lookup in columns]
+        lookups = [lookup for _name, lookup in columns]
+
+        if not tarea.resultado:
+            self.save(resultado=f'tareas/resultados/{tarea.tipo}-{tarea.pk}.{tarea.formato}')
+        path = default_storage.path(tarea.resultado.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.save(total=tarea.filas + queryset.filter(pk__gt=tarea.ultimo_id).count())
+
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as fh:
+            # Lo escrito después del último punto de control se descarta
+            fh.seek(tarea.offset)
+            fh.truncate()
+            if tarea.offset == 0 and tarea.formato == 'csv':
+                fh.write(csv_header(columns).encode('utf-8'))
+            ultimo_id, filas = tarea.ultimo_id, tarea.filas
+            while True:
+                rows = list(queryset.filter(pk__gt=ultimo_id).values_list('pk', *lookups)[:tarea.chunk_size])
+                if not rows:
+                    break
+                for line in encode_rows((row[1:] for row in rows), names, tarea.formato):
+                    fh.write(line.encode('utf-8'))
+                fh.flush()
+                os.fsync(fh.fileno())
+                ultimo_id = rows[-1][0]
+                filas += len(rows)
+                self.save(offset=fh.tell(), ultimo_id=ultimo_id, filas=filas, avance=filas)
@@ -0,0 +1,195 @@
+import io
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from oficina.models import Oficina
+from persona.models import Persona
+from persona.tests import DuplicadosTestCase
+from reportes.models import ResumenOficina
+from . import worker
+from .forms import TareaForm
+from .models import Tarea
+from .runners import Heartbeat, Runner, TareaPerdida
+
+
+class TareaTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+
+    def tarea(self, tipo, csv=None, **kwargs):
+        tarea = Tarea(tipo=tipo, **kwargs)
+        if csv is not None:
+            tarea.archivo.save('datos.csv', ContentFile(csv.encode('utf-8')), save=False)
+        tarea.save()
+        return tarea
+
+
+class WorkerTests(TareaTestCase):
+
+    def test_toma_la_mas_antigua_una_sola_vez(self):
+        primera = self.tarea(Tarea.EXPORTAR_OFICINAS)
+        segunda = self.tarea(Tarea.EXPORTAR_OFICINAS)
+        self.assertEqual(worker.claim('w1').pk, primera.pk)
+        self.assertEqual(worker.claim('w2').pk, segunda.pk)
+        self.assertIsNone(worker.claim('w3'))
+
+    def test_cola_vacia_recalcula_reportes(self):
+        Persona.objects.create(nombre='Ana', apellido='Gómez', edad=30, oficina=self.oficina)
+        out = io.StringIO()
+        call_command('run_jobs', once=True, stdout=out)
+        self.assertIn('Se recalcularon 1 oficinas del reporte', out.getvalue())
+        self.assertFalse(ResumenOficina.objects.filter(sucio=True).exists())
+        self.assertEqual(ResumenOficina.objects.get(oficina=self.oficina).personas, 1)
+
+    def test_retoma_las_que_dejaron_de_latir(self):
+        tarea = self.tarea(Tarea.EXPORTAR_OFICINAS)
+        worker.claim('w1')
+        self.assertIsNone(worker.claim('w2'))
+        Tarea.objects.filter(pk=tarea.pk).update(latido=timezone.now() - timedelta(hours=1))
+        tomada = worker.claim('w2')
+        self.assertEqual((tomada.pk, tomada.worker, tomada.intentos), (tarea.pk, 'w2', 2))
+        # El worker anterior ya no puede guardar su avance
+        with self.assertRaises(TareaPerdida):
+            Runner(tarea, 'w1').save(avance=1)
+
+    def test_importar_personas(self):
+        csv = 'nombre,apellido,edad,oficina_nombre_corto\n' + ''.join(
+            f'N{i},A{i},{20 + i},CEN\n' for i in range(7)
+        ) + 'Mal,Dato,x,CEN\n'
+        tarea = self.tarea(Tarea.IMPORTAR_PERSONAS, csv, chunk_size=3)
+        worker.run_next('w1')
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.TERMINADA)
+        self.assertEqual((tarea.filas, tarea.creadas, tarea.omitidas), (8, 7, 1))
+        self.assertIn('línea 9', tarea.errores)
+        self.assertEqual(Persona.objects.count(), 7)
+
+    def test_exportar_retoma_desde_el_punto_de_control(self):
+        Oficina.objects.bulk_create([Oficina(nombre=f'Oficina {i}', nombre_corto=f'OF{i}') for i in range(4)])
+        tarea = self.tarea(Tarea.EXPORTAR_OFICINAS, chunk_size=2)
+        worker.run_next('w1')
+        tarea.refresh_from_db()
+        completo = tarea.resultado.read()
+        self.assertEqual(len(completo.splitlines()), 6)
+
+        # Se reanuda tras el primer lote, con basura escrita después del punto de control
+        with open(tarea.resultado.path, 'r+b') as fh:
+            fh.seek(0)
+            lineas = fh.read().splitlines(keepends=True)
+            fh.seek(sum(map(len, lineas[:3])))
+            fh.write(b'basura')
+        ultimo_id = Oficina.objects.order_by('pk').values_list('pk', flat=True)[1]
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado=Tarea.PENDIENTE, worker='', latido=None, offset=sum(map(len, lineas[:3])),
+            ultimo_id=ultimo_id, filas=2,
+        )
+        worker.run_next('w2')
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.TERMINADA)
+        with open(tarea.resultado.path, 'rb') as fh:
+            self.assertEqual(fh.read(), completo)
+
+    def test_falla_tras_el_maximo_de_intentos(self):
+        tarea = self.tarea(Tarea.EXPORTAR_OFICINAS, intentos=3)
+        worker.run_next('w1')
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+        self.assertIn('intentos', tarea.errores)
+
+
+class HeartbeatTests(TareaTestCase):
+
+    def test_late_en_segundo_plano(self):
+        tarea = self.tarea(Tarea.EXPORTAR_OFICINAS)
+        with mock.patch.object(Heartbeat, 'beat') as beat:
+            with Heartbeat(tarea, 'w1', interval=0.01) as heartbeat:
+                time.sleep(0.1)
+            self.assertFalse(heartbeat._thread.is_alive())
+        self.assertGreaterEqual(beat.call_count, 2)
+
+    def test_el_latido_evita_que_otro_la_tome(self):
+        tarea = self.tarea(Tarea.EXPORTAR_OFICINAS)
+        worker.claim('w1')
+        Tarea.objects.filter(pk=tarea.pk).update(latido=timezone.now() - timedelta(hours=1))
+        self.assertEqual(Heartbeat(tarea, 'w1', interval=30).beat(), 1)
+        self.assertIsNone(worker.claim('w2'))
+        # El latido de otro worker no la renueva
+        self.assertEqual(Heartbeat(tarea, 'w2', interval=30).beat(), 0)
+
+    def test_la_tarea_corre_con_latido(self):
+        tarea = self.tarea(Tarea.EXPORTAR_OFICINAS)
+        with mock.patch('tareas.runners.Heartbeat', wraps=Heartbeat) as heartbeat:
+            worker.run_next('w1')
+        heartbeat.assert_called_once()
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.TERMINADA)
+
+
+class TareaFormTests(TestCase):
+
+    def form(self, contenido, nombre='datos.csv', tipo=Tarea.IMPORTAR_PERSONAS):
+        archivo = SimpleUploadedFile(nombre, contenido)
+        return TareaForm(data={'tipo': tipo, 'formato': 'csv', 'chunk_size': 100}, files={'archivo': archivo})
+
+    def errores(self, form):
+        self.assertFalse(form.is_valid())
+        return form.errors['archivo']
+
+    def test_csv_valido(self):
+        self.assertTrue(self.form(b'\xef\xbb\xbfnombre,apellido,edad,oficina_nombre_corto\nJos\xc3\xa9,P,30,CEN\n').is_valid())
+        self.assertTrue(self.form(b'id,nombre,nombre_corto\n', tipo=Tarea.IMPORTAR_OFICINAS).is_valid())
+
+    def test_rechaza_otros_tipos_de_archivo(self):
+        self.assertIn('El archivo debe ser un CSV (.csv).', self.errores(self.form(b'nombre\n', 'datos.xlsx')))
+        self.assertIn('El archivo no es un CSV de texto en UTF-8.',
+                      self.errores(self.form(b'PK\x03\x04\x00\x00binario')))
+        self.assertIn('El archivo no es un CSV de texto en UTF-8.', self.errores(self.form(b'nombre,\xff\xfe\n')))
+
+    def test_rechaza_encabezado_incompleto(self):
+        errores = self.errores(self.form(b'nombre,apellido\nJose,P\n'))
+        self.assertEqual(errores, ['Faltan columnas en el encabezado: edad, oficina_nombre_corto.'])
+
+    def test_rechaza_archivos_grandes(self):
+        with override_settings(TAREAS={**settings.TAREAS, 'MAX_ARCHIVO_MB': 0}):
+            self.assertIn('El archivo supera el máximo de 0 MB.',
+                          self.errores(self.form(b'nombre,apellido,edad,oficina_nombre_corto\n')))
+
+
+class DeduplicarTests(DuplicadosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        oficina = Oficina.objects.create(nombre='Central', nombre_corto='CEN')
+        Persona.objects.bulk_create([
+            Persona(nombre='José', apellido='Pérez', edad=30, oficina=oficina) for _i in range(5)
+        ])
+
+    def test_deduplicar(self):
+        tarea = Tarea.objects.create(tipo=Tarea.DEDUPLICAR_PERSONAS, chunk_size=2)
+        worker.run_next('w1')
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.eliminadas, tarea.total), (Tarea.TERMINADA, 4, 4))
+        self.assertEqual(Persona.objects.count(), 1)
@@ -0,0 +1,27 @@
+from django.urls import path
+from .views import *
+
+app_name = 'tareas'
+
+urlpatterns = [
+    path(
+        'lista/',
+        TareaListView.as_view(),
+        name='lista'
+    ),
+    path(
+        'crear/',
+        TareaCreateView.as_view(),
+        name='crear'
+    ),
+    path(
+        'detalle/<int:pk>/',
+        TareaDetailView.as_view(),
+        name='detalle'
+    ),
+    path(
+        'resultado/<int:pk>/',
+        TareaResultadoView.as_view(),
+        name='resultado'
+    ),
+]
@@ -0,0 +1,39 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.views.generic import CreateView, DetailView, ListView, View
+from django.views.generic.detail import SingleObjectMixin
+from .forms import TareaForm
+from .models import Tarea
+
+class TareaListView(LoginRequiredMixin, ListView):
+    model = Tarea
+    template_name = 'tareas/lista.html'
+    context_object_name = 'tareas'
+    paginate_by = 20
+
+class TareaCreateView(LoginRequiredMixin, CreateView):
+    model = Tarea
+    form_class = TareaForm
+    template_name = 'tareas/crear.html'
+
+    def form_valid(self, form):
+        form.instance.creada_por = self.request.user
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        return reverse('tareas:detalle', args=[self.object.pk])
+
+class TareaDetailView(LoginRequiredMixin, DetailView):
+    model = Tarea
+    template_name = 'tareas/detalle.html'
+    context_object_name = 'tarea'
+
+class TareaResultadoView(LoginRequiredMixin, SingleObjectMixin, View):
+    model = Tarea
+
+    def get(self, request, *args, **kwargs):
+        tarea = self.get_object()
+        if tarea.estado != Tarea.TERMINADA or not tarea.resultado:
+            raise Http404("La tarea no tiene un resultado para descargar")
+        return FileResponse(tarea.resultado.open('rb'), as_attachment=True)
@@ -0,0 +1,87 @@
+"""
+Cola de tareas sobre la tabla ``tareas_tarea``.
+
+Un worker toma la tarea pendiente más antigua (o una en curso cuyo worker
+dejó de latir hace más de ``TAREAS['STALE_SECONDS']``) con un ``UPDATE``
+condicionado al estado que leyó: si otro worker la tomó antes, el
+``UPDATE`` no afecta filas y se prueba con la siguiente. No hace falta
+``SELECT ... FOR UPDATE``, así funciona igual en SQLite y PostgreSQL.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Tarea
+from .runners import Runner, TareaPerdida
+
+logger = logging.getLogger('tareas')
+
+
+def default_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Toma la próxima tarea para ``worker``; devuelve ``None`` si no hay."""
+    now = timezone.now()
+    limite = now - timedelta(seconds=settings.TAREAS['STALE_SECONDS'])
+    candidatas = (
+        Tarea.objects.filter(Q(estado=Tarea.PENDIENTE) | Q(estado=Tarea.EN_CURSO, latido__lt=limite))
+        .order_by('id')
+        .only('id', 'estado', 'worker', 'latido', 'intentos')[:10]
+    )
+    for tarea in candidatas:
+        tomada = Tarea.objects.filter(
+            pk=tarea.pk, estado=tarea.estado, worker=tarea.worker, latido=tarea.latido
+        ).update(
+            estado=Tarea.EN_CURSO,
+            worker=worker,
+            latido=now,
+            iniciada=Coalesce('iniciada', Value(now)),
+            intentos=F('intentos') + 1,
+        )
+        if tomada:
+            return Tarea.objects.get(pk=tarea.pk)
+    return None
+
+
+def fail(tarea, worker, motivo):
+    Tarea.objects.filter(pk=tarea.pk, worker=worker).update(
+        estado=Tarea.FALLIDA, terminada=timezone.now(),
+        errores=f"{tarea.errores}\n{motivo}".strip(),
+    )
+
+
+def release(tarea, worker):
+    """Devuelve la tarea a la cola (el worker se detiene); conserva el avance."""
+    Tarea.objects.filter(pk=tarea.pk, worker=worker, estado=Tarea.EN_CURSO).update(
+        estado=Tarea.PENDIENTE, worker='', latido=None, intentos=F('intentos') - 1,
+    )
+
+
+def run_next(worker):
+    """Ejecuta una tarea de la cola. Devuelve la tarea, o ``None`` si la cola está vacía."""
+    tarea = claim(worker)
+    if tarea is None:
+        return None
+    if tarea.intentos > settings.TAREAS['MAX_INTENTOS']:
+        fail(tarea, worker, "Se superó la cantidad máxima de intentos")
+        return tarea
+    logger.info("Worker %s ejecuta %s (intento %d)", worker, tarea, tarea.intentos)
+    try:
+        Runner(tarea, worker).run()
+    except TareaPerdida as e:
+        logger.warning("%s", e)
+    except (KeyboardInterrupt, SystemExit):
+        release(tarea, worker)
+        raise
+    except Exception as e:
+        logger.exception("La tarea %s falló", tarea.pk)
+        fail(tarea, worker, f"{type(e).__name__}: {e}")
+    return tarea